@@ -0,0 +1,18 @@
+"""
+Compact reward_log into per-job summaries and move old rows to the archive database.
+
+Run periodically (e.g. nightly from cron): python -m RLloop.compact_rewards (from backend/) --retention-days 180
+"""
+
+import argparse
+
+from RLloop.rl_feedback import compact_reward_log, REWARD_RETENTION_DAYS, ARCHIVE_DB_PATH
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive reward_log rows older than the retention horizon")
+    parser.add_argument('--retention-days', type=int, default=REWARD_RETENTION_DAYS)
+    args = parser.parse_args()
+
+    result = compact_reward_log(args.retention_days)
+    print(f"Archived {result['archived']} rewards from {len(result['jobs'])} jobs to {ARCHIVE_DB_PATH}")
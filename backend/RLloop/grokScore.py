@@ -1,134 +1,696 @@
 import os
-from typing import Optional
-from pydantic import BaseModel, Field
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, List, Optional, Tuple
+from pydantic import BaseModel, Field, PrivateAttr
 from xai_sdk import Client
 from xai_sdk.chat import user, system
 from dotenv import load_dotenv
 
 # Import RL feedback functions for self-improving scoring
-from RLloop.rl_feedback import compute_calibration_metrics, get_policy_stats
+from RLloop.rl_feedback import (
+    compute_calibration_metrics, get_policy_stats, get_score_mapping, record_shadow_score, JobCache, ScoreMapping
+)
+from metrics import Counter, register, track_upstream, submit_tracked
+from structured_log import get_logger
+from singleflight import SingleFlight, flight_key
 
 load_dotenv()
 
+log = get_logger("score")
+
+SCORE_CACHE_TOTAL = register(Counter(
+    "score_cache_total", "Scoring calls served from the score cache (hit) or sent to Grok (miss)", ("result",)
+))
+SCORE_CASCADE_TOTAL = register(Counter(
+    "score_cascade_total", "Cascade scores by how they were decided", ("outcome",)
+))
+
+
 # Pydantic Schema
 class CandidateScore(BaseModel):
     score: int = Field(description="Candidate score from 0-100", ge=0, le=100)
+    # Set from the response after parsing; private attributes stay out of the schema sent to Grok
+    _total_tokens: Optional[int] = PrivateAttr(default=None)
+
+
+class CalibratedScore(CandidateScore):
+    """Score mapped through the job's learned calibration, keeping the model's raw score."""
+    raw_score: int = Field(description="Uncalibrated model score from 0-100", ge=0, le=100)
+
+
+class ListwiseEntry(BaseModel):
+    index: int = Field(description="The candidate's number as given in the list")
+    score: int = Field(description="Candidate score from 0-100", ge=0, le=100)
+
+
+class ListwiseScores(BaseModel):
+    scores: List[ListwiseEntry] = Field(description="One score per candidate in the list")
+
+
+class TieredScore(CandidateScore):
+    """Score from the fast/full model cascade, recording which tier decided it."""
+    scoring_model: str = Field(description="Model whose score was returned")
+    fast_score: int = Field(description="First-tier (fast model) score from 0-100", ge=0, le=100)
+
+
+SCORING_MODEL = "grok-4"
+FAST_SCORING_MODEL = os.getenv("FAST_SCORING_MODEL", "grok-4-fast")
+
+# How recruiter feedback corrects scores:
+# - 'prompt': inject calibration guidance into the SCORING_MODEL system prompt
+# - 'numeric': score with FAST_SCORING_MODEL and map the raw score through the job's
+#   isotonic fit (prompt guidance is used until the job has enough ratings)
+SCORE_CALIBRATION = os.getenv("SCORE_CALIBRATION", "prompt")
+CALIBRATION_MODES = ("prompt", "numeric")
+
+# Shadow mode: a sampled fraction of rank_candidate calls is also scored by SHADOW_MODEL in
+# the background, recording latency, tokens and divergence per job (empty SHADOW_MODEL disables)
+SHADOW_MODEL = os.getenv("SHADOW_MODEL", "")
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))
+SHADOW_WORKERS = 2
+SHADOW_MAX_PENDING = 32  # Drop shadow samples instead of queueing behind a slow model
+
+# Cascade: score with FAST_SCORING_MODEL and escalate to SCORING_MODEL only when the fast score is
+# within CASCADE_BAND of the shortlist threshold, or when a sampled audit finds the two models
+# disagree by more than CASCADE_TOLERANCE points
+SCORE_CASCADE = os.getenv("SCORE_CASCADE", "").lower() in ("1", "true", "yes")
+SHORTLIST_THRESHOLD = int(os.getenv("SHORTLIST_THRESHOLD", "75"))  # 'Strong fit' in SYSTEM_PROMPT
+CASCADE_BAND = int(os.getenv("CASCADE_BAND", "10"))
+CASCADE_AUDIT_RATE = float(os.getenv("CASCADE_AUDIT_RATE", "0.05"))
+CASCADE_TOLERANCE = int(os.getenv("CASCADE_TOLERANCE", "15"))
+
+# Scores remembered per (model, candidate, requirements, calibration prompt) until the job's feedback changes
+SCORE_CACHE_SIZE = int(os.getenv("SCORE_CACHE_SIZE", "4096"))
+
+# Upper bound on concurrent Grok calls for one rank_candidates batch
+RANK_BATCH_WORKERS = 8
+
+# Listwise ranking: candidates per Grok call, and the length each description is trimmed to
+LISTWISE_BATCH_SIZE = int(os.getenv("LISTWISE_BATCH_SIZE", "50"))
+LISTWISE_SUMMARY_CHARS = 1500
+
+# Calibrate prompts on the job's most recent N ratings (0 = all history), since recruiter behavior drifts
+CALIBRATION_WINDOW = int(os.getenv("CALIBRATION_WINDOW", "0")) or None
+
+LISTWISE_INSTRUCTIONS = """
+
+You will receive several candidates for the same job, each numbered. Score every
+candidate on its own merits against the job requirements using the criteria above,
+not relative to the other candidates. Return exactly one score per candidate number."""
+
+SYSTEM_PROMPT = """You are an expert technical recruiter and hiring manager. 
+Your task is to evaluate candidates against job requirements and provide a numerical score.
+
+Scoring criteria:
+- 90-100: Exceptional fit, exceeds requirements
+- 75-89: Strong fit, meets all key requirements
+- 60-74: Good fit, meets most requirements with minor gaps
+- 40-59: Moderate fit, has relevant experience but significant gaps
+- 20-39: Poor fit, lacks many key requirements
+- 0-19: Not qualified for this role
 
+Be thorough, fair, and objective in your evaluation."""
 
-def get_calibration_context(job_id: Optional[str]) -> str:
+
+def load_calibration(job_id: Optional[str], version: int = 1) -> Tuple[Optional[dict], Optional[dict]]:
     """
-    Generate calibration context from RL feedback to inject into the prompt.
-    
-    This is the key to self-improving AI - we learn from recruiter feedback
-    and tell Grok to adjust its scoring based on historical patterns.
+    Load calibration metrics and policy stats for a job from the RL feedback store.
     
     Args:
         job_id: Job identifier to get calibration for
+        version: Policy version (default 1)
         
     Returns:
-        String to append to system prompt with calibration guidance
+        Tuple of (calibration_metrics, policy_stats); both None without a job_id
     """
     if not job_id:
-        return ""
+        return None, None
+    return compute_calibration_metrics(job_id, last_n=CALIBRATION_WINDOW), get_policy_stats(job_id, version)
+
+
+def format_calibration_context(metrics: Optional[dict], stats: Optional[dict]) -> str:
+    """
+    Turn calibration metrics and policy stats into prompt guidance.
     
-    try:
-        metrics = compute_calibration_metrics(job_id)
-        stats = get_policy_stats(job_id)
-        
-        if not metrics or metrics.get('sample_count', 0) < 2:
-            return ""  # Not enough data yet
-        
-        bias = metrics.get('bias', 0)
-        mae = metrics.get('mae', 0)
-        sample_count = metrics.get('sample_count', 0)
+    Args:
+        metrics: Output of compute_calibration_metrics
+        stats: Output of get_policy_stats
         
-        # Generate calibration guidance based on learned patterns
-        calibration_text = f"""
+    Returns:
+        String to append to system prompt with calibration guidance
+    """
+    if not metrics or metrics.get('sample_count', 0) < 2:
+        return ""  # Not enough data yet
+    
+    bias = metrics.get('bias', 0)
+    mae = metrics.get('mae', 0)
+    sample_count = metrics.get('sample_count', 0)
+    
+    # Generate calibration guidance based on learned patterns
+    calibration_text = f"""
 
 IMPORTANT - CALIBRATION FROM RECRUITER FEEDBACK:
 Based on {sample_count} recruiter reviews for this role:"""
-        
-        if abs(bias) > 5:
-            if bias > 0:
-                calibration_text += f"""
+    
+    if abs(bias) > 5:
+        if bias > 0:
+            calibration_text += f"""
 - You have been UNDERRATING candidates by ~{abs(bias):.0f} points on average
 - Recruiters consistently rate candidates higher than your predictions
 - Adjust your scores UPWARD to better match recruiter expectations"""
-            else:
-                calibration_text += f"""
+        else:
+            calibration_text += f"""
 - You have been OVERRATING candidates by ~{abs(bias):.0f} points on average
 - Recruiters consistently rate candidates lower than your predictions
 - Be MORE CRITICAL and adjust your scores DOWNWARD"""
-        
-        if mae > 15:
-            calibration_text += f"""
+    
+    if mae > 15:
+        calibration_text += f"""
 - Your average error is {mae:.0f} points - aim for more accurate predictions
 - Consider the specific requirements more carefully"""
-        
-        # Add confidence indicator
-        if stats and stats.get('weight', 1) < 0.5:
-            calibration_text += """
+    
+    # Add confidence indicator
+    if stats and stats.get('weight', 1) < 0.5:
+        calibration_text += """
 - Model confidence is LOW - be especially thoughtful in your evaluation"""
+    
+    return calibration_text
+
+
+# Calibration only changes when a recruiter rates someone for the job
+_context_cache = JobCache()
+
+
+def get_calibration_context(job_id: Optional[str], version: int = 1) -> str:
+    """
+    Generate calibration context from RL feedback to inject into the prompt.
+    
+    This is the key to self-improving AI - we learn from recruiter feedback
+    and tell Grok to adjust its scoring based on historical patterns.
+    The result is cached per job and version until new feedback arrives.
+    
+    Args:
+        job_id: Job identifier to get calibration for
+        version: Policy version (default 1)
         
-        return calibration_text
-        
+    Returns:
+        String to append to system prompt with calibration guidance
+    """
+    if not job_id:
+        return ""
+    
+    try:
+        return _context_cache.get(
+            job_id, version, lambda: format_calibration_context(*load_calibration(job_id, version))
+        )
     except Exception as e:
-        print(f"Error getting calibration context: {e}")
+        log.error("calibration context failed", job_id=job_id, error=str(e))
         return ""
 
 
+# Identical concurrent scoring requests (double-clicks, parallel tabs) share one Grok call
+_score_flights = SingleFlight("score")
+
+
+def _score_with_client(
+    client: Client,
+    candidate_description: str,
+    job_requirements: str,
+    calibration_context: str,
+    model: str = SCORING_MODEL
+) -> CandidateScore:
+    """Score with an existing client, coalescing identical in-flight requests."""
+    key = flight_key(model, candidate_description, job_requirements, calibration_context)
+    return _score_flights.do(
+        key, _parse_score, client, candidate_description, job_requirements, calibration_context, model
+    )
+
+
+# Scores only change when the prompt or the job's feedback (its JobCache generation) does
+_score_cache = JobCache(max_entries=SCORE_CACHE_SIZE)
+
+
+def _cached_score(
+    client: Client,
+    job_id: Optional[str],
+    candidate_description: str,
+    job_requirements: str,
+    calibration_context: str,
+    model: str = SCORING_MODEL
+) -> Tuple[CandidateScore, bool]:
+    """
+    Score through the memo, returning (score, whether it came from the cache).
+    
+    Entries are dropped as soon as new feedback for job_id changes its
+    calibration; failed calls are not cached.
+    """
+    key = flight_key(model, candidate_description, job_requirements, calibration_context)
+    computed = []
+    
+    def compute() -> CandidateScore:
+        computed.append(True)
+        return _score_with_client(client, candidate_description, job_requirements, calibration_context, model)
+    
+    try:
+        result = _score_cache.get(job_id or "", key, compute)
+    except sqlite3.Error as e:
+        # The feedback store is only needed for invalidation; scoring must not depend on it
+        log.error("score cache failed", job_id=job_id, error=str(e))
+        result = compute()
+    SCORE_CACHE_TOTAL.inc(result="miss" if computed else "hit")
+    return result, not computed
+
+
+def _parse_score(
+    client: Client,
+    candidate_description: str,
+    job_requirements: str,
+    calibration_context: str,
+    model: str = SCORING_MODEL
+) -> CandidateScore:
+    """Run one structured Grok scoring call with an existing client."""
+    chat = client.chat.create(model=model)
+
+    user_prompt = f"""Please evaluate this candidate for the given job requirements and provide a score from 0-100:
+
+JOB REQUIREMENTS:
+{job_requirements}
+
+CANDIDATE DESCRIPTION:
+{candidate_description}"""
+
+    chat.append(system(SYSTEM_PROMPT + calibration_context))
+    chat.append(user(user_prompt))
+    
+    # The parse method returns a tuple of the full response object as well as the parsed pydantic object
+    with track_upstream("grok", model):
+        response, candidate_score = chat.parse(CandidateScore)
+    candidate_score._total_tokens = response.usage.total_tokens
+    
+    return candidate_score
+
+
+def _timed_score(*args) -> Tuple[CandidateScore, bool, float]:
+    """_cached_score plus its latency in milliseconds."""
+    started = time.perf_counter()
+    result, cached = _cached_score(*args)
+    return result, cached, (time.perf_counter() - started) * 1000
+
+
+def _cascade_score(
+    client: Client,
+    job_id: Optional[str],
+    candidate_description: str,
+    job_requirements: str,
+    calibration_context: str,
+    shortlist_threshold: Optional[int] = None,
+    candidate_id: Optional[str] = None
+) -> TieredScore:
+    """
+    Score with FAST_SCORING_MODEL, escalating to SCORING_MODEL near the shortlist threshold.
+    
+    Clear accepts and rejects keep the fast score. A CASCADE_AUDIT_RATE sample of
+    them is also scored by SCORING_MODEL, which wins if the two disagree by more
+    than CASCADE_TOLERANCE; audits are recorded as shadow scores (see /api/shadow).
+    """
+    threshold = SHORTLIST_THRESHOLD if shortlist_threshold is None else shortlist_threshold
+    args = (client, job_id, candidate_description, job_requirements, calibration_context)
+    fast, fast_cached, fast_latency_ms = _timed_score(*args, FAST_SCORING_MODEL)
+    
+    near_boundary = abs(fast.score - threshold) <= CASCADE_BAND
+    audit = not near_boundary and random.random() < CASCADE_AUDIT_RATE
+    if not (near_boundary or audit):
+        SCORE_CASCADE_TOTAL.inc(outcome="fast")
+        return TieredScore(score=fast.score, scoring_model=FAST_SCORING_MODEL, fast_score=fast.score)
+    
+    full, full_cached, full_latency_ms = _timed_score(*args, SCORING_MODEL)
+    escalate = near_boundary or abs(full.score - fast.score) > CASCADE_TOLERANCE
+    
+    if audit:
+        SCORE_CASCADE_TOTAL.inc(outcome="audit_escalated" if escalate else "audit_agreed")
+        # Cached scores have no meaningful latency or token cost to compare
+        if not (fast_cached or full_cached):
+            try:
+                record_shadow_score(
+                    job_id=job_id,
+                    candidate_id=candidate_id,
+                    primary_model=FAST_SCORING_MODEL,
+                    shadow_model=SCORING_MODEL,
+                    primary_score=fast.score,
+                    shadow_score=full.score,
+                    primary_latency_ms=fast_latency_ms,
+                    shadow_latency_ms=full_latency_ms,
+                    primary_tokens=fast._total_tokens,
+                    shadow_tokens=full._total_tokens
+                )
+            except Exception as e:
+                log.error("cascade audit record failed", job_id=job_id, error=str(e))
+    else:
+        SCORE_CASCADE_TOTAL.inc(outcome="boundary")
+    
+    chosen, model = (full, SCORING_MODEL) if escalate else (fast, FAST_SCORING_MODEL)
+    return TieredScore(score=chosen.score, scoring_model=model, fast_score=fast.score)
+
+
+def _resolve_calibration_mode(calibration_mode: Optional[str]) -> str:
+    mode = calibration_mode or SCORE_CALIBRATION
+    if mode not in CALIBRATION_MODES:
+        raise ValueError(f"Unknown calibration mode: {mode}. Must be one of {', '.join(CALIBRATION_MODES)}.")
+    return mode
+
+
+def _load_score_mapping(job_id: Optional[str]) -> Optional[ScoreMapping]:
+    """The job's fitted score mapping, or None if it has too little feedback."""
+    try:
+        return get_score_mapping(job_id)
+    except Exception as e:
+        log.error("score mapping failed", job_id=job_id, error=str(e))
+        return None
+
+
+def _apply_mapping(result: CandidateScore, mapping: Optional[ScoreMapping]) -> CandidateScore:
+    """Map a raw score through the job's calibration, if it has one."""
+    if mapping is None:
+        return result
+    return CalibratedScore(score=mapping(result.score), raw_score=result.score)
+
+
+def _scoring_setup(
+    job_id: Optional[str],
+    calibration_mode: Optional[str],
+    calibration: Optional[Tuple[Optional[dict], Optional[dict]]] = None
+) -> Tuple[Optional[ScoreMapping], str, str]:
+    """
+    Resolve how a job's candidates are scored: (numeric mapping or None, model, calibration context).
+    
+    When the numeric mapping applies it replaces the prompt guidance, so the
+    context is empty. Preloaded (metrics, stats) from load_calibration are
+    formatted as-is; otherwise the cached context for job_id is used.
+    """
+    mode = _resolve_calibration_mode(calibration_mode)
+    mapping = _load_score_mapping(job_id) if mode == "numeric" else None
+    model = FAST_SCORING_MODEL if mode == "numeric" else SCORING_MODEL
+    if mapping is not None:
+        return mapping, model, ""
+    if calibration is None:
+        return mapping, model, get_calibration_context(job_id)
+    return mapping, model, format_calibration_context(*calibration)
+
+
+_shadow_executor = ThreadPoolExecutor(max_workers=SHADOW_WORKERS, thread_name_prefix="shadow")
+_shadow_slots = threading.BoundedSemaphore(SHADOW_MAX_PENDING)
+
+
+def _run_shadow(
+    client: Client,
+    candidate_description: str,
+    job_requirements: str,
+    calibration_context: str,
+    job_id: Optional[str],
+    candidate_id: Optional[str],
+    primary_model: str,
+    primary: CandidateScore,
+    primary_latency_ms: float
+) -> None:
+    """Score with SHADOW_MODEL on the same prompt and record the comparison."""
+    try:
+        shadow, error = None, None
+        started = time.perf_counter()
+        try:
+            shadow = _parse_score(client, candidate_description, job_requirements, calibration_context, SHADOW_MODEL)
+        except Exception as e:
+            error = str(e)
+        shadow_latency_ms = (time.perf_counter() - started) * 1000
+        
+        record_shadow_score(
+            job_id=job_id,
+            candidate_id=candidate_id,
+            primary_model=primary_model,
+            shadow_model=SHADOW_MODEL,
+            primary_score=primary.score,
+            shadow_score=shadow.score if shadow else None,
+            primary_latency_ms=primary_latency_ms,
+            shadow_latency_ms=shadow_latency_ms,
+            primary_tokens=primary._total_tokens,
+            shadow_tokens=shadow._total_tokens if shadow else None,
+            error=error
+        )
+    except Exception as e:
+        log.error("shadow scoring failed", job_id=job_id, error=str(e))
+    finally:
+        _shadow_slots.release()
+
+
+def _maybe_shadow(primary_model: str, **kwargs) -> None:
+    """Queue a shadow comparison for a sampled fraction of requests, never blocking the caller."""
+    if not SHADOW_MODEL or SHADOW_MODEL == primary_model or random.random() >= SHADOW_SAMPLE_RATE:
+        return
+    if not _shadow_slots.acquire(blocking=False):
+        return
+    try:
+        submit_tracked(_shadow_executor, "shadow", _run_shadow, primary_model=primary_model, **kwargs)
+    except Exception as e:
+        _shadow_slots.release()
+        log.error("shadow scoring failed", job_id=kwargs.get('job_id'), error=str(e))
+
+
 def rank_candidate(
     candidate_description: str, 
     job_requirements: str,
-    job_id: Optional[str] = None
+    job_id: Optional[str] = None,
+    calibration_mode: Optional[str] = None,
+    candidate_id: Optional[str] = None,
+    cascade: Optional[bool] = None,
+    shortlist_threshold: Optional[int] = None
 ) -> CandidateScore:
     """
     Ranks a candidate based on their description against job requirements.
     
     Uses RL feedback from recruiter reviews to self-improve scoring accuracy.
+    Repeat calls for the same candidate and job reuse the previous score until
+    new feedback for job_id changes the calibration.
     
     Args:
         candidate_description: Information about the candidate (skills, experience, background, etc.)
         job_requirements: The job requirements and criteria
         job_id: Optional job ID to load calibration data for self-improving scoring
+        calibration_mode: 'prompt' or 'numeric' (default: SCORE_CALIBRATION)
+        candidate_id: Optional candidate ID, used to match shadow scores with later feedback
+        cascade: Score with the fast model first and escalate near the shortlist
+            threshold (default: SCORE_CASCADE); ignored when the numeric mapping applies
+        shortlist_threshold: Score separating shortlisted candidates for the cascade
+            (default: SHORTLIST_THRESHOLD)
         
     Returns:
-        CandidateScore object with score field (0-100)
+        CandidateScore object with score field (0-100); a CalibratedScore
+        (with raw_score) when the numeric mapping was applied, or a TieredScore
+        (with scoring_model and fast_score) from the cascade
     """
+    # Get calibration context from RL feedback (self-improving!), unless the numeric mapping replaces it
+    mapping, model, calibration_context = _scoring_setup(job_id, calibration_mode)
     client = Client(api_key=os.getenv("XAI_API_KEY"))
-    chat = client.chat.create(model="grok-4")
     
-    # Get calibration context from RL feedback (self-improving!)
-    calibration_context = get_calibration_context(job_id)
+    if mapping is None and (SCORE_CASCADE if cascade is None else cascade):
+        return _cascade_score(
+            client, job_id, candidate_description, job_requirements, calibration_context,
+            shortlist_threshold, candidate_id
+        )
     
-    system_prompt = f"""You are an expert technical recruiter and hiring manager. 
-Your task is to evaluate candidates against job requirements and provide a numerical score.
+    started = time.perf_counter()
+    result, cached = _cached_score(client, job_id, candidate_description, job_requirements, calibration_context, model)
+    latency_ms = (time.perf_counter() - started) * 1000
+    
+    # A cached score cost no Grok call, so there is nothing to compare a shadow model against
+    if not cached:
+        _maybe_shadow(
+            model,
+            client=client,
+            candidate_description=candidate_description,
+            job_requirements=job_requirements,
+            calibration_context=calibration_context,
+            job_id=job_id,
+            candidate_id=candidate_id,
+            primary=result,
+            primary_latency_ms=latency_ms
+        )
+    
+    return _apply_mapping(result, mapping)
 
-Scoring criteria:
-- 90-100: Exceptional fit, exceeds requirements
-- 75-89: Strong fit, meets all key requirements
-- 60-74: Good fit, meets most requirements with minor gaps
-- 40-59: Moderate fit, has relevant experience but significant gaps
-- 20-39: Poor fit, lacks many key requirements
-- 0-19: Not qualified for this role
 
-Be thorough, fair, and objective in your evaluation.{calibration_context}"""
+def rank_candidates(
+    candidate_descriptions: List[str],
+    job_requirements: str,
+    job_id: Optional[str] = None,
+    calibration: Optional[Tuple[Optional[dict], Optional[dict]]] = None,
+    max_workers: int = RANK_BATCH_WORKERS,
+    calibration_mode: Optional[str] = None,
+    cascade: Optional[bool] = None,
+    shortlist_threshold: Optional[int] = None
+) -> Iterator[Tuple[int, Optional[CandidateScore], Optional[str]]]:
+    """
+    Score many candidates for one job concurrently, yielding results as they complete.
+    
+    Calibration is loaded once and a single client is shared by all calls.
+    Candidates scored before under the same calibration come from the score cache.
+    
+    Args:
+        candidate_descriptions: Candidate descriptions to score
+        job_requirements: The job requirements and criteria
+        job_id: Optional job ID to load calibration data for self-improving scoring
+        calibration: Optional preloaded (metrics, stats) from load_calibration
+        max_workers: Maximum concurrent Grok calls
+        calibration_mode: 'prompt' or 'numeric' (default: SCORE_CALIBRATION)
+        cascade: Use the fast/full model cascade (default: SCORE_CASCADE), as in rank_candidate
+        shortlist_threshold: Shortlist threshold for the cascade (default: SHORTLIST_THRESHOLD)
+        
+    Yields:
+        Tuples of (index into candidate_descriptions, CandidateScore or None, error or None)
+    """
+    mapping, model, calibration_context = _scoring_setup(job_id, calibration_mode, calibration)
+    client = Client(api_key=os.getenv("XAI_API_KEY"))
+    use_cascade = mapping is None and (SCORE_CASCADE if cascade is None else cascade)
+    
+    def score(description: str) -> CandidateScore:
+        if use_cascade:
+            return _cascade_score(
+                client, job_id, description, job_requirements, calibration_context, shortlist_threshold
+            )
+        return _cached_score(client, job_id, description, job_requirements, calibration_context, model)[0]
+    
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(candidate_descriptions))))
+    try:
+        future_to_index = {
+            submit_tracked(executor, "rank_batch", score, description): index
+            for index, description in enumerate(candidate_descriptions)
+        }
+
+        for future in as_completed(future_to_index):
+            index = future_to_index[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                log.warning("batch scoring failed", job_id=job_id, index=index, error=str(e))
+                yield index, None, str(e)
+            else:
+                yield index, _apply_mapping(result, mapping), None
+    finally:
+        # Stop queued work if the consumer goes away (e.g. client disconnect)
+        executor.shutdown(wait=False, cancel_futures=True)
 
-    user_prompt = f"""Please evaluate this candidate for the given job requirements and provide a score from 0-100:
+
+def _compact_summary(candidate_description: str, limit: int = LISTWISE_SUMMARY_CHARS) -> str:
+    """Collapse whitespace and trim a description for a listwise prompt."""
+    text = " ".join(candidate_description.split())
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+def _parse_listwise(
+    client: Client,
+    candidate_descriptions: List[str],
+    job_requirements: str,
+    calibration_context: str,
+    model: str = SCORING_MODEL
+) -> dict:
+    """Score a list of candidates in one structured Grok call, returning {position: score}."""
+    chat = client.chat.create(model=model)
+    
+    candidates = "\n\n".join(
+        f"[{position}] {_compact_summary(description)}" for position, description in enumerate(candidate_descriptions)
+    )
+    user_prompt = f"""Please evaluate each of these {len(candidate_descriptions)} candidates for the given job requirements and provide a score from 0-100 for each:
 
 JOB REQUIREMENTS:
 {job_requirements}
 
-CANDIDATE DESCRIPTION:
-{candidate_description}"""
+CANDIDATES:
+{candidates}"""
 
-    chat.append(system(system_prompt))
+    chat.append(system(SYSTEM_PROMPT + calibration_context + LISTWISE_INSTRUCTIONS))
     chat.append(user(user_prompt))
     
-    # The parse method returns a tuple of the full response object as well as the parsed pydantic object
-    response, candidate_score = chat.parse(CandidateScore)
+    with track_upstream("grok", f"{model}:listwise"):
+        _, parsed = chat.parse(ListwiseScores)
     
-    return candidate_score
+    scores = {}
+    for entry in parsed.scores:
+        # Ignore numbers the model invented; the first score for a candidate wins
+        if 0 <= entry.index < len(candidate_descriptions):
+            scores.setdefault(entry.index, entry.score)
+    return scores
+
+
+def rank_candidates_listwise(
+    candidate_descriptions: List[str],
+    job_requirements: str,
+    job_id: Optional[str] = None,
+    calibration: Optional[Tuple[Optional[dict], Optional[dict]]] = None,
+    calibration_mode: Optional[str] = None,
+    batch_size: int = LISTWISE_BATCH_SIZE,
+    max_workers: int = RANK_BATCH_WORKERS
+) -> Iterator[Tuple[int, Optional[CandidateScore], Optional[str]]]:
+    """
+    Score many candidates for one job with one Grok call per batch_size candidates.
+    
+    The job requirements and calibration guidance are sent once per call with
+    compact candidate summaries, instead of once per candidate as in
+    rank_candidates. Candidates the model leaves out of its answer, or whose
+    batch call fails, are scored individually.
+    
+    Args:
+        candidate_descriptions: Candidate descriptions to score
+        job_requirements: The job requirements and criteria
+        job_id: Optional job ID to load calibration data for self-improving scoring
+        calibration: Optional preloaded (metrics, stats) from load_calibration
+        calibration_mode: 'prompt' or 'numeric' (default: SCORE_CALIBRATION)
+        batch_size: Most candidates per Grok call
+        max_workers: Maximum concurrent Grok calls
+        
+    Yields:
+        Tuples of (index into candidate_descriptions, CandidateScore or None, error or None),
+        a batch at a time
+    """
+    mapping, model, calibration_context = _scoring_setup(job_id, calibration_mode, calibration)
+    client = Client(api_key=os.getenv("XAI_API_KEY"))
+    batch_size = max(1, batch_size)
+    batches = [
+        list(range(start, min(start + batch_size, len(candidate_descriptions))))
+        for start in range(0, len(candidate_descriptions), batch_size)
+    ]
+    
+    def score_batch(indices: List[int]) -> List[Tuple[int, Optional[CandidateScore], Optional[str]]]:
+        descriptions = [candidate_descriptions[index] for index in indices]
+        try:
+            scores = _parse_listwise(client, descriptions, job_requirements, calibration_context, model)
+        except Exception as e:
+            log.warning("listwise scoring failed", job_id=job_id, candidates=len(indices), error=str(e))
+            scores = {}
+        
+        results = []
+        for position, index in enumerate(indices):
+            if position in scores:
+                result = CandidateScore(score=scores[position])
+            else:
+                try:
+                    result = _cached_score(
+                        client, job_id, descriptions[position], job_requirements, calibration_context, model
+                    )[0]
+                except Exception as e:
+                    results.append((index, None, str(e)))
+                    continue
+            results.append((index, _apply_mapping(result, mapping), None))
+        return results
+    
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches))))
+    try:
+        futures = [submit_tracked(executor, "rank_listwise", score_batch, indices) for indices in batches]
+        for future in as_completed(futures):
+            yield from future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,213 @@
+"""
+Offline replay of the RL policy update over reward_log.
+
+Loads reward_log once into NumPy arrays and replays the update_policy_state
+recurrence for a grid of LEARNING_RATE / DECAY_FACTOR / MIN_WEIGHT values,
+vectorized across the grid and across jobs. Each grid point is scored by
+how well error_avg before a rating predicts that rating's |delta|.
+Offline tool only; requires numpy (the "replay" extra), which the web apps
+do not import.
+
+Run from backend/ with: python -m RLloop.policy_replay --learning-rates 0.05,0.1,0.2 --decay-factors 0.9,0.95,0.99
+"""
+
+import argparse
+import itertools
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from RLloop.rl_feedback import get_db_connection, get_archive_connection, LEARNING_RATE, DECAY_FACTOR, MIN_WEIGHT
+
+
+def load_reward_matrix(job_ids: Optional[List[str]] = None) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Load reward_log deltas, including archived rows, into a padded (jobs x ratings) matrix.
+
+    Args:
+        job_ids: Jobs to load (default: every job in reward_log)
+
+    Returns:
+        Tuple of (job_ids, deltas, mask). deltas[j, t] is the t-th delta for
+        job j in the order ratings were logged; mask marks real entries.
+    """
+    query = "SELECT job_id, created_at, id, delta FROM reward_log"
+    params: tuple = ()
+    if job_ids:
+        query += f" WHERE job_id IN ({','.join('?' * len(job_ids))})"
+        params = tuple(job_ids)
+    rows = get_db_connection().execute(query, params).fetchall()
+    archive = get_archive_connection()
+    if archive is not None:
+        rows += archive.execute(query, params).fetchall()
+    rows.sort()
+
+    if not rows:
+        return [], np.zeros((0, 0)), np.zeros((0, 0), dtype=bool)
+
+    jobs = np.array([row[0] for row in rows], dtype=object)
+    deltas = np.array([row[3] for row in rows], dtype=float)
+
+    # Rows are grouped by job, so each job's position is its offset from the group start
+    starts = np.flatnonzero(np.r_[True, jobs[1:] != jobs[:-1]])
+    lengths = np.diff(np.r_[starts, len(rows)])
+    job_index = np.repeat(np.arange(len(starts)), lengths)
+    position = np.arange(len(rows)) - np.repeat(starts, lengths)
+
+    matrix = np.zeros((len(starts), lengths.max()))
+    mask = np.zeros(matrix.shape, dtype=bool)
+    matrix[job_index, position] = deltas
+    mask[job_index, position] = True
+    return list(jobs[starts]), matrix, mask
+
+
+def parameter_grid(
+    learning_rates: Iterable[float],
+    decay_factors: Iterable[float],
+    min_weights: Iterable[float]
+) -> np.ndarray:
+    """Cartesian product of hyperparameters as a (grid_size x 3) array."""
+    return np.array(list(itertools.product(learning_rates, decay_factors, min_weights)), dtype=float)
+
+
+def replay(deltas: np.ndarray, mask: np.ndarray, grid: np.ndarray) -> dict:
+    """
+    Replay the policy recurrence for every grid point and job at once.
+
+    Matches update_policy_state: the first rating sets error_avg = |delta| and
+    weight = 1 / (1 + |delta|); later ratings set
+    error_avg = (1 - lr) * error_avg * decay + lr * |delta| and
+    weight = max(min_weight, 1 / (1 + error_avg)).
+
+    Args:
+        deltas: (jobs x ratings) matrix from load_reward_matrix
+        mask: Matching mask of real entries
+        grid: (grid_size x 3) array of (learning_rate, decay_factor, min_weight)
+
+    Returns:
+        Dictionary with (grid x jobs x ratings) arrays 'error_avg' and 'weight'
+        (state after each rating; padding repeats the last state), plus
+        'prediction_mae', 'prediction_rmse' and 'weight_correlation' per grid point
+    """
+    lr = grid[:, 0, None]
+    decay = grid[:, 1, None]
+    min_weight = grid[:, 2, None]
+    abs_deltas = np.abs(deltas)
+    n_grid, (n_jobs, n_steps) = len(grid), deltas.shape
+
+    error_avg = np.zeros((n_grid, n_jobs, n_steps))
+    weight = np.ones((n_grid, n_jobs, n_steps))
+    err = np.zeros((n_grid, n_jobs))
+    w = np.ones((n_grid, n_jobs))
+
+    # The recurrence is sequential in time; every grid point and job advances together
+    for t in range(n_steps):
+        observed = abs_deltas[:, t]
+        active = mask[:, t]
+        updated = (1 - lr) * err * decay + lr * observed
+        updated_weight = np.maximum(min_weight, 1.0 / (1.0 + updated))
+        if t == 0:
+            updated, updated_weight = np.broadcast_to(observed, err.shape), 1.0 / (1.0 + observed)
+        err = np.where(active, updated, err)
+        w = np.where(active, updated_weight, w)
+        error_avg[:, :, t] = err
+        weight[:, :, t] = w
+
+    # State after rating t-1 is the forecast for rating t
+    forecast_mask = mask[:, 1:]
+    target = abs_deltas[:, 1:]
+    residual = np.where(forecast_mask, error_avg[:, :, :-1] - target, 0.0)
+    count = max(int(forecast_mask.sum()), 1)
+
+    return {
+        'error_avg': error_avg,
+        'weight': weight,
+        'prediction_mae': np.abs(residual).sum(axis=(1, 2)) / count,
+        'prediction_rmse': np.sqrt((residual ** 2).sum(axis=(1, 2)) / count),
+        'weight_correlation': _masked_correlation(weight[:, :, :-1], target, forecast_mask)
+    }
+
+
+def _masked_correlation(x: np.ndarray, y: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Pearson correlation of x (grid x jobs x steps) with y (jobs x steps) over mask, per grid point."""
+    n = mask.sum()
+    if n < 2:
+        return np.full(len(x), np.nan)
+    y_centered = np.where(mask, y - y[mask].mean(), 0.0)
+    x_mean = np.where(mask, x, 0.0).sum(axis=(1, 2)) / n
+    x_centered = np.where(mask, x - x_mean[:, None, None], 0.0)
+    covariance = (x_centered * y_centered).sum(axis=(1, 2))
+    scale = np.sqrt((x_centered ** 2).sum(axis=(1, 2)) * (y_centered ** 2).sum())
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return covariance / scale
+
+
+def sweep(
+    learning_rates: Iterable[float],
+    decay_factors: Iterable[float],
+    min_weights: Iterable[float],
+    job_ids: Optional[List[str]] = None
+) -> List[dict]:
+    """
+    Replay reward_log for every hyperparameter combination.
+
+    Returns:
+        One dict per grid point, best prediction_mae first, with the
+        hyperparameters, forecast errors, weight/|delta| correlation and the
+        final error_avg/weight per job
+    """
+    jobs, deltas, mask = load_reward_matrix(job_ids)
+    grid = parameter_grid(learning_rates, decay_factors, min_weights)
+    if not jobs:
+        return []
+
+    result = replay(deltas, mask, grid)
+    last = mask.sum(axis=1) - 1
+    final_error = result['error_avg'][:, np.arange(len(jobs)), last]
+    final_weight = result['weight'][:, np.arange(len(jobs)), last]
+
+    report = [
+        {
+            'learning_rate': float(lr),
+            'decay_factor': float(decay),
+            'min_weight': float(min_weight),
+            'prediction_mae': round(float(result['prediction_mae'][i]), 2),
+            'prediction_rmse': round(float(result['prediction_rmse'][i]), 2),
+            'weight_correlation': round(float(result['weight_correlation'][i]), 3),
+            'final_state': {
+                job: {'error_avg': float(final_error[i, j]), 'weight': float(final_weight[i, j])}
+                for j, job in enumerate(jobs)
+            }
+        }
+        for i, (lr, decay, min_weight) in enumerate(grid)
+    ]
+    return sorted(report, key=lambda entry: entry['prediction_mae'])
+
+
+def _floats(value: str) -> List[float]:
+    return [float(part) for part in value.split(',') if part.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay reward_log over a grid of RL hyperparameters")
+    parser.add_argument('--learning-rates', type=_floats, default=[0.05, LEARNING_RATE, 0.2, 0.3])
+    parser.add_argument('--decay-factors', type=_floats, default=[0.9, DECAY_FACTOR, 0.99, 1.0])
+    parser.add_argument('--min-weights', type=_floats, default=[MIN_WEIGHT])
+    parser.add_argument('--job', action='append', dest='jobs', help="Restrict to a job (repeatable)")
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    report = sweep(args.learning_rates, args.decay_factors, args.min_weights, args.jobs)
+    if not report:
+        print("No rewards logged yet.")
+    else:
+        print(f"{'lr':>6} {'decay':>6} {'min_w':>6} {'mae':>8} {'rmse':>8} {'w~|d|':>7}")
+        for entry in report[:args.top]:
+            current = (entry['learning_rate'], entry['decay_factor'], entry['min_weight']) == (
+                LEARNING_RATE, DECAY_FACTOR, MIN_WEIGHT
+            )
+            print(
+                f"{entry['learning_rate']:>6.3f} {entry['decay_factor']:>6.3f} {entry['min_weight']:>6.3f} "
+                f"{entry['prediction_mae']:>8.2f} {entry['prediction_rmse']:>8.2f} "
+                f"{entry['weight_correlation']:>7.3f}{'  (current)' if current else ''}"
+            )
@@ -10,13 +10,36 @@ This module implements the reinforcement learning feedback loop:
 The system learns from recruiter corrections to improve scoring accuracy over time.
 """
 
+import atexit
+import json
+import logging
+import os
+import queue
 import sqlite3
-from typing import Tuple, Optional
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Hashable, Iterator, List, Tuple, Optional, Union
 from pathlib import Path
 import math
 
 # Database path (adjust if needed)
 DB_PATH = Path(__file__).parent.parent.parent / "data" / "recruiter.db"
+# Where connections go: a file path, a SQLite 'file:' URI (e.g. an in-memory
+# 'file:/name?vfs=memdb') or a zero-argument connection factory. Set with
+# RECRUITER_DB or configure_database().
+DATABASE: Union[str, Callable[[], sqlite3.Connection]] = os.getenv('RECRUITER_DB', str(DB_PATH))
+
+
+def _default_archive(database: Union[str, Callable[[], sqlite3.Connection]]) -> Optional[Path]:
+    """recruiter.db archives to recruiter_archive.db beside it; URIs and factories need one configured."""
+    if callable(database) or database == ':memory:' or database.startswith('file:'):
+        return None
+    path = Path(database)
+    return path.with_name(f"{path.stem}_archive{path.suffix}")
+
 
 # Star to score mapping (1-5 stars -> 0-100)
 STAR_MAP = {
@@ -32,28 +55,748 @@ LEARNING_RATE = 0.1  # How quickly the model adapts to new feedback
 DECAY_FACTOR = 0.95  # Exponential decay for older samples
 MIN_WEIGHT = 0.01    # Minimum policy weight
 
+# SQLite tuning. The Next.js/drizzle app writes the same file concurrently.
+BUSY_TIMEOUT_MS = 5000        # How long SQLite waits on a lock before failing
+STATEMENT_CACHE_SIZE = 256    # Prepared statements cached per connection
+LOCK_RETRIES = 5              # Extra attempts when the database is still locked
+LOCK_RETRY_BACKOFF = 0.05     # Seconds, doubled on each retry
+
+# Write-behind feedback queue (see FeedbackWriter)
+FEEDBACK_GROUP_MAX = 500      # Most ratings committed in one group transaction
+FEEDBACK_GROUP_WAIT = 0.05    # Seconds to wait for more ratings before committing a group
+# 'normal' relies on WAL with synchronous=NORMAL; 'full' fsyncs every group commit
+FEEDBACK_DURABILITY = os.getenv('FEEDBACK_DURABILITY', 'normal')
+# Default for /api/feedback when the request does not choose; '1' acknowledges before writing
+FEEDBACK_ASYNC = os.getenv('FEEDBACK_ASYNC', '').lower() in ('1', 'true', 'yes')
+
+# reward_log compaction (see compact_reward_log)
+REWARD_RETENTION_DAYS = int(os.getenv('REWARD_RETENTION_DAYS', '180'))
+# Archive file for compacted rows (None: no archive). Set with REWARD_ARCHIVE_DB or configure_database().
+ARCHIVE_DB_PATH: Optional[Path] = (
+    Path(os.environ['REWARD_ARCHIVE_DB']) if os.getenv('REWARD_ARCHIVE_DB') else _default_archive(DATABASE)
+)
+DELTA_BUCKET = 10             # Width of the delta histogram buckets in reward_summary
+
+# Ratings needed before a job's isotonic score mapping is trusted
+MIN_MAPPING_SAMPLES = 5
+
+log = logging.getLogger("recruiter.rl_feedback")
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+# Running per-job aggregates of reward_log deltas, maintained by triggers inside
+# the same transaction as each reward_log write.
+CALIBRATION_STATS_SCHEMA = (
+    """
+        CREATE TABLE IF NOT EXISTS calibration_stats (
+            job_id TEXT PRIMARY KEY,
+            sample_count INTEGER NOT NULL DEFAULT 0,
+            sum_delta REAL NOT NULL DEFAULT 0,
+            sum_abs_delta REAL NOT NULL DEFAULT 0,
+            sum_sq_delta REAL NOT NULL DEFAULT 0
+        )
+    """,
+    """
+        CREATE TRIGGER IF NOT EXISTS trg_reward_log_stats_insert
+        AFTER INSERT ON reward_log
+        BEGIN
+            INSERT INTO calibration_stats (job_id, sample_count, sum_delta, sum_abs_delta, sum_sq_delta)
+            VALUES (NEW.job_id, 1, NEW.delta, ABS(NEW.delta), NEW.delta * NEW.delta)
+            ON CONFLICT(job_id) DO UPDATE SET
+                sample_count = sample_count + 1,
+                sum_delta = sum_delta + excluded.sum_delta,
+                sum_abs_delta = sum_abs_delta + excluded.sum_abs_delta,
+                sum_sq_delta = sum_sq_delta + excluded.sum_sq_delta;
+        END;
+    """,
+    """
+        CREATE TRIGGER IF NOT EXISTS trg_reward_log_stats_delete
+        AFTER DELETE ON reward_log
+        BEGIN
+            UPDATE calibration_stats SET
+                sample_count = sample_count - 1,
+                sum_delta = sum_delta - OLD.delta,
+                sum_abs_delta = sum_abs_delta - ABS(OLD.delta),
+                sum_sq_delta = sum_sq_delta - OLD.delta * OLD.delta
+            WHERE job_id = OLD.job_id;
+            DELETE FROM calibration_stats WHERE job_id = OLD.job_id AND sample_count <= 0;
+        END;
+    """,
+    """
+        CREATE TRIGGER IF NOT EXISTS trg_reward_log_stats_update
+        AFTER UPDATE OF job_id, delta ON reward_log
+        BEGIN
+            UPDATE calibration_stats SET
+                sample_count = sample_count - 1,
+                sum_delta = sum_delta - OLD.delta,
+                sum_abs_delta = sum_abs_delta - ABS(OLD.delta),
+                sum_sq_delta = sum_sq_delta - OLD.delta * OLD.delta
+            WHERE job_id = OLD.job_id;
+            DELETE FROM calibration_stats WHERE job_id = OLD.job_id AND sample_count <= 0;
+            INSERT INTO calibration_stats (job_id, sample_count, sum_delta, sum_abs_delta, sum_sq_delta)
+            VALUES (NEW.job_id, 1, NEW.delta, ABS(NEW.delta), NEW.delta * NEW.delta)
+            ON CONFLICT(job_id) DO UPDATE SET
+                sample_count = sample_count + 1,
+                sum_delta = sum_delta + excluded.sum_delta,
+                sum_abs_delta = sum_abs_delta + excluded.sum_abs_delta,
+                sum_sq_delta = sum_sq_delta + excluded.sum_sq_delta;
+        END;
+    """,
+)
+
+
+# Per-job change counter bumped by every write to reward_log or policy_state,
+# so caches in any process can tell when a job's calibration changed.
+_GENERATION_BUMP = """
+            INSERT INTO job_generation (job_id, generation) VALUES ({job}, 1)
+            ON CONFLICT(job_id) DO UPDATE SET generation = generation + 1;"""
+
+JOB_GENERATION_SCHEMA = (
+    """
+        CREATE TABLE IF NOT EXISTS job_generation (
+            job_id TEXT PRIMARY KEY,
+            generation INTEGER NOT NULL DEFAULT 0
+        )
+    """,
+) + tuple(
+    f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_generation_{event.lower()}
+        AFTER {event} ON {table}
+        BEGIN{_GENERATION_BUMP.format(job=row + '.job_id')}
+        END;
+    """
+    for table in ('reward_log', 'policy_state')
+    for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD'))
+) + (
+    # A row moved between jobs changes both of them
+    """
+        CREATE TRIGGER IF NOT EXISTS trg_reward_log_generation_move
+        AFTER UPDATE OF job_id ON reward_log
+        WHEN OLD.job_id IS NOT NEW.job_id
+        BEGIN""" + _GENERATION_BUMP.format(job='OLD.job_id') + """
+        END;
+    """,
+)
+
+
+# Aggregates and histograms of reward_log rows moved to the archive database.
+# calibration_stats keeps counting them, so full-history metrics are unchanged.
+REWARD_SUMMARY_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS reward_summary (
+        job_id TEXT PRIMARY KEY,
+        sample_count INTEGER NOT NULL DEFAULT 0,
+        sum_delta REAL NOT NULL DEFAULT 0,
+        sum_abs_delta REAL NOT NULL DEFAULT 0,
+        sum_sq_delta REAL NOT NULL DEFAULT 0,
+        first_at INTEGER,
+        last_at INTEGER,
+        delta_histogram TEXT NOT NULL DEFAULT '{}',
+        score_histogram TEXT NOT NULL DEFAULT '{}',
+        compacted_at INTEGER
+    )
+"""
+
+# Primary vs shadow model scores from grokScore's shadow mode, one row per sampled request
+SHADOW_SCORES_SCHEMA = (
+    """
+        CREATE TABLE IF NOT EXISTS shadow_scores (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id TEXT,
+            candidate_id TEXT,
+            primary_model TEXT NOT NULL,
+            shadow_model TEXT NOT NULL,
+            primary_score INTEGER NOT NULL,
+            shadow_score INTEGER,
+            primary_latency_ms REAL,
+            shadow_latency_ms REAL,
+            primary_tokens INTEGER,
+            shadow_tokens INTEGER,
+            error TEXT,
+            created_at INTEGER NOT NULL
+        )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_shadow_job ON shadow_scores(job_id, candidate_id)",
+)
+
+ARCHIVE_SCHEMA = (
+    """
+        CREATE TABLE IF NOT EXISTS {db}.reward_log (
+            id INTEGER PRIMARY KEY,
+            candidate_id TEXT NOT NULL,
+            job_id TEXT NOT NULL,
+            ai_score INTEGER NOT NULL,
+            recruiter_score INTEGER NOT NULL,
+            delta INTEGER NOT NULL,
+            created_at INTEGER NOT NULL
+        )
+    """,
+    "CREATE INDEX IF NOT EXISTS {db}.idx_reward_job ON reward_log(job_id, created_at DESC)",
+)
+
+
+# Tables owned by the Next.js/drizzle app (frontend/lib/db/schema.ts) and the RL
+# tables they feed. bootstrap_schema() creates them in an empty database.
+BASE_SCHEMA = (
+    """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT,
+            team TEXT NOT NULL,
+            location TEXT NOT NULL,
+            type TEXT NOT NULL,
+            created_at INTEGER NOT NULL
+        )
+    """,
+    """
+        CREATE TABLE IF NOT EXISTS candidates (
+            id TEXT PRIMARY KEY NOT NULL,
+            job_id TEXT REFERENCES jobs(id),
+            name TEXT NOT NULL,
+            email TEXT,
+            x TEXT NOT NULL,
+            x_avatar_url TEXT,
+            x_avatar TEXT,
+            github TEXT,
+            linkedin TEXT,
+            location TEXT,
+            bio TEXT,
+            followers INTEGER,
+            found_via TEXT,
+            evaluation_reason TEXT,
+            stage TEXT DEFAULT 'discovery' NOT NULL,
+            score REAL,
+            raw_score REAL,
+            research_status TEXT DEFAULT 'pending',
+            research_progress TEXT,
+            research_notes TEXT,
+            raw_research TEXT,
+            interview_status TEXT DEFAULT 'pending',
+            interview_score REAL,
+            interview_transcript TEXT,
+            interview_feedback TEXT,
+            interview_started_at INTEGER,
+            interview_completed_at INTEGER,
+            dm_content TEXT,
+            dm_sent_at INTEGER,
+            recruiter_rating INTEGER,
+            recruiter_feedback TEXT,
+            recruiter_reviewed_at INTEGER,
+            created_at INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL
+        )
+    """,
+    """
+        CREATE TABLE IF NOT EXISTS policy_state (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            weight REAL NOT NULL,
+            created_at INTEGER NOT NULL,
+            error_avg REAL DEFAULT 0.0,
+            sample_count INTEGER DEFAULT 0,
+            FOREIGN KEY (job_id) REFERENCES jobs(id) ON DELETE CASCADE,
+            UNIQUE(job_id, version)
+        )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_policy_job_version ON policy_state(job_id, version DESC)",
+    """
+        CREATE TABLE IF NOT EXISTS reward_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            candidate_id TEXT NOT NULL,
+            job_id TEXT NOT NULL,
+            ai_score INTEGER NOT NULL,
+            recruiter_score INTEGER NOT NULL,
+            delta INTEGER NOT NULL,
+            created_at INTEGER NOT NULL,
+            FOREIGN KEY (candidate_id) REFERENCES candidates(id) ON DELETE CASCADE,
+            FOREIGN KEY (job_id) REFERENCES jobs(id) ON DELETE CASCADE
+        )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_reward_job ON reward_log(job_id, created_at DESC)",
+)
+
+
+def _table_exists(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def _ensure_calibration_stats(conn: sqlite3.Connection) -> bool:
+    """
+    Create the calibration aggregates and triggers, backfilling from reward_log once.
+    Returns False if reward_log does not exist yet.
+    """
+    if not _table_exists(conn, 'reward_log'):
+        return False
+    # Hold the write lock so another process cannot write reward_log between backfill and triggers
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        backfill = not _table_exists(conn, 'calibration_stats')
+        for statement in CALIBRATION_STATS_SCHEMA:
+            conn.execute(statement)
+        if backfill:
+            conn.execute("""
+                INSERT INTO calibration_stats (job_id, sample_count, sum_delta, sum_abs_delta, sum_sq_delta)
+                SELECT job_id, COUNT(*), SUM(delta), SUM(ABS(delta)), SUM(delta * delta)
+                FROM reward_log
+                GROUP BY job_id
+            """)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return True
+
+
+def _ensure_job_generation(conn: sqlite3.Connection) -> bool:
+    """
+    Create the job_generation counters and the triggers that bump them.
+    Returns False if reward_log or policy_state does not exist yet.
+    """
+    if not (_table_exists(conn, 'reward_log') and _table_exists(conn, 'policy_state')):
+        return False
+    with conn:
+        for statement in JOB_GENERATION_SCHEMA:
+            conn.execute(statement)
+    return True
+
+
+def open_connection(check_same_thread: bool = True) -> sqlite3.Connection:
+    """
+    Open a new, untuned connection to the configured DATABASE.
+    
+    Unlike get_db_connection, the caller owns (and must close) it. A
+    connection factory is called as-is and decides threading itself.
+    """
+    if callable(DATABASE):
+        return DATABASE()
+    return sqlite3.connect(
+        DATABASE,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=check_same_thread,
+        uri=DATABASE.startswith('file:')
+    )
+
+
+def _ensure_candidate_raw_score(conn: sqlite3.Connection) -> bool:
+    """
+    Add candidates.raw_score to databases created before the column existed.
+    Returns False if candidates does not exist yet.
+    """
+    if not _table_exists(conn, 'candidates'):
+        return False
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(candidates)")}
+    if 'raw_score' not in columns:
+        with conn:
+            conn.execute("ALTER TABLE candidates ADD COLUMN raw_score REAL")
+    return True
+
+
+def _ensure_rl_schema(conn: sqlite3.Connection) -> bool:
+    """
+    Create the tables and triggers this module derives from reward_log and policy_state.
+    
+    Returns True once all of them exist. Until the app has created its tables,
+    the derived ones are skipped and it returns False, so the next connection
+    tries again.
+    """
+    ready = [
+        _ensure_candidate_raw_score(conn),
+        _ensure_calibration_stats(conn),
+        _ensure_job_generation(conn),
+    ]
+    with conn:
+        conn.execute(REWARD_SUMMARY_SCHEMA)
+        for statement in SHADOW_SCORES_SCHEMA:
+            conn.execute(statement)
+    return all(ready)
+
 
-def get_db_connection():
-    """Create a database connection."""
-    return sqlite3.connect(str(DB_PATH))
+def _connect(check_same_thread: bool = True) -> sqlite3.Connection:
+    """Open a connection with WAL mode and pragmas tuned for concurrent access."""
+    database = DATABASE
+    conn = open_connection(check_same_thread)
+    # In-memory databases stay in 'memory' journal mode, which is fine for tests
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    with _schema_lock:
+        if database not in _schema_ready and _ensure_rl_schema(conn):
+            _schema_ready.add(database)
+    return conn
 
 
+def bootstrap_schema(conn: Optional[sqlite3.Connection] = None) -> None:
+    """
+    Create every table the RL loop uses, including the app's jobs and
+    candidates, in the configured (or given) database. Existing tables are
+    left alone, so this is safe to run against a live database.
+    """
+    conn = conn or get_db_connection()
+    with conn:
+        for statement in BASE_SCHEMA:
+            conn.execute(statement)
+    with _schema_lock:
+        if _ensure_rl_schema(conn):
+            _schema_ready.add(DATABASE)
+
+
+def configure_database(
+    database: Union[str, Path, Callable[[], sqlite3.Connection]],
+    bootstrap: bool = False,
+    archive: Optional[Union[str, Path]] = None
+) -> None:
+    """
+    Point this module at another database and its reward archive.
+    
+    Args:
+        database: File path, SQLite 'file:' URI, or a zero-argument
+            connection factory. Use 'file:/<name>?vfs=memdb' for an
+            in-memory database shared by every connection in the process.
+        bootstrap: Create the full schema (see bootstrap_schema) right away
+        archive: Archive file for compact_reward_log (default: <name>_archive.db
+            beside a database file; none for URIs and factories)
+    
+    Per-thread connections and the state snapshot reconnect on next use.
+    Connections held elsewhere are unaffected.
+    """
+    global DATABASE, ARCHIVE_DB_PATH
+    DATABASE = database if callable(database) else str(database)
+    ARCHIVE_DB_PATH = Path(archive) if archive is not None else _default_archive(DATABASE)
+    _snapshot.close()
+    for cache in _job_caches:
+        cache.clear()
+    if bootstrap:
+        bootstrap_schema()
+
+
+def get_db_connection() -> sqlite3.Connection:
+    """
+    Get this thread's database connection, opening it on first use.
+    
+    Connections are reused across calls on the same thread, so callers
+    must not close them. Use `with conn:` to commit or roll back.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.database != DATABASE:
+        if conn is not None:
+            conn.close()
+        conn = _connect()
+        _local.conn = conn
+        _local.database = DATABASE
+    return conn
+
+
+def close_db_connection() -> None:
+    """Close this thread's connections, if any (e.g. on worker shutdown)."""
+    for attr in ('conn', 'archive_conn'):
+        conn = getattr(_local, attr, None)
+        if conn is not None:
+            conn.close()
+            setattr(_local, attr, None)
+
+
+def open_archive_connection(check_same_thread: bool = True) -> Optional[sqlite3.Connection]:
+    """
+    Open a new connection to the configured reward archive, or return None if
+    there is none or nothing has been archived yet. The caller must close it.
+    """
+    path = ARCHIVE_DB_PATH
+    if path is None or not path.exists():
+        return None
+    conn = sqlite3.connect(
+        str(path),
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=check_same_thread
+    )
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return conn
+
+
+def get_archive_connection() -> Optional[sqlite3.Connection]:
+    """
+    Get this thread's connection to the reward archive, or None if nothing
+    has been archived yet. Like get_db_connection, callers must not close it.
+    """
+    path = ARCHIVE_DB_PATH
+    conn = getattr(_local, 'archive_conn', None)
+    if conn is not None and _local.archive_path == path:
+        return conn
+    if conn is not None:
+        conn.close()
+        _local.archive_conn = None
+    conn = open_archive_connection()
+    if conn is not None:
+        _local.archive_conn = conn
+        _local.archive_path = path
+    return conn
+
+
+def _is_locked_error(error: sqlite3.OperationalError) -> bool:
+    message = str(error).lower()
+    return 'database is locked' in message or 'database is busy' in message or 'database table is locked' in message
+
+
+def retry_on_locked(fn):
+    """Retry a database operation with backoff when SQLite reports the database is locked."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        for attempt in range(LOCK_RETRIES + 1):
+            try:
+                return fn(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                conn = getattr(_local, 'conn', None)
+                if conn is not None and conn.in_transaction:
+                    conn.rollback()
+                if not _is_locked_error(e) or attempt == LOCK_RETRIES:
+                    raise
+                time.sleep(LOCK_RETRY_BACKOFF * (2 ** attempt))
+    return wrapper
+
+
+# ai_score is the raw model score. The displayed score follows it unless /rank
+# stored a calibrated score there, which must not be overwritten.
+AI_SCORE_SQL = """
+    UPDATE candidates
+    SET raw_score = :ai_score,
+        score = CASE
+            WHEN score IS NULL OR raw_score IS NULL OR score = raw_score THEN :ai_score
+            ELSE score
+        END
+    WHERE id = :candidate_id
+"""
+
+
+def _write_ai_score(conn: sqlite3.Connection, candidate_id: str, ai_score: int) -> None:
+    conn.execute(AI_SCORE_SQL, {'ai_score': ai_score, 'candidate_id': candidate_id})
+
+
+def _insert_reward(
+    conn: sqlite3.Connection,
+    candidate_id: str,
+    job_id: str,
+    ai_score: int,
+    recruiter_score: int,
+    delta: int
+) -> int:
+    cur = conn.execute("""
+        INSERT INTO reward_log (
+            candidate_id, 
+            job_id, 
+            ai_score, 
+            recruiter_score, 
+            delta, 
+            created_at
+        )
+        VALUES (?, ?, ?, ?, ?, strftime('%s','now'))
+    """, (candidate_id, job_id, ai_score, recruiter_score, delta))
+    return cur.lastrowid
+
+
+# Exponential-decay policy update computed in SQL from the row's current values
+POLICY_UPSERT_SQL = """
+    INSERT INTO policy_state (
+        job_id, 
+        version, 
+        weight, 
+        error_avg, 
+        sample_count, 
+        created_at
+    )
+    VALUES (:job_id, :version, 1.0 / (1.0 + :error), :error, 1, strftime('%s','now'))
+    ON CONFLICT(job_id, version) DO UPDATE SET
+        error_avg = (1 - :lr) * policy_state.error_avg * :decay + :lr * :error,
+        sample_count = policy_state.sample_count + 1,
+        weight = MAX(:min_weight, 1.0 / (1.0 + ((1 - :lr) * policy_state.error_avg * :decay + :lr * :error)))
+"""
+
+
+def _policy_params(job_id: str, delta: int, version: int) -> dict:
+    return {
+        'job_id': job_id,
+        'version': version,
+        'error': abs(delta),
+        'lr': LEARNING_RATE,
+        'decay': DECAY_FACTOR,
+        'min_weight': MIN_WEIGHT
+    }
+
+
+def _upsert_policy_state(conn: sqlite3.Connection, job_id: str, delta: int, version: int) -> None:
+    """
+    Apply one feedback delta to policy_state as a single atomic statement.
+    
+    The update is computed in SQL from the row's current values, so
+    concurrent writers cannot lose each other's updates.
+    """
+    conn.execute(POLICY_UPSERT_SQL, _policy_params(job_id, delta, version))
+
+
+POLICY_COLUMNS = ('job_id', 'version', 'weight', 'error_avg', 'sample_count', 'created_at')
+CALIBRATION_COLUMNS = ('sample_count', 'sum_delta', 'sum_abs_delta', 'sum_sq_delta')
+
+
+class StateSnapshot:
+    """
+    Per-process in-memory copy of the small per-job state tables:
+    policy_state, calibration_stats and job_generation.
+    
+    Every lookup first reads `PRAGMA data_version` on a dedicated connection.
+    SQLite changes that value whenever any other connection commits, whether
+    on another thread here, a background worker or the other backend
+    process, and the tables are reloaded only then. Otherwise lookups are
+    dictionary reads that never touch the tables or contend with writers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._database = None
+        self._data_version: Optional[int] = None
+        self.reloads = 0
+        self._policy: dict = {}
+        self._calibration: dict = {}
+        self._generation: dict = {}
+
+    def _refresh(self) -> None:
+        if self._conn is None or self._database != DATABASE:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = _connect(check_same_thread=False)
+            self._database = DATABASE
+            self._data_version = None
+        
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return
+        
+        # One read transaction, so the three tables are mutually consistent
+        self._conn.execute("BEGIN")
+        try:
+            policy = {
+                (row[0], row[1]): dict(zip(POLICY_COLUMNS, row))
+                for row in self._conn.execute(f"SELECT {', '.join(POLICY_COLUMNS)} FROM policy_state")
+            }
+            calibration = {
+                row[0]: row[1:]
+                for row in self._conn.execute(f"SELECT job_id, {', '.join(CALIBRATION_COLUMNS)} FROM calibration_stats")
+            }
+            generation = dict(self._conn.execute("SELECT job_id, generation FROM job_generation"))
+        finally:
+            self._conn.rollback()
+        
+        self._policy, self._calibration, self._generation = policy, calibration, generation
+        self._data_version = data_version
+        self.reloads += 1
+
+    def policy_stats(self, job_id: str, version: int = 1) -> Optional[dict]:
+        with self._lock:
+            self._refresh()
+            stats = self._policy.get((job_id, version))
+        return dict(stats) if stats is not None else None
+
+    def calibration_sums(self, job_id: str) -> Optional[tuple]:
+        with self._lock:
+            self._refresh()
+            return self._calibration.get(job_id)
+
+    def generation(self, job_id: str) -> int:
+        with self._lock:
+            self._refresh()
+            return self._generation.get(job_id, 0)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = None
+            self._data_version = None
+
+
+_snapshot = StateSnapshot()
+
+
+@retry_on_locked
+def get_job_generation(job_id: str) -> int:
+    """Current change counter for a job (0 if it has never been written)."""
+    return _snapshot.generation(job_id)
+
+
+class JobCache:
+    """
+    In-memory memo of values derived from a job's feedback.
+    
+    Entries are keyed by (job_id, key) and remember the job generation they
+    were computed at. Generations come from the StateSnapshot, so writes from
+    other threads or processes invalidate entries too; writes through this
+    module also drop the job's entries right away.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[int, Any]]" = OrderedDict()
+        _job_caches.append(self)
+
+    def get(self, job_id: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for (job_id, key), recomputing it if the job changed."""
+        generation = get_job_generation(job_id)
+        cache_key = (job_id, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[0] == generation:
+                self._entries.move_to_end(cache_key)
+                return entry[1]
+        
+        # Computed against at least `generation`; a racing write bumps it and forces a recompute
+        value = compute()
+        with self._lock:
+            self._entries[cache_key] = (generation, value)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, job_id: str) -> None:
+        with self._lock:
+            for cache_key in [k for k in self._entries if k[0] == job_id]:
+                del self._entries[cache_key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_job_caches: List[JobCache] = []
+
+
+def invalidate_job(job_id: str) -> None:
+    """Drop every cached value derived from a job's feedback in this process."""
+    for cache in _job_caches:
+        cache.invalidate(job_id)
+
+
+@retry_on_locked
 def update_ai_score(candidate_id: str, ai_score: int) -> None:
     """
     Store the AI-generated score in the candidates table.
     
+    The score lands in raw_score, and in score unless that holds a
+    calibrated value from /rank.
+    
     Args:
         candidate_id: Unique candidate identifier
-        ai_score: Score from 0-100 generated by the LLM
+        ai_score: Raw score from 0-100 generated by the LLM
     """
     conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "UPDATE candidates SET score = ? WHERE id = ?",
-        (ai_score, candidate_id)
-    )
-    conn.commit()
-    conn.close()
+    with conn:
+        _write_ai_score(conn, candidate_id, ai_score)
 
 
 def compute_delta(ai_score: int, recruiter_stars: int) -> Tuple[int, int]:
@@ -77,6 +820,7 @@ def compute_delta(ai_score: int, recruiter_stars: int) -> Tuple[int, int]:
     return recruiter_score, delta
 
 
+@retry_on_locked
 def store_reward(
     candidate_id: str, 
     job_id: str, 
@@ -100,24 +844,13 @@ def store_reward(
         The ID of the inserted reward log entry
     """
     conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO reward_log (
-            candidate_id, 
-            job_id, 
-            ai_score, 
-            recruiter_score, 
-            delta, 
-            created_at
-        )
-        VALUES (?, ?, ?, ?, ?, strftime('%s','now'))
-    """, (candidate_id, job_id, ai_score, recruiter_score, delta))
-    conn.commit()
-    reward_id = cur.lastrowid
-    conn.close()
+    with conn:
+        reward_id = _insert_reward(conn, candidate_id, job_id, ai_score, recruiter_score, delta)
+    invalidate_job(job_id)
     return reward_id
 
 
+@retry_on_locked
 def update_policy_state(job_id: str, delta: int, version: int = 1) -> None:
     """
     Update the RL policy state using the new feedback delta.
@@ -127,72 +860,22 @@ def update_policy_state(job_id: str, delta: int, version: int = 1) -> None:
     - Model adapts quickly to new patterns
     - Weight decreases as error increases
     
+    new_error_avg = (1 - α) * decayed_old + α * |delta|, and
+    weight = max(MIN_WEIGHT, 1 / (1 + new_error_avg)). The first sample
+    initializes error_avg to |delta|.
+    
     Args:
         job_id: Job identifier
         delta: Feedback delta (recruiter_score - ai_score)
         version: Policy version (default 1)
     """
     conn = get_db_connection()
-    cur = conn.cursor()
-    
-    # Get current policy state
-    cur.execute("""
-        SELECT error_avg, sample_count, weight
-        FROM policy_state
-        WHERE job_id = ? AND version = ?
-    """, (job_id, version))
-    
-    result = cur.fetchone()
-    
-    if result is None:
-        # Initialize new policy state for this job
-        error_avg = abs(delta)
-        sample_count = 1
-        weight = 1.0 / (1.0 + error_avg)
-        
-        cur.execute("""
-            INSERT INTO policy_state (
-                job_id, 
-                version, 
-                weight, 
-                error_avg, 
-                sample_count, 
-                created_at
-            )
-            VALUES (?, ?, ?, ?, ?, strftime('%s','now'))
-        """, (job_id, version, weight, error_avg, sample_count))
-    else:
-        # Update existing policy state with exponential decay
-        old_error_avg, old_sample_count, old_weight = result
-        
-        # Apply exponential decay to old average
-        decayed_avg = old_error_avg * DECAY_FACTOR
-        
-        # Compute new weighted average
-        # new_error_avg = (1 - α) * decayed_old + α * new_error
-        new_error = abs(delta)
-        new_error_avg = (1 - LEARNING_RATE) * decayed_avg + LEARNING_RATE * new_error
-        
-        # Increment sample count
-        new_sample_count = old_sample_count + 1
-        
-        # Compute new weight (inverse of error + 1)
-        # Low error = high weight (trust the model)
-        # High error = low weight (don't trust the model)
-        new_weight = max(MIN_WEIGHT, 1.0 / (1.0 + new_error_avg))
-        
-        cur.execute("""
-            UPDATE policy_state
-            SET error_avg = ?,
-                sample_count = ?,
-                weight = ?
-            WHERE job_id = ? AND version = ?
-        """, (new_error_avg, new_sample_count, new_weight, job_id, version))
-    
-    conn.commit()
-    conn.close()
+    with conn:
+        _upsert_policy_state(conn, job_id, delta, version)
+    invalidate_job(job_id)
 
 
+@retry_on_locked
 def process_feedback(
     candidate_id: str, 
     job_id: str, 
@@ -210,10 +893,14 @@ def process_feedback(
     4. Log reward to reward_log table
     5. Update policy state with RL learning
     
+    All writes happen in one transaction, so a rating is recorded
+    completely or not at all.
+    
     Args:
         candidate_id: Unique candidate identifier
         job_id: Job identifier
-        ai_score: AI-generated score (0-100)
+        ai_score: Raw AI-generated score (0-100), before calibration; calibration
+            is fitted on these, so a calibrated score would be corrected twice
         recruiter_stars: Recruiter rating (1-5)
         version: Policy version (default 1)
         
@@ -228,17 +915,17 @@ def process_feedback(
             'reward_id': int
         }
     """
-    # 1. Store AI score
-    update_ai_score(candidate_id, ai_score)
-    
-    # 2. Compute delta
+    # Compute delta first so invalid ratings write nothing
     recruiter_score, delta = compute_delta(ai_score, recruiter_stars)
     
-    # 3. Log reward
-    reward_id = store_reward(candidate_id, job_id, ai_score, recruiter_score, delta)
-    
-    # 4. Update RL policy state
-    update_policy_state(job_id, delta, version)
+    conn = get_db_connection()
+    with conn:
+        # Take the write lock up front instead of upgrading mid-transaction
+        conn.execute("BEGIN IMMEDIATE")
+        _write_ai_score(conn, candidate_id, ai_score)
+        reward_id = _insert_reward(conn, candidate_id, job_id, ai_score, recruiter_score, delta)
+        _upsert_policy_state(conn, job_id, delta, version)
+    invalidate_job(job_id)
     
     return {
         'candidate_id': candidate_id,
@@ -250,6 +937,257 @@ def process_feedback(
     }
 
 
+@retry_on_locked
+def process_feedback_batch(ratings: List[dict], version: int = 1) -> List[dict]:
+    """
+    Process many recruiter ratings in one transaction.
+    
+    Ratings are validated up front, then AI scores, reward_log rows and policy
+    updates are written with executemany. Policy updates are applied in the
+    order given, so each job's decay recurrence sees its ratings in sequence.
+    
+    Args:
+        ratings: List of dicts with 'candidate_id', 'job_id', 'ai_score',
+            'recruiter_stars' and optionally 'version'
+        version: Policy version for ratings that do not specify one (default 1)
+        
+    Returns:
+        List of process_feedback result dictionaries, in input order
+        
+    Raises:
+        ValueError: If any rating is invalid (nothing is written)
+    """
+    rows = []
+    for index, rating in enumerate(ratings):
+        try:
+            ai_score = int(rating['ai_score'])
+            recruiter_score, delta = compute_delta(ai_score, int(rating['recruiter_stars']))
+            rows.append((
+                rating['candidate_id'],
+                rating['job_id'],
+                ai_score,
+                recruiter_score,
+                delta,
+                rating.get('version', version)
+            ))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid rating at index {index}: {e}")
+    
+    if not rows:
+        return []
+    
+    conn = get_db_connection()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            AI_SCORE_SQL,
+            [
+                {'ai_score': ai_score, 'candidate_id': candidate_id}
+                for candidate_id, _, ai_score, _, _, _ in rows
+            ]
+        )
+        conn.executemany("""
+            INSERT INTO reward_log (
+                candidate_id, 
+                job_id, 
+                ai_score, 
+                recruiter_score, 
+                delta, 
+                created_at
+            )
+            VALUES (?, ?, ?, ?, ?, strftime('%s','now'))
+        """, [row[:5] for row in rows])
+        # AUTOINCREMENT ids are contiguous while we hold the write lock
+        last_id = conn.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'reward_log'"
+        ).fetchone()[0]
+        conn.executemany(POLICY_UPSERT_SQL, [
+            _policy_params(job_id, delta, row_version)
+            for _, job_id, _, _, delta, row_version in rows
+        ])
+    for job_id in {row[1] for row in rows}:
+        invalidate_job(job_id)
+    
+    first_id = last_id - len(rows) + 1
+    return [
+        {
+            'candidate_id': candidate_id,
+            'job_id': job_id,
+            'ai_score': ai_score,
+            'recruiter_score': recruiter_score,
+            'delta': delta,
+            'reward_id': first_id + offset
+        }
+        for offset, (candidate_id, job_id, ai_score, recruiter_score, delta, _) in enumerate(rows)
+    ]
+
+
+_STOP = object()
+
+
+class FeedbackWriter:
+    """
+    Write-behind queue for recruiter feedback.
+    
+    Ratings are validated and acknowledged immediately, then a background
+    thread drains the queue and group-commits up to `max_batch` ratings per
+    transaction via process_feedback_batch. Call flush() to wait for queued
+    ratings to be written and close() to drain and stop the writer; close()
+    runs automatically at interpreter exit.
+    """
+
+    def __init__(
+        self,
+        max_batch: int = FEEDBACK_GROUP_MAX,
+        max_wait: float = FEEDBACK_GROUP_WAIT,
+        durability: str = FEEDBACK_DURABILITY
+    ):
+        if durability not in ('normal', 'full'):
+            raise ValueError(f"Unknown durability mode: {durability}. Must be 'normal' or 'full'.")
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.durability = durability
+        self.written = 0
+        self.failed = 0
+        self._closed = False
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="feedback-writer", daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        candidate_id: str,
+        job_id: str,
+        ai_score: int,
+        recruiter_stars: int,
+        version: int = 1
+    ) -> dict:
+        """
+        Validate a rating and queue it for the next group commit.
+        
+        Returns:
+            The computed feedback (without reward_id) marked as queued
+        
+        Raises:
+            ValueError: If the star rating is invalid
+            RuntimeError: If the writer has been closed
+        """
+        if self._closed:
+            raise RuntimeError("Feedback writer is closed")
+        recruiter_score, delta = compute_delta(ai_score, recruiter_stars)
+        self._queue.put({
+            'candidate_id': candidate_id,
+            'job_id': job_id,
+            'ai_score': ai_score,
+            'recruiter_stars': recruiter_stars,
+            'version': version
+        })
+        return {
+            'candidate_id': candidate_id,
+            'job_id': job_id,
+            'ai_score': ai_score,
+            'recruiter_score': recruiter_score,
+            'delta': delta,
+            'queued': True
+        }
+
+    def pending(self) -> int:
+        """Number of ratings queued or being written."""
+        return self._queue.unfinished_tasks
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued rating is committed. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Stop accepting ratings, write everything queued, and stop the thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        if self.durability == 'full':
+            get_db_connection().execute("PRAGMA synchronous=FULL")
+        
+        while True:
+            item = self._queue.get()
+            stop = item is _STOP
+            batch = [] if stop else [item]
+            deadline = time.monotonic() + self.max_wait
+            
+            # Gather more ratings until the group is full or the wait expires
+            while not stop and len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+            
+            if batch:
+                self._commit(batch)
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self._queue.task_done()
+            if stop:
+                close_db_connection()
+                return
+
+    def _commit(self, batch: List[dict]) -> None:
+        try:
+            process_feedback_batch(batch)
+            self.written += len(batch)
+            return
+        except Exception as e:
+            log.warning("feedback group commit failed, retrying individually",
+                        extra={"fields": {"size": len(batch), "error": str(e)}})
+        
+        # Isolate the bad rating instead of dropping the whole group
+        for rating in batch:
+            try:
+                process_feedback(**rating)
+                self.written += 1
+            except Exception as e:
+                self.failed += 1
+                log.error("dropping queued feedback", extra={"fields": {
+                    "job_id": rating['job_id'], "candidate_id": rating['candidate_id'], "error": str(e)
+                }})
+
+
+_feedback_writer: Optional[FeedbackWriter] = None
+_feedback_writer_lock = threading.Lock()
+
+
+def get_feedback_writer() -> FeedbackWriter:
+    """Return the process-wide write-behind feedback writer, starting it on first use."""
+    global _feedback_writer
+    with _feedback_writer_lock:
+        if _feedback_writer is None:
+            _feedback_writer = FeedbackWriter()
+            atexit.register(shutdown_feedback_writer)
+        return _feedback_writer
+
+
+def shutdown_feedback_writer(timeout: Optional[float] = 30.0) -> None:
+    """Flush and stop the process-wide feedback writer, if it was started."""
+    global _feedback_writer
+    with _feedback_writer_lock:
+        writer, _feedback_writer = _feedback_writer, None
+    if writer is not None:
+        writer.close(timeout)
+
+
+@retry_on_locked
 def get_policy_stats(job_id: str, version: int = 1) -> Optional[dict]:
     """
     Get current RL policy statistics for a job.
@@ -268,77 +1206,130 @@ def get_policy_stats(job_id: str, version: int = 1) -> Optional[dict]:
             'sample_count': int,
             'created_at': int
         }
-    """
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT job_id, version, weight, error_avg, sample_count, created_at
-        FROM policy_state
-        WHERE job_id = ? AND version = ?
-    """, (job_id, version))
-    
-    result = cur.fetchone()
-    conn.close()
-    
-    if result is None:
-        return None
     
-    return {
-        'job_id': result[0],
-        'version': result[1],
-        'weight': result[2],
-        'error_avg': result[3],
-        'sample_count': result[4],
-        'created_at': result[5]
-    }
+    Served from the in-memory StateSnapshot, which reloads only after the
+    database changes.
+    """
+    return _snapshot.policy_stats(job_id, version)
+
+
+REWARD_COLUMNS = ('id', 'candidate_id', 'job_id', 'ai_score', 'recruiter_score', 'delta', 'created_at')
+
+# Newest first in idx_reward_job order (created_at DESC, then rowid), so pages need no sort
+REWARD_PAGE_SQL = f"""
+    SELECT {', '.join(REWARD_COLUMNS)}
+    FROM reward_log
+    WHERE job_id = :job_id{{cursor_clause}}
+    ORDER BY created_at DESC, id ASC
+    LIMIT :limit
+"""
+REWARD_CURSOR_CLAUSE = " AND created_at <= :created_at AND (created_at < :created_at OR id > :id)"
+# Rows per connection round-trip in iter_reward_rows
+REWARD_EXPORT_PAGE = 1000
+
 
+def encode_reward_cursor(entry: dict) -> str:
+    """Opaque keyset cursor pointing just past a reward history entry."""
+    return f"{entry['created_at']}:{entry['id']}"
 
-def get_reward_history(job_id: str, limit: int = 50) -> list:
+
+def decode_reward_cursor(cursor: str) -> Tuple[int, int]:
+    """Parse a cursor from encode_reward_cursor into (created_at, id)."""
+    try:
+        created_at, reward_id = cursor.split(':')
+        return int(created_at), int(reward_id)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+
+
+@retry_on_locked
+def get_reward_history(job_id: str, limit: int = 50, cursor: Optional[str] = None) -> list:
     """
     Get recent reward history for a job.
     
+    Pass the cursor of the last entry of a page (encode_reward_cursor) to get
+    the next, older page. Paging seeks idx_reward_job directly, so deep pages
+    cost the same as the first.
+    
+    Rows compacted into the archive database are read from there once the
+    live rows run out; archived rows are always older than live ones.
+    
     Args:
         job_id: Job identifier
         limit: Maximum number of records to return
+        cursor: Optional keyset cursor to continue after
         
     Returns:
         List of reward log entries (most recent first)
     """
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT 
-            id,
-            candidate_id,
-            job_id,
-            ai_score,
-            recruiter_score,
-            delta,
-            created_at
-        FROM reward_log
-        WHERE job_id = ?
-        ORDER BY created_at DESC
-        LIMIT ?
-    """, (job_id, limit))
+    params = {'job_id': job_id, 'limit': limit}
+    if cursor is not None:
+        params['created_at'], params['id'] = decode_reward_cursor(cursor)
+    query = REWARD_PAGE_SQL.format(cursor_clause="" if cursor is None else REWARD_CURSOR_CLAUSE)
     
-    rows = cur.fetchall()
-    conn.close()
+    rows = get_db_connection().execute(query, params).fetchall()
     
-    return [
-        {
-            'id': row[0],
-            'candidate_id': row[1],
-            'job_id': row[2],
-            'ai_score': row[3],
-            'recruiter_score': row[4],
-            'delta': row[5],
-            'created_at': row[6]
-        }
-        for row in rows
-    ]
+    if len(rows) < limit:
+        archive = get_archive_connection()
+        if archive is not None:
+            params['limit'] = limit - len(rows)
+            rows += archive.execute(query, params).fetchall()
+    
+    return [dict(zip(REWARD_COLUMNS, row)) for row in rows]
 
 
-def compute_calibration_metrics(job_id: str) -> dict:
+def iter_reward_rows(job_ids: List[str], page_size: int = REWARD_EXPORT_PAGE) -> Iterator[dict]:
+    """
+    Stream every reward row for the given jobs, newest first within each job.
+    
+    Rows are read in keyset pages, each on a connection opened and closed for
+    that page, so memory stays flat however long the history is and the
+    generator may be resumed from any thread, whatever DATABASE is (a
+    connection factory only ever sees the thread that calls it). Archived
+    rows continue from the last live row's cursor, so a compaction running
+    meanwhile neither repeats nor skips rows.
+    """
+    first_page = REWARD_PAGE_SQL.format(cursor_clause="")
+    next_page = REWARD_PAGE_SQL.format(cursor_clause=REWARD_CURSOR_CLAUSE)
+    for job_id in job_ids:
+        params = {'job_id': job_id, 'limit': page_size}
+        for open_source in (open_connection, open_archive_connection):
+            while True:
+                conn = open_source()
+                if conn is None:
+                    break
+                try:
+                    rows = conn.execute(next_page if 'id' in params else first_page, params).fetchall()
+                finally:
+                    conn.close()
+                for row in rows:
+                    yield dict(zip(REWARD_COLUMNS, row))
+                if rows:
+                    last = dict(zip(REWARD_COLUMNS, rows[-1]))
+                    params['created_at'], params['id'] = last['created_at'], last['id']
+                if len(rows) < page_size:
+                    break
+
+
+# Sums over a recent slice of reward_log; the inner query walks idx_reward_job(job_id, created_at DESC)
+WINDOW_AGGREGATE_SQL = """
+    SELECT COUNT(*), SUM(delta), SUM(ABS(delta)), SUM(delta * delta)
+    FROM (
+        SELECT delta
+        FROM reward_log
+        WHERE job_id = :job_id{since_clause}
+        ORDER BY created_at DESC
+        LIMIT :limit
+    )
+"""
+
+
+@retry_on_locked
+def compute_calibration_metrics(
+    job_id: str,
+    last_n: Optional[int] = None,
+    since: Optional[int] = None
+) -> dict:
     """
     Compute model calibration metrics for a job.
     
@@ -347,24 +1338,41 @@ def compute_calibration_metrics(job_id: str) -> dict:
     - Mean error (bias)
     - Root mean squared error (RMSE)
     
+    Without a window, metrics come from the running aggregates in
+    calibration_stats, served from the in-memory StateSnapshot regardless of
+    how much history the job has. With a window, they are aggregated in SQL over the
+    matching slice of the reward_log index.
+    
     Args:
         job_id: Job identifier
+        last_n: Only use the job's most recent N ratings
+        since: Only use ratings created at or after this Unix timestamp
         
     Returns:
         Dictionary with calibration metrics
     """
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT ai_score, recruiter_score, delta
-        FROM reward_log
-        WHERE job_id = ?
-    """, (job_id,))
+    if last_n is not None and last_n < 1:
+        raise ValueError(f"Invalid window: last_n must be at least 1, got {last_n}")
     
-    rows = cur.fetchall()
-    conn.close()
+    if last_n is None and since is None:
+        row = _snapshot.calibration_sums(job_id)
+    else:
+        conn = get_db_connection()
+        query = WINDOW_AGGREGATE_SQL.format(since_clause="" if since is None else " AND created_at >= :since")
+        params = {'job_id': job_id, 'since': since, 'limit': -1 if last_n is None else last_n}
+        row = conn.execute(query, params).fetchone()
+        
+        # Extend the window into archived rows when the live ones do not fill it
+        summary = conn.execute(
+            "SELECT last_at FROM reward_summary WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        archive = get_archive_connection() if summary else None
+        if archive is not None and (since is None or since <= summary[0]) and (last_n is None or row[0] < last_n):
+            params['limit'] = -1 if last_n is None else last_n - row[0]
+            archived = archive.execute(query, params).fetchone()
+            row = (row[0] + archived[0],) + tuple((a or 0) + (b or 0) for a, b in zip(row[1:], archived[1:]))
     
-    if not rows:
+    if row is None or row[0] <= 0:
         return {
             'job_id': job_id,
             'sample_count': 0,
@@ -373,28 +1381,358 @@ def compute_calibration_metrics(job_id: str) -> dict:
             'rmse': None
         }
     
-    deltas = [row[2] for row in rows]
+    sample_count, sum_delta, sum_abs_delta, sum_sq_delta = row
     
     # Mean Absolute Error (average magnitude of error)
-    mae = sum(abs(d) for d in deltas) / len(deltas)
+    mae = sum_abs_delta / sample_count
     
     # Bias (systematic over/under estimation)
     # Positive = AI systematically underrates
     # Negative = AI systematically overrates
-    bias = sum(deltas) / len(deltas)
+    bias = sum_delta / sample_count
     
     # Root Mean Squared Error (penalizes large errors)
-    rmse = math.sqrt(sum(d**2 for d in deltas) / len(deltas))
+    rmse = math.sqrt(max(sum_sq_delta, 0) / sample_count)
     
     return {
         'job_id': job_id,
-        'sample_count': len(deltas),
+        'sample_count': sample_count,
         'mae': round(mae, 2),
         'bias': round(bias, 2),
         'rmse': round(rmse, 2)
     }
 
 
+def _attach_name(path: Path) -> str:
+    """
+    Name a file for ATTACH. Attached files inherit the main database's VFS,
+    so when that is a URI (e.g. an in-memory memdb) name the OS default one.
+    """
+    if isinstance(DATABASE, str) and DATABASE.startswith('file:'):
+        return f"{path.absolute().as_uri()}?vfs={'win32' if os.name == 'nt' else 'unix'}"
+    return str(path)
+
+
+def compact_reward_log(retention_days: int = REWARD_RETENTION_DAYS, now: Optional[int] = None) -> dict:
+    """
+    Move reward_log rows older than the retention horizon to the archive database.
+    
+    Rows are first copied to ARCHIVE_DB_PATH (see configure_database), then folded into each job's
+    reward_summary row (aggregates, a delta histogram and an
+    (ai_score, recruiter_score) histogram) and deleted from reward_log in one
+    transaction. Only rows already present in the archive are deleted, so an
+    interrupted run is safe to repeat. calibration_stats keeps the folded
+    rows, and get_reward_history / compute_calibration_metrics read the
+    archive when they need older data.
+    
+    Args:
+        retention_days: Keep rows newer than this many days in reward_log
+        now: Current Unix time (default: time.time())
+        
+    Returns:
+        Dictionary with 'cutoff', 'archived' row count and compacted 'jobs'
+    
+    Raises:
+        ValueError: If no archive is configured
+    """
+    if ARCHIVE_DB_PATH is None:
+        raise ValueError("No reward archive configured; pass archive= to configure_database or set REWARD_ARCHIVE_DB")
+    cutoff = int(time.time() if now is None else now) - retention_days * 86400
+    conn = get_db_connection()
+    conn.execute("ATTACH DATABASE ? AS archive", (_attach_name(ARCHIVE_DB_PATH),))
+    try:
+        conn.execute("PRAGMA archive.journal_mode=WAL")
+        with conn:
+            for statement in ARCHIVE_SCHEMA:
+                conn.execute(statement.format(db='archive'))
+            # Copy first: with WAL, a transaction spanning both files is not atomic as a whole
+            conn.execute("""
+                INSERT OR IGNORE INTO archive.reward_log
+                SELECT id, candidate_id, job_id, ai_score, recruiter_score, delta, created_at
+                FROM main.reward_log
+                WHERE created_at < ?
+            """, (cutoff,))
+        
+        archived_rows = """
+            FROM main.reward_log
+            WHERE created_at < :cutoff AND id IN (SELECT id FROM archive.reward_log)
+        """
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            totals = conn.execute(f"""
+                SELECT job_id, COUNT(*), SUM(delta), SUM(ABS(delta)), SUM(delta * delta),
+                       MIN(created_at), MAX(created_at)
+                {archived_rows}
+                GROUP BY job_id
+            """, {'cutoff': cutoff}).fetchall()
+            pairs = {}
+            for job_id, ai_score, recruiter_score, count in conn.execute(f"""
+                SELECT job_id, ai_score, recruiter_score, COUNT(*)
+                {archived_rows}
+                GROUP BY job_id, ai_score, recruiter_score
+            """, {'cutoff': cutoff}):
+                pairs.setdefault(job_id, []).append((ai_score, recruiter_score, count))
+            
+            for job_id, count, sum_delta, sum_abs, sum_sq, first_at, last_at in totals:
+                existing = conn.execute(
+                    "SELECT delta_histogram, score_histogram FROM reward_summary WHERE job_id = ?", (job_id,)
+                ).fetchone()
+                delta_histogram, score_histogram = (
+                    (json.loads(existing[0]), json.loads(existing[1])) if existing else ({}, {})
+                )
+                for ai_score, recruiter_score, pair_count in pairs[job_id]:
+                    bucket = str((recruiter_score - ai_score) // DELTA_BUCKET * DELTA_BUCKET)
+                    delta_histogram[bucket] = delta_histogram.get(bucket, 0) + pair_count
+                    key = f"{ai_score}:{recruiter_score}"
+                    score_histogram[key] = score_histogram.get(key, 0) + pair_count
+                
+                conn.execute("""
+                    INSERT INTO reward_summary (
+                        job_id, sample_count, sum_delta, sum_abs_delta, sum_sq_delta,
+                        first_at, last_at, delta_histogram, score_histogram, compacted_at
+                    )
+                    VALUES (:job_id, :count, :sum_delta, :sum_abs, :sum_sq, :first_at, :last_at,
+                            :delta_histogram, :score_histogram, strftime('%s','now'))
+                    ON CONFLICT(job_id) DO UPDATE SET
+                        sample_count = sample_count + :count,
+                        sum_delta = sum_delta + :sum_delta,
+                        sum_abs_delta = sum_abs_delta + :sum_abs,
+                        sum_sq_delta = sum_sq_delta + :sum_sq,
+                        first_at = MIN(first_at, :first_at),
+                        last_at = MAX(last_at, :last_at),
+                        delta_histogram = :delta_histogram,
+                        score_histogram = :score_histogram,
+                        compacted_at = strftime('%s','now')
+                """, {
+                    'job_id': job_id, 'count': count, 'sum_delta': sum_delta, 'sum_abs': sum_abs,
+                    'sum_sq': sum_sq, 'first_at': first_at, 'last_at': last_at,
+                    'delta_histogram': json.dumps(delta_histogram, sort_keys=True),
+                    'score_histogram': json.dumps(score_histogram, sort_keys=True)
+                })
+            
+            conn.execute(f"DELETE {archived_rows}", {'cutoff': cutoff})
+            
+            # The delete trigger subtracted these rows; calibration_stats covers all history
+            conn.executemany("""
+                INSERT INTO calibration_stats (job_id, sample_count, sum_delta, sum_abs_delta, sum_sq_delta)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(job_id) DO UPDATE SET
+                    sample_count = sample_count + excluded.sample_count,
+                    sum_delta = sum_delta + excluded.sum_delta,
+                    sum_abs_delta = sum_abs_delta + excluded.sum_abs_delta,
+                    sum_sq_delta = sum_sq_delta + excluded.sum_sq_delta
+            """, [row[:5] for row in totals])
+    finally:
+        conn.execute("DETACH DATABASE archive")
+    
+    for job_id, *_ in totals:
+        invalidate_job(job_id)
+    
+    return {
+        'cutoff': cutoff,
+        'archived': sum(row[1] for row in totals),
+        'jobs': [row[0] for row in totals]
+    }
+
+
+@retry_on_locked
+def record_shadow_score(
+    job_id: Optional[str],
+    candidate_id: Optional[str],
+    primary_model: str,
+    shadow_model: str,
+    primary_score: int,
+    shadow_score: Optional[int],
+    primary_latency_ms: Optional[float] = None,
+    shadow_latency_ms: Optional[float] = None,
+    primary_tokens: Optional[int] = None,
+    shadow_tokens: Optional[int] = None,
+    error: Optional[str] = None
+) -> None:
+    """Store one primary/shadow scoring comparison (shadow_score is None if the shadow call failed)."""
+    conn = get_db_connection()
+    with conn:
+        conn.execute("""
+            INSERT INTO shadow_scores (
+                job_id, candidate_id, primary_model, shadow_model, primary_score, shadow_score,
+                primary_latency_ms, shadow_latency_ms, primary_tokens, shadow_tokens, error, created_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, strftime('%s','now'))
+        """, (
+            job_id, candidate_id, primary_model, shadow_model, primary_score, shadow_score,
+            primary_latency_ms, shadow_latency_ms, primary_tokens, shadow_tokens, error
+        ))
+
+
+@retry_on_locked
+def get_shadow_report(job_id: Optional[str] = None) -> List[dict]:
+    """
+    Summarize shadow scoring per job and shadow model.
+    
+    Reports sample and error counts, mean latency and tokens for both models,
+    and the mean (absolute) divergence of shadow from primary scores. Where
+    recruiters have since rated the same candidates, it also reports each
+    model's mean absolute error against the recruiter score.
+    
+    Args:
+        job_id: Restrict to one job (default: all jobs)
+        
+    Returns:
+        List of dictionaries, one per (job_id, shadow_model)
+    """
+    where = "" if job_id is None else "WHERE s.job_id = :job_id"
+    conn = get_db_connection()
+    report = {}
+    for row in conn.execute(f"""
+        SELECT s.job_id, s.primary_model, s.shadow_model, COUNT(*), SUM(s.error IS NOT NULL),
+               AVG(s.primary_latency_ms), AVG(s.shadow_latency_ms),
+               AVG(s.primary_tokens), AVG(s.shadow_tokens),
+               AVG(ABS(s.shadow_score - s.primary_score)), AVG(s.shadow_score - s.primary_score)
+        FROM shadow_scores s
+        {where}
+        GROUP BY s.job_id, s.primary_model, s.shadow_model
+    """, {'job_id': job_id}):
+        report[row[:3]] = {
+            'job_id': row[0],
+            'primary_model': row[1],
+            'shadow_model': row[2],
+            'samples': row[3],
+            'errors': row[4],
+            'primary_latency_ms': row[5],
+            'shadow_latency_ms': row[6],
+            'primary_tokens': row[7],
+            'shadow_tokens': row[8],
+            'mean_abs_divergence': row[9],
+            'mean_divergence': row[10],
+            'rated': 0,
+            'primary_mae': None,
+            'shadow_mae': None
+        }
+    
+    for row in conn.execute(f"""
+        SELECT s.job_id, s.primary_model, s.shadow_model, COUNT(*),
+               AVG(ABS(r.recruiter_score - s.primary_score)), AVG(ABS(r.recruiter_score - s.shadow_score))
+        FROM shadow_scores s
+        JOIN reward_log r ON r.job_id = s.job_id AND r.candidate_id = s.candidate_id
+        {where}{' AND' if where else 'WHERE'} s.shadow_score IS NOT NULL
+        GROUP BY s.job_id, s.primary_model, s.shadow_model
+    """, {'job_id': job_id}):
+        report[row[:3]].update({'rated': row[3], 'primary_mae': row[4], 'shadow_mae': row[5]})
+    
+    return list(report.values())
+
+
+# Numeric score calibration: a per-job monotone map from the raw AI score to the
+# recruiter score, refit on first use after new feedback changes the job's generation.
+def fit_isotonic(points: List[Tuple[float, float, float]]) -> Tuple[List[float], List[float]]:
+    """
+    Weighted isotonic regression by pool-adjacent-violators.
+
+    Args:
+        points: (x, weight, mean_y) tuples sorted by x, with distinct x
+
+    Returns:
+        (xs, ys) knots of a non-decreasing piecewise-linear function
+    """
+    # Each block is [first_x, last_x, total_weight, mean_y]
+    blocks: List[list] = []
+    for x, weight, y in points:
+        blocks.append([x, x, weight, y])
+        while len(blocks) > 1 and blocks[-2][3] >= blocks[-1][3]:
+            first_x, _, w1, y1 = blocks[-2]
+            _, last_x, w2, y2 = blocks.pop()
+            blocks[-1] = [first_x, last_x, w1 + w2, (w1 * y1 + w2 * y2) / (w1 + w2)]
+
+    xs: List[float] = []
+    ys: List[float] = []
+    for first_x, last_x, _, y in blocks:
+        xs.append(first_x)
+        ys.append(y)
+        if last_x != first_x:
+            xs.append(last_x)
+            ys.append(y)
+    return xs, ys
+
+
+class ScoreMapping:
+    """Monotone map from a raw 0-100 AI score to the expected recruiter score."""
+
+    def __init__(self, xs: List[float], ys: List[float], sample_count: int):
+        self.xs = xs
+        self.ys = ys
+        self.sample_count = sample_count
+
+    def __call__(self, score: float) -> int:
+        # Interpolate between knots; hold the end values outside the observed range
+        i = bisect_right(self.xs, score)
+        if i == 0:
+            value = self.ys[0]
+        elif i == len(self.xs):
+            value = self.ys[-1]
+        else:
+            x0, x1, y0, y1 = self.xs[i - 1], self.xs[i], self.ys[i - 1], self.ys[i]
+            value = y0 + (y1 - y0) * (score - x0) / (x1 - x0)
+        return max(0, min(100, round(value)))
+
+    def to_dict(self) -> dict:
+        return {
+            'sample_count': self.sample_count,
+            'knots': [{'ai_score': x, 'recruiter_score': round(y, 2)} for x, y in zip(self.xs, self.ys)]
+        }
+
+
+@retry_on_locked
+def load_score_pairs(job_id: str) -> List[Tuple[float, float, float]]:
+    """
+    Aggregate a job's feedback into (ai_score, count, mean recruiter_score) points.
+
+    Live rows are grouped in SQL over idx_reward_job; compacted rows come
+    from the reward_summary score histogram.
+    """
+    conn = get_db_connection()
+    totals = {
+        ai_score: [count, total]
+        for ai_score, count, total in conn.execute("""
+            SELECT ai_score, COUNT(*), SUM(recruiter_score)
+            FROM reward_log
+            WHERE job_id = ?
+            GROUP BY ai_score
+        """, (job_id,))
+    }
+
+    summary = conn.execute(
+        "SELECT score_histogram FROM reward_summary WHERE job_id = ?", (job_id,)
+    ).fetchone()
+    if summary:
+        for key, count in json.loads(summary[0]).items():
+            ai_score, recruiter_score = (int(part) for part in key.split(':'))
+            entry = totals.setdefault(ai_score, [0, 0])
+            entry[0] += count
+            entry[1] += count * recruiter_score
+
+    return [(ai_score, count, total / count) for ai_score, (count, total) in sorted(totals.items())]
+
+
+def fit_score_mapping(job_id: str) -> Optional[ScoreMapping]:
+    """Fit a job's mapping from its feedback, or None with too few ratings."""
+    points = load_score_pairs(job_id)
+    sample_count = sum(count for _, count, _ in points)
+    if sample_count < MIN_MAPPING_SAMPLES:
+        return None
+    xs, ys = fit_isotonic(points)
+    return ScoreMapping(xs, ys, sample_count)
+
+
+_mapping_cache = JobCache()
+
+
+def get_score_mapping(job_id: Optional[str]) -> Optional[ScoreMapping]:
+    """Cached mapping for a job, refit after new feedback arrives."""
+    if not job_id:
+        return None
+    return _mapping_cache.get(job_id, 'isotonic', lambda: fit_score_mapping(job_id))
+
+
 if __name__ == "__main__":
     # Example usage
     print("RL Feedback Pipeline Example\n" + "="*50)
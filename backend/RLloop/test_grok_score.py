@@ -0,0 +1,393 @@
+"""
+Unit Tests for Grok candidate scoring, with a stubbed Grok client
+
+Run with: pytest test_grok_score.py -v
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+import metrics
+from RLloop import grokScore
+from RLloop.rl_feedback import open_connection, update_policy_state
+
+
+class FakeGrok:
+    """
+    Stands in for xai_sdk.Client.
+
+    Pointwise calls return scores[model]; listwise calls return the
+    (index, score) pairs in listwise. An exception in either is raised instead,
+    and a callable score is called with the prompt text first.
+    Every call is recorded in calls as (model, schema name).
+    """
+
+    def __init__(self, scores=None, listwise=None):
+        self.scores = scores or {}
+        self.listwise = listwise
+        self.calls = []
+        self.chat = SimpleNamespace(create=lambda model: FakeChat(self, model))
+
+
+class FakeChat:
+    def __init__(self, grok, model):
+        self.grok = grok
+        self.model = model
+        self.messages = []
+
+    def append(self, message):
+        self.messages.append(str(message))
+
+    def parse(self, schema):
+        self.grok.calls.append((self.model, schema.__name__))
+        reply = self.grok.listwise if schema is grokScore.ListwiseScores else self.grok.scores[self.model]
+        if callable(reply):
+            reply = reply("\n".join(self.messages))
+        if isinstance(reply, Exception):
+            raise reply
+        if schema is grokScore.ListwiseScores:
+            parsed = schema(scores=[grokScore.ListwiseEntry(index=i, score=s) for i, s in reply])
+        else:
+            parsed = schema(score=reply)
+        return SimpleNamespace(usage=SimpleNamespace(total_tokens=100)), parsed
+
+
+@pytest.fixture
+def grok(monkeypatch):
+    """A FakeGrok that every scoring function gets instead of a real client."""
+    fake = FakeGrok(scores={grokScore.SCORING_MODEL: 60, grokScore.FAST_SCORING_MODEL: 60})
+    monkeypatch.setattr(grokScore, 'Client', lambda **kwargs: fake)
+    return fake
+
+
+class TestScoreMemo:
+    """Test that scores are memoized until the job's calibration changes."""
+
+    def score(self, grok, job_id='memo-test-job', description='Python developer'):
+        return grokScore._cached_score(grok, job_id, description, 'Senior Python role', '')
+
+    def test_repeat_calls_hit_the_cache(self, grok):
+        """Test that an identical request is answered without a second Grok call."""
+        first, first_cached = self.score(grok)
+        second, second_cached = self.score(grok)
+
+        assert (first.score, first_cached) == (60, False)
+        assert (second.score, second_cached) == (60, True)
+        assert len(grok.calls) == 1
+
+    def test_feedback_invalidates_only_its_job(self, grok):
+        """Test that a generation bump for a job drops its entries and no others."""
+        self.score(grok)
+        self.score(grok, job_id='memo-other-job')
+
+        update_policy_state('memo-test-job', delta=-10)
+        grok.scores[grokScore.SCORING_MODEL] = 45
+
+        result, cached = self.score(grok)
+        assert (result.score, cached) == (45, False)
+        other, other_cached = self.score(grok, job_id='memo-other-job')
+        assert (other.score, other_cached) == (60, True)
+        assert len(grok.calls) == 3
+
+    def test_failed_calls_are_not_cached(self, grok):
+        """Test that an error reaches the caller and the next call retries."""
+        grok.scores[grokScore.SCORING_MODEL] = RuntimeError("grok unavailable")
+        with pytest.raises(RuntimeError):
+            self.score(grok)
+
+        grok.scores[grokScore.SCORING_MODEL] = 70
+        assert self.score(grok)[0].score == 70
+        assert len(grok.calls) == 2
+
+
+class TestCascade:
+    """Test the fast-model-first scoring cascade."""
+
+    FAST = grokScore.FAST_SCORING_MODEL
+    FULL = grokScore.SCORING_MODEL
+
+    @pytest.fixture(autouse=True)
+    def no_audits(self, monkeypatch):
+        monkeypatch.setattr(grokScore, 'CASCADE_AUDIT_RATE', 0.0)
+
+    def rank(self, grok, fast, full, description='Python developer', **kwargs):
+        grok.scores.update({self.FAST: fast, self.FULL: full})
+        return grokScore.rank_candidate(
+            description, 'Senior Python role', job_id='cascade-test-job',
+            candidate_id='cascade-candidate', cascade=True, **kwargs
+        )
+
+    def audits(self):
+        conn = open_connection()
+        rows = conn.execute("""
+            SELECT primary_model, shadow_model, primary_score, shadow_score
+            FROM shadow_scores WHERE job_id = 'cascade-test-job'
+        """).fetchall()
+        conn.close()
+        return rows
+
+    def test_clear_decisions_keep_the_fast_score(self, grok):
+        """Test that scores outside the band never reach the full model."""
+        threshold, band = grokScore.SHORTLIST_THRESHOLD, grokScore.CASCADE_BAND
+        for fast in (threshold - band - 1, threshold + band + 1):
+            result = self.rank(grok, fast=fast, full=50, description=f'Developer scored {fast}')
+            assert (result.score, result.scoring_model, result.fast_score) == (fast, self.FAST, fast)
+        assert [model for model, _ in grok.calls] == [self.FAST, self.FAST]
+
+    def test_boundary_scores_escalate(self, grok):
+        """Test that a fast score within CASCADE_BAND of the threshold is rescored by the full model."""
+        fast = grokScore.SHORTLIST_THRESHOLD - grokScore.CASCADE_BAND
+        result = self.rank(grok, fast=fast, full=90)
+
+        assert (result.score, result.scoring_model, result.fast_score) == (90, self.FULL, fast)
+        assert [model for model, _ in grok.calls] == [self.FAST, self.FULL]
+        assert self.audits() == []
+
+    def test_shortlist_threshold_moves_the_band(self, grok):
+        """Test that a per-request threshold decides which scores are near the boundary."""
+        result = self.rank(grok, fast=40, full=35, shortlist_threshold=45)
+        assert result.scoring_model == self.FULL
+
+    def test_audit_keeps_fast_score_when_models_agree(self, grok, monkeypatch):
+        """Test that an audited clear decision is recorded and keeps the fast score."""
+        monkeypatch.setattr(grokScore, 'CASCADE_AUDIT_RATE', 1.0)
+        tolerance = grokScore.CASCADE_TOLERANCE
+        result = self.rank(grok, fast=20, full=20 + tolerance)
+
+        assert (result.score, result.scoring_model) == (20, self.FAST)
+        assert self.audits() == [(self.FAST, self.FULL, 20, 20 + tolerance)]
+
+    def test_audit_escalates_when_models_disagree(self, grok, monkeypatch):
+        """Test that an audit differing by more than CASCADE_TOLERANCE returns the full score."""
+        monkeypatch.setattr(grokScore, 'CASCADE_AUDIT_RATE', 1.0)
+        full = 20 + grokScore.CASCADE_TOLERANCE + 1
+        result = self.rank(grok, fast=20, full=full)
+
+        assert (result.score, result.scoring_model, result.fast_score) == (full, self.FULL, 20)
+        assert self.audits() == [(self.FAST, self.FULL, 20, full)]
+
+
+class TestShadow:
+    """Test sampled background scoring by SHADOW_MODEL."""
+
+    SHADOW = 'grok-shadow-test'
+
+    @pytest.fixture(autouse=True)
+    def shadow(self, grok, monkeypatch):
+        """Shadow every uncached score on a private one-thread pool with two slots."""
+        executor = ThreadPoolExecutor(max_workers=1)
+        monkeypatch.setattr(grokScore, 'SHADOW_MODEL', self.SHADOW)
+        monkeypatch.setattr(grokScore, 'SHADOW_SAMPLE_RATE', 1.0)
+        monkeypatch.setattr(grokScore, '_shadow_executor', executor)
+        monkeypatch.setattr(grokScore, '_shadow_slots', threading.BoundedSemaphore(2))
+        grok.scores[self.SHADOW] = 40
+        yield executor
+        executor.shutdown(wait=True)
+
+    def rank(self, description):
+        return grokScore.rank_candidate(
+            description, 'Senior Python role', job_id='shadow-test-job',
+            candidate_id=description, calibration_mode='prompt', cascade=False
+        )
+
+    def drain(self, executor):
+        """Wait for the shadow work queued so far; the single worker runs it in order."""
+        executor.submit(lambda: None).result(timeout=5)
+
+    def recorded(self):
+        conn = open_connection()
+        rows = conn.execute("""
+            SELECT candidate_id, shadow_model, primary_score, shadow_score, error
+            FROM shadow_scores WHERE job_id = 'shadow-test-job' ORDER BY candidate_id
+        """).fetchall()
+        conn.close()
+        return rows
+
+    def shadow_calls(self, grok):
+        return sum(1 for model, _ in grok.calls if model == self.SHADOW)
+
+    def test_sampled_scores_are_recorded(self, grok, shadow):
+        """Test that a sampled score is compared in the background and the primary score is returned."""
+        assert self.rank('Shadowed developer').score == 60
+        self.drain(shadow)
+
+        assert self.recorded() == [('Shadowed developer', self.SHADOW, 60, 40, None)]
+
+    def test_sample_rate_gates_shadowing(self, grok, shadow, monkeypatch):
+        """Test that only draws below SHADOW_SAMPLE_RATE are shadowed, and cached scores never are."""
+        monkeypatch.setattr(grokScore, 'SHADOW_SAMPLE_RATE', 0.5)
+        draws = iter([0.7, 0.3])
+        monkeypatch.setattr(grokScore, 'random', SimpleNamespace(random=lambda: next(draws)))
+
+        self.rank('Unsampled developer')
+        self.rank('Sampled developer')
+        self.rank('Sampled developer')
+        self.drain(shadow)
+
+        assert [row[0] for row in self.recorded()] == ['Sampled developer']
+
+    @pytest.mark.parametrize("shadow_model", ["", grokScore.SCORING_MODEL])
+    def test_disabled_or_same_model_never_shadows(self, grok, shadow, monkeypatch, shadow_model):
+        """Test that an empty SHADOW_MODEL, or the primary model itself, disables shadowing."""
+        monkeypatch.setattr(grokScore, 'SHADOW_MODEL', shadow_model)
+        self.rank(f'Developer under {shadow_model or "no"} shadow')
+        self.drain(shadow)
+
+        assert self.recorded() == []
+        assert len(grok.calls) == 1
+
+    def test_full_slots_drop_samples(self, grok, shadow):
+        """Test that samples beyond the pending limit are dropped instead of queued, and slots come back."""
+        release = threading.Event()
+
+        def slow_shadow(prompt):
+            assert release.wait(5)
+            return 40
+        grok.scores[self.SHADOW] = slow_shadow
+
+        started = time.monotonic()
+        scores = [self.rank(f'Developer {n}').score for n in range(4)]
+        assert time.monotonic() - started < 1
+        assert scores == [60] * 4
+
+        release.set()
+        self.drain(shadow)
+        assert [row[0] for row in self.recorded()] == ['Developer 0', 'Developer 1']
+
+        self.rank('Developer 4')
+        self.drain(shadow)
+        assert len(self.recorded()) == 3
+
+    def test_failures_stay_in_the_background(self, grok, shadow, monkeypatch):
+        """Test that shadow model errors are recorded, and that recording or queueing errors are swallowed."""
+        grok.scores[self.SHADOW] = RuntimeError("shadow model unavailable")
+        assert self.rank('Failing shadow developer').score == 60
+        self.drain(shadow)
+        assert self.recorded() == [('Failing shadow developer', self.SHADOW, 60, None, 'shadow model unavailable')]
+
+        def broken_record(**kwargs):
+            raise RuntimeError("database is locked")
+        monkeypatch.setattr(grokScore, 'record_shadow_score', broken_record)
+        assert self.rank('Unrecorded developer').score == 60
+        self.drain(shadow)
+
+        shadow.shutdown(wait=True)
+        assert self.rank('Unqueued developer').score == 60
+        # Every slot was handed back
+        slots = grokScore._shadow_slots
+        assert slots.acquire(blocking=False) and slots.acquire(blocking=False)
+
+
+class TestRankCandidates:
+    """Test concurrent pointwise batch ranking."""
+
+    def rank(self, descriptions, job_id, **kwargs):
+        return grokScore.rank_candidates(descriptions, 'Senior Python role', job_id=job_id, cascade=False, **kwargs)
+
+    def test_every_candidate_is_reported_by_index(self, grok):
+        """Test one (index, score, error) per candidate, with a failed call as its error."""
+        def score(prompt):
+            if 'Cobol' in prompt:
+                raise RuntimeError("grok unavailable")
+            return 80 if 'Rust' in prompt else 30
+        grok.scores[grokScore.SCORING_MODEL] = score
+        results = self.rank(['Rust developer', 'Go developer', 'Cobol developer'], 'batch-index-job')
+
+        assert {index: (result.score if result else None, error) for index, result, error in results} == {
+            0: (80, None), 1: (30, None), 2: (None, "grok unavailable")
+        }
+
+    def test_results_stream_as_they_complete(self, grok):
+        """Test that a slow candidate does not hold back the ones scored after it."""
+        fast_seen = threading.Event()
+
+        def score(prompt):
+            if 'Slow' in prompt:
+                assert fast_seen.wait(5)
+            return 50
+        grok.scores[grokScore.SCORING_MODEL] = score
+        results = self.rank(['Slow developer', 'Fast developer'], 'batch-stream-job', max_workers=2)
+
+        first = next(results)
+        fast_seen.set()
+        assert first[0] == 1
+        assert [index for index, _, _ in results] == [0]
+
+    def test_abandoned_batch_settles_the_pool_gauges(self, grok):
+        """Test that closing the stream early cancels queued work without leaking queue depth."""
+        started, release = threading.Event(), threading.Event()
+
+        def score(prompt):
+            # Hold the single worker on the second candidate so the rest stay queued
+            if 'Developer 1' in prompt:
+                started.set()
+                assert release.wait(5)
+            return 50
+        grok.scores[grokScore.SCORING_MODEL] = score
+        labels = ("rank_batch",)
+        depth = metrics.POOL_QUEUE_DEPTH._values.get(labels, 0)
+        results = self.rank([f'Developer {i}' for i in range(5)], 'batch-abandoned-job', max_workers=1)
+
+        next(results)
+        assert started.wait(5)
+        results.close()
+        release.set()
+
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and (
+            metrics.POOL_QUEUE_DEPTH._values[labels] != depth or metrics.POOL_ACTIVE._values[labels]
+        ):
+            time.sleep(0.01)
+        assert metrics.POOL_QUEUE_DEPTH._values[labels] == depth
+        assert metrics.POOL_ACTIVE._values[labels] == 0
+        assert len(grok.calls) == 2
+
+
+class TestListwise:
+    """Test listwise batch ranking and its pointwise fallback."""
+
+    DESCRIPTIONS = ['Python developer', 'Go developer', 'Rust developer']
+
+    def rank(self, descriptions=DESCRIPTIONS, **kwargs):
+        results = grokScore.rank_candidates_listwise(
+            descriptions, 'Senior Python role', job_id='listwise-test-job', **kwargs
+        )
+        return {index: (result.score if result else None, error) for index, result, error in results}
+
+    def test_parse_ignores_invented_and_duplicate_indices(self, grok):
+        """Test that out-of-range numbers are dropped and a candidate's first score wins."""
+        grok.listwise = [(0, 80), (1, 40), (5, 99), (1, 10), (-1, 50)]
+        scores = grokScore._parse_listwise(grok, self.DESCRIPTIONS[:2], 'Senior Python role', '')
+        assert scores == {0: 80, 1: 40}
+
+    def test_one_call_scores_the_batch(self, grok):
+        """Test that a complete answer needs no pointwise calls."""
+        grok.listwise = [(2, 30), (0, 80), (1, 55)]
+        assert self.rank() == {0: (80, None), 1: (55, None), 2: (30, None)}
+        assert grok.calls == [(grokScore.SCORING_MODEL, 'ListwiseScores')]
+
+    def test_missing_candidates_are_scored_pointwise(self, grok):
+        """Test that a candidate left out of the answer (here beside a duplicate) falls back to pointwise."""
+        grok.listwise = [(0, 80), (0, 20), (2, 30)]
+        assert self.rank() == {0: (80, None), 1: (60, None), 2: (30, None)}
+        assert [schema for _, schema in grok.calls] == ['ListwiseScores', 'CandidateScore']
+
+    def test_failed_batch_falls_back_to_pointwise(self, grok):
+        """Test that a failed listwise call scores its candidates one by one, reporting their errors."""
+        grok.listwise = RuntimeError("listwise unavailable")
+        assert self.rank() == {0: (60, None), 1: (60, None), 2: (60, None)}
+
+        grok.scores[grokScore.SCORING_MODEL] = RuntimeError("grok unavailable")
+        assert self.rank(['Java developer']) == {0: (None, "grok unavailable")}
+
+    def test_batches_split_by_batch_size(self, grok):
+        """Test that batch_size candidates at most go into one call."""
+        grok.listwise = [(0, 70), (1, 70)]
+        results = self.rank([f'Developer {i}' for i in range(5)], batch_size=2)
+
+        assert results == {i: (70, None) for i in range(5)}
+        assert [schema for _, schema in grok.calls].count('ListwiseScores') == 3
@@ -0,0 +1,87 @@
+"""
+Unit Tests for offline policy replay
+
+Run with: pytest test_policy_replay.py -v
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from RLloop.rl_feedback import update_policy_state, get_policy_stats, LEARNING_RATE, DECAY_FACTOR, MIN_WEIGHT, open_connection  # noqa: E402
+from RLloop.policy_replay import load_reward_matrix, parameter_grid, replay, sweep  # noqa: E402
+
+
+class TestReplay:
+    """Test the vectorized recurrence against the SQL policy update."""
+
+    DELTAS = [-30, 15, 5, -60, 40]
+
+    @pytest.fixture(autouse=True)
+    def setup_replay_job(self):
+        """Log rewards for two jobs of different lengths."""
+        conn = open_connection()
+        for job_id, deltas in (('replay-test-job', self.DELTAS), ('replay-test-job-2', [10, -10])):
+            for i, delta in enumerate(deltas):
+                conn.execute("""
+                    INSERT INTO reward_log (candidate_id, job_id, ai_score, recruiter_score, delta, created_at)
+                    VALUES (?, ?, 50, ?, ?, ?)
+                """, (f'replay-candidate-{i}', job_id, 50 + delta, delta, 1000 + i))
+        conn.commit()
+        conn.close()
+
+        yield
+
+        conn = open_connection()
+        conn.execute("DELETE FROM reward_log WHERE job_id IN ('replay-test-job', 'replay-test-job-2')")
+        conn.execute("DELETE FROM policy_state WHERE job_id = 'replay-test-job'")
+        conn.commit()
+        conn.close()
+
+    def test_load_reward_matrix_pads_jobs(self):
+        """Test that jobs become rows in rating order, padded and masked."""
+        jobs, deltas, mask = load_reward_matrix(['replay-test-job', 'replay-test-job-2'])
+
+        assert jobs == ['replay-test-job', 'replay-test-job-2']
+        assert deltas.shape == (2, 5)
+        assert list(deltas[0]) == self.DELTAS
+        assert list(mask[1]) == [True, True, False, False, False]
+
+    def test_replay_matches_policy_update(self):
+        """Test that replaying with the live constants reproduces policy_state."""
+        for delta in self.DELTAS:
+            update_policy_state('replay-test-job', delta=delta)
+        stats = get_policy_stats('replay-test-job')
+
+        _, deltas, mask = load_reward_matrix(['replay-test-job'])
+        result = replay(deltas, mask, parameter_grid([LEARNING_RATE], [DECAY_FACTOR], [MIN_WEIGHT]))
+
+        assert result['error_avg'][0, 0, -1] == pytest.approx(stats['error_avg'])
+        assert result['weight'][0, 0, -1] == pytest.approx(stats['weight'])
+
+    def test_grid_matches_individual_replays(self):
+        """Test that vectorizing over the grid gives the same result as one point at a time."""
+        _, deltas, mask = load_reward_matrix(['replay-test-job', 'replay-test-job-2'])
+        grid = parameter_grid([0.1, 0.3], [0.9, 1.0], [0.01, 0.5])
+        batched = replay(deltas, mask, grid)
+
+        for i, point in enumerate(grid):
+            single = replay(deltas, mask, point[None, :])
+            assert np.allclose(batched['error_avg'][i], single['error_avg'][0])
+            assert np.allclose(batched['weight'][i], single['weight'][0])
+            assert batched['prediction_mae'][i] == pytest.approx(single['prediction_mae'][0])
+
+    def test_sweep_ranks_by_prediction_error(self):
+        """Test that the sweep report is sorted best-first and keeps padded jobs' final state."""
+        report = sweep([0.1, 0.5], [0.95], [MIN_WEIGHT], ['replay-test-job', 'replay-test-job-2'])
+
+        assert len(report) == 2
+        assert report[0]['prediction_mae'] <= report[1]['prediction_mae']
+        # Second job: |10| then (1 - lr) * 10 * 0.95 + lr * 10
+        final = report[0]['final_state']['replay-test-job-2']
+        lr = report[0]['learning_rate']
+        assert final['error_avg'] == pytest.approx((1 - lr) * 10 * 0.95 + lr * 10)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
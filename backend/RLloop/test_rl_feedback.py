@@ -4,20 +4,43 @@ Unit Tests for RL Feedback System
 Run with: pytest test_rl_feedback.py -v
 """
 
+import json
 import pytest
 import sqlite3
+import threading
 from pathlib import Path
-from rl_feedback import (
+from RLloop import rl_feedback
+from RLloop.rl_feedback import (
     compute_delta,
     update_ai_score,
     store_reward,
     update_policy_state,
     process_feedback,
+    process_feedback_batch,
+    FeedbackWriter,
     get_policy_stats,
     compute_calibration_metrics,
     get_reward_history,
+    iter_reward_rows,
+    encode_reward_cursor,
+    get_db_connection,
+    retry_on_locked,
+    get_job_generation,
+    JobCache,
+    StateSnapshot,
+    compact_reward_log,
+    configure_database,
+    close_db_connection,
+    fit_isotonic,
+    get_score_mapping,
+    record_shadow_score,
+    get_shadow_report,
+    MIN_MAPPING_SAMPLES,
     STAR_MAP,
-    DB_PATH
+    LEARNING_RATE,
+    DECAY_FACTOR,
+    MIN_WEIGHT,
+    open_connection
 )
 
 
@@ -58,13 +81,86 @@ class TestDeltaComputation:
             compute_delta(50, 6)  # Too high
 
 
+class TestConnectionManager:
+    """Test per-thread connection reuse and lock handling."""
+    
+    def test_connection_reused_per_thread(self, file_database):
+        """Test that a thread gets the same tuned connection on every call."""
+        conn = get_db_connection()
+        assert get_db_connection() is conn
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] > 0
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    
+    def test_connections_are_per_thread(self):
+        """Test that other threads get their own connection."""
+        results = []
+        thread = threading.Thread(target=lambda: results.append(get_db_connection()))
+        thread.start()
+        thread.join()
+        assert results[0] is not get_db_connection()
+    
+    def test_retry_on_locked(self, monkeypatch):
+        """Test that 'database is locked' errors are retried, other errors are not."""
+        monkeypatch.setattr('RLloop.rl_feedback.LOCK_RETRY_BACKOFF', 0)
+        attempts = []
+        
+        @retry_on_locked
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise sqlite3.OperationalError("database is locked")
+            return "ok"
+        
+        assert flaky() == "ok"
+        assert len(attempts) == 3
+        
+        @retry_on_locked
+        def broken():
+            attempts.append(1)
+            raise sqlite3.OperationalError("no such table: nope")
+        
+        attempts.clear()
+        with pytest.raises(sqlite3.OperationalError):
+            broken()
+        assert len(attempts) == 1
+    
+    def test_schema_waits_for_app_tables(self, tmp_path):
+        """Test that the RL triggers are created once reward_log exists, not skipped for good."""
+        configure_database(tmp_path / 'empty.db')
+        get_db_connection()
+        assert str(tmp_path / 'empty.db') not in rl_feedback._schema_ready
+        
+        # The app creates its tables later, from another connection
+        conn = open_connection()
+        with conn:
+            for statement in rl_feedback.BASE_SCHEMA:
+                conn.execute(statement)
+        conn.close()
+        
+        close_db_connection()
+        update_policy_state('schema-test-job', delta=10)
+        assert str(tmp_path / 'empty.db') in rl_feedback._schema_ready
+        assert get_job_generation('schema-test-job') == 1
+    
+    def test_archive_follows_the_database(self, tmp_path):
+        """Test that a database file gets a sibling archive and a URI needs one configured."""
+        configure_database(tmp_path / 'jobs.db')
+        assert rl_feedback.ARCHIVE_DB_PATH == tmp_path / 'jobs_archive.db'
+        
+        configure_database('file:/archive-test?vfs=memdb')
+        assert rl_feedback.ARCHIVE_DB_PATH is None
+        with pytest.raises(ValueError):
+            compact_reward_log(retention_days=180, now=10**9)
+
+
 class TestDatabaseOperations:
     """Test database CRUD operations."""
     
     @pytest.fixture(autouse=True)
     def setup_test_data(self):
         """Create test candidates and jobs."""
-        conn = sqlite3.connect(str(DB_PATH))
+        conn = open_connection()
         cur = conn.cursor()
         
         # Create test job if doesn't exist
@@ -95,7 +191,7 @@ class TestDatabaseOperations:
         yield
         
         # Cleanup after tests
-        conn = sqlite3.connect(str(DB_PATH))
+        conn = open_connection()
         cur = conn.cursor()
         cur.execute("DELETE FROM reward_log WHERE job_id = 'test-job-rl'")
         cur.execute("DELETE FROM policy_state WHERE job_id = 'test-job-rl'")
@@ -117,7 +213,7 @@ class TestDatabaseOperations:
         assert reward_id > 0
         
         # Verify it was stored
-        conn = sqlite3.connect(str(DB_PATH))
+        conn = open_connection()
         cur = conn.cursor()
         cur.execute("SELECT * FROM reward_log WHERE id = ?", (reward_id,))
         row = cur.fetchone()
@@ -132,7 +228,7 @@ class TestDatabaseOperations:
         """Test updating AI score in candidates table."""
         update_ai_score('test-candidate-rl', 88)
         
-        conn = sqlite3.connect(str(DB_PATH))
+        conn = open_connection()
         cur = conn.cursor()
         cur.execute("SELECT score FROM candidates WHERE id = ?", ('test-candidate-rl',))
         score = cur.fetchone()[0]
@@ -147,7 +243,7 @@ class TestPolicyState:
     @pytest.fixture(autouse=True)
     def setup_test_job(self):
         """Create test job."""
-        conn = sqlite3.connect(str(DB_PATH))
+        conn = open_connection()
         cur = conn.cursor()
         cur.execute("""
             INSERT OR IGNORE INTO jobs (id, title, team, location, type, created_at)
@@ -159,7 +255,7 @@ class TestPolicyState:
         yield
         
         # Cleanup
-        conn = sqlite3.connect(str(DB_PATH))
+        conn = open_connection()
         cur = conn.cursor()
         cur.execute("DELETE FROM policy_state WHERE job_id = 'test-policy-job'")
         cur.execute("DELETE FROM jobs WHERE id = 'test-policy-job'")
@@ -207,6 +303,31 @@ class TestPolicyState:
         
         # Weight should decrease
         assert stats2['weight'] < stats1['weight']
+    
+    def test_policy_update_matches_decay_formula(self):
+        """Test the SQL upsert applies the exponential-decay recurrence exactly."""
+        update_policy_state('test-policy-job', delta=-30)
+        update_policy_state('test-policy-job', delta=5)
+        stats = get_policy_stats('test-policy-job')
+        
+        expected_error = (1 - LEARNING_RATE) * 30 * DECAY_FACTOR + LEARNING_RATE * 5
+        assert stats['error_avg'] == pytest.approx(expected_error)
+        assert stats['weight'] == pytest.approx(max(MIN_WEIGHT, 1.0 / (1.0 + expected_error)))
+    
+    def test_concurrent_updates_are_not_lost(self):
+        """Test that parallel feedback for one job counts every sample."""
+        threads = [
+            threading.Thread(target=update_policy_state, args=('test-policy-job', -10))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        stats = get_policy_stats('test-policy-job')
+        assert stats['sample_count'] == 8
+        assert stats['error_avg'] == pytest.approx(10 * (0.9 * 0.95) ** 7 + 10 * sum(0.1 * (0.9 * 0.95) ** k for k in range(7)))
 
 
 class TestCompletePipeline:
@@ -215,7 +336,7 @@ class TestCompletePipeline:
     @pytest.fixture(autouse=True)
     def setup_complete_test(self):
         """Setup test data."""
-        conn = sqlite3.connect(str(DB_PATH))
+        conn = open_connection()
         cur = conn.cursor()
         
         cur.execute("""
@@ -244,7 +365,7 @@ class TestCompletePipeline:
         yield
         
         # Cleanup
-        conn = sqlite3.connect(str(DB_PATH))
+        conn = open_connection()
         cur = conn.cursor()
         cur.execute("DELETE FROM reward_log WHERE job_id = 'pipeline-test-job'")
         cur.execute("DELETE FROM policy_state WHERE job_id = 'pipeline-test-job'")
@@ -272,7 +393,7 @@ class TestCompletePipeline:
         
         # Verify database updates
         # 1. Check candidates table
-        conn = sqlite3.connect(str(DB_PATH))
+        conn = open_connection()
         cur = conn.cursor()
         cur.execute("SELECT score FROM candidates WHERE id = ?", ('pipeline-test-candidate',))
         score = cur.fetchone()[0]
@@ -288,6 +409,137 @@ class TestCompletePipeline:
         assert stats['sample_count'] == 1
         
         conn.close()
+    
+    def test_process_feedback_batch(self):
+        """Test that a batch matches the same ratings processed one by one."""
+        ratings = [
+            {'candidate_id': 'pipeline-test-candidate', 'job_id': 'pipeline-test-job', 'ai_score': 85, 'recruiter_stars': 3},
+            {'candidate_id': 'pipeline-test-candidate', 'job_id': 'pipeline-test-job', 'ai_score': 60, 'recruiter_stars': 4},
+            {'candidate_id': 'pipeline-test-candidate', 'job_id': 'pipeline-test-job', 'ai_score': 40, 'recruiter_stars': 1},
+        ]
+        results = process_feedback_batch(ratings)
+        
+        assert [r['delta'] for r in results] == [-35, 15, -40]
+        
+        conn = open_connection()
+        cur = conn.cursor()
+        for result in results:
+            cur.execute("SELECT delta FROM reward_log WHERE id = ?", (result['reward_id'],))
+            assert cur.fetchone()[0] == result['delta']
+        cur.execute("SELECT score FROM candidates WHERE id = ?", ('pipeline-test-candidate',))
+        assert cur.fetchone()[0] == 40  # last rating wins
+        conn.close()
+        
+        # Policy updates applied in order: 35, then 15, then 40
+        expected = 35.0
+        for error in (15, 40):
+            expected = (1 - LEARNING_RATE) * expected * DECAY_FACTOR + LEARNING_RATE * error
+        stats = get_policy_stats('pipeline-test-job')
+        assert stats['sample_count'] == 3
+        assert stats['error_avg'] == pytest.approx(expected)
+    
+    def test_process_feedback_batch_rejects_invalid(self):
+        """Test that one bad rating rejects the whole batch."""
+        ratings = [
+            {'candidate_id': 'pipeline-test-candidate', 'job_id': 'pipeline-test-job', 'ai_score': 85, 'recruiter_stars': 3},
+            {'candidate_id': 'pipeline-test-candidate', 'job_id': 'pipeline-test-job', 'ai_score': 60},
+        ]
+        with pytest.raises(ValueError):
+            process_feedback_batch(ratings)
+        assert get_policy_stats('pipeline-test-job') is None
+    
+    def test_feedback_writer_group_commits(self):
+        """Test that queued ratings are acknowledged, then written on flush."""
+        writer = FeedbackWriter(max_wait=0.2)
+        try:
+            acks = [
+                writer.submit('pipeline-test-candidate', 'pipeline-test-job', ai_score=50, recruiter_stars=stars)
+                for stars in (5, 4, 3)
+            ]
+            assert [ack['delta'] for ack in acks] == [50, 25, 0]
+            assert all(ack['queued'] for ack in acks)
+            
+            with pytest.raises(ValueError):
+                writer.submit('pipeline-test-candidate', 'pipeline-test-job', ai_score=50, recruiter_stars=0)
+            
+            assert writer.flush(timeout=5)
+            assert writer.pending() == 0
+            assert writer.written == 3
+            assert get_policy_stats('pipeline-test-job')['sample_count'] == 3
+        finally:
+            writer.close(timeout=5)
+    
+    def test_feedback_writer_close_drains_queue(self):
+        """Test that closing the writer commits everything still queued."""
+        writer = FeedbackWriter(max_wait=10)
+        writer.submit('pipeline-test-candidate', 'pipeline-test-job', ai_score=80, recruiter_stars=4)
+        writer.close(timeout=5)
+        
+        assert get_policy_stats('pipeline-test-job')['sample_count'] == 1
+        with pytest.raises(RuntimeError):
+            writer.submit('pipeline-test-candidate', 'pipeline-test-job', ai_score=80, recruiter_stars=4)
+    
+    def test_invalid_rating_writes_nothing(self):
+        """Test that a rejected rating leaves every table untouched."""
+        with pytest.raises(ValueError):
+            process_feedback('pipeline-test-candidate', 'pipeline-test-job', ai_score=70, recruiter_stars=9)
+        
+        conn = open_connection()
+        cur = conn.cursor()
+        cur.execute("SELECT score FROM candidates WHERE id = ?", ('pipeline-test-candidate',))
+        assert cur.fetchone()[0] is None
+        cur.execute("SELECT COUNT(*) FROM reward_log WHERE job_id = ?", ('pipeline-test-job',))
+        assert cur.fetchone()[0] == 0
+        conn.close()
+        assert get_policy_stats('pipeline-test-job') is None
+    
+    def test_feedback_keeps_calibrated_score(self):
+        """Test that feedback stores the raw score without overwriting a calibrated one."""
+        conn = open_connection()
+        conn.execute("UPDATE candidates SET score = 70, raw_score = 55 WHERE id = 'pipeline-test-candidate'")
+        conn.commit()
+        
+        result = process_feedback('pipeline-test-candidate', 'pipeline-test-job', ai_score=55, recruiter_stars=4)
+        
+        assert result['delta'] == 20  # 75 - 55, against the raw score
+        row = conn.execute(
+            "SELECT score, raw_score FROM candidates WHERE id = 'pipeline-test-candidate'"
+        ).fetchone()
+        assert row == (70, 55)
+        conn.close()
+
+
+class TestStateSnapshot:
+    """Test the in-memory copy of policy state and calibration aggregates."""
+    
+    @pytest.fixture(autouse=True)
+    def cleanup_snapshot_job(self):
+        yield
+        conn = open_connection()
+        conn.execute("DELETE FROM policy_state WHERE job_id = 'snapshot-test-job'")
+        conn.commit()
+        conn.close()
+    
+    def test_snapshot_reloads_only_after_a_commit(self):
+        """Test that policy reads are served from memory until another connection writes."""
+        snapshot = StateSnapshot()
+        update_policy_state('snapshot-test-job', delta=-20)
+        
+        assert snapshot.policy_stats('snapshot-test-job')['sample_count'] == 1
+        reloads = snapshot.reloads
+        for _ in range(5):
+            snapshot.policy_stats('snapshot-test-job')
+        assert snapshot.reloads == reloads
+        
+        # Writes from any other connection (thread or process) are picked up on the next read
+        conn = open_connection()
+        conn.execute("UPDATE policy_state SET weight = 0.5 WHERE job_id = 'snapshot-test-job'")
+        conn.commit()
+        conn.close()
+        
+        assert snapshot.policy_stats('snapshot-test-job')['weight'] == 0.5
+        assert snapshot.reloads == reloads + 1
+        snapshot.close()
 
 
 class TestAnalytics:
@@ -296,7 +548,7 @@ class TestAnalytics:
     @pytest.fixture(autouse=True)
     def setup_analytics_data(self):
         """Setup test data with multiple feedback samples."""
-        conn = sqlite3.connect(str(DB_PATH))
+        conn = open_connection()
         cur = conn.cursor()
         
         cur.execute("""
@@ -342,7 +594,7 @@ class TestAnalytics:
         yield
         
         # Cleanup
-        conn = sqlite3.connect(str(DB_PATH))
+        conn = open_connection()
         cur = conn.cursor()
         cur.execute("DELETE FROM reward_log WHERE job_id = 'analytics-test-job'")
         cur.execute("DELETE FROM candidates WHERE job_id = 'analytics-test-job'")
@@ -366,6 +618,75 @@ class TestAnalytics:
         # RMSE should be higher than MAE (penalizes large errors)
         assert metrics['rmse'] > metrics['mae']
     
+    def test_calibration_aggregates_follow_deletes(self):
+        """Test that running aggregates stay exact when reward rows are removed."""
+        conn = open_connection()
+        conn.execute(
+            "DELETE FROM reward_log WHERE job_id = 'analytics-test-job' AND candidate_id = 'analytics-candidate-0'"
+        )
+        conn.commit()
+        conn.close()
+        
+        metrics = compute_calibration_metrics('analytics-test-job')
+        
+        # Remaining deltas: 15, 5
+        assert metrics['sample_count'] == 2
+        assert metrics['mae'] == 10.0
+        assert metrics['bias'] == 10.0
+        assert metrics['rmse'] == pytest.approx(11.18, abs=0.01)
+    
+    def test_job_cache_recomputes_only_after_feedback(self):
+        """Test that cached values survive reads and expire on any write for the job."""
+        cache = JobCache()
+        calls = []
+        
+        def compute():
+            calls.append(1)
+            return compute_calibration_metrics('analytics-test-job')['sample_count']
+        
+        assert cache.get('analytics-test-job', 1, compute) == 3
+        assert cache.get('analytics-test-job', 1, compute) == 3
+        assert len(calls) == 1
+        
+        # A write through another connection (e.g. another process) bumps the generation
+        generation = get_job_generation('analytics-test-job')
+        conn = open_connection()
+        conn.execute("""
+            INSERT INTO reward_log (candidate_id, job_id, ai_score, recruiter_score, delta, created_at)
+            VALUES ('analytics-candidate-0', 'analytics-test-job', 50, 50, 0, strftime('%s','now'))
+        """)
+        conn.commit()
+        conn.close()
+        assert get_job_generation('analytics-test-job') > generation
+        
+        assert cache.get('analytics-test-job', 1, compute) == 4
+        assert len(calls) == 2
+    
+    def test_windowed_calibration_metrics(self):
+        """Test last-N and since windows over reward_log."""
+        conn = open_connection()
+        conn.execute("""
+            INSERT INTO reward_log (candidate_id, job_id, ai_score, recruiter_score, delta, created_at)
+            VALUES ('analytics-candidate-0', 'analytics-test-job', 100, 0, -100, 1000)
+        """)
+        conn.commit()
+        conn.close()
+        
+        assert compute_calibration_metrics('analytics-test-job')['sample_count'] == 4
+        
+        # The old outlier is excluded by both windows
+        recent = compute_calibration_metrics('analytics-test-job', last_n=3)
+        assert recent['sample_count'] == 3
+        assert recent['bias'] == pytest.approx(-3.33, abs=0.01)
+        
+        since = compute_calibration_metrics('analytics-test-job', since=2000)
+        assert since == recent
+        
+        assert compute_calibration_metrics('analytics-test-job', last_n=2, since=2000)['sample_count'] == 2
+        assert compute_calibration_metrics('analytics-test-job', since=10**12)['sample_count'] == 0
+        with pytest.raises(ValueError):
+            compute_calibration_metrics('analytics-test-job', last_n=0)
+    
     def test_get_reward_history(self):
         """Test retrieving reward history."""
         history = get_reward_history('analytics-test-job', limit=10)
@@ -375,6 +696,54 @@ class TestAnalytics:
         assert all('ai_score' in entry for entry in history)
         assert all('recruiter_score' in entry for entry in history)
     
+    def test_reward_history_keyset_pagination(self):
+        """Test that cursors walk every row once, even when timestamps tie."""
+        seen = []
+        cursor = None
+        while True:
+            page = get_reward_history('analytics-test-job', limit=2, cursor=cursor)
+            seen.extend(entry['id'] for entry in page)
+            if len(page) < 2:
+                break
+            cursor = encode_reward_cursor(page[-1])
+        
+        assert sorted(seen) == sorted(entry['id'] for entry in get_reward_history('analytics-test-job', limit=10))
+        assert len(seen) == len(set(seen)) == 3
+        
+        with pytest.raises(ValueError):
+            get_reward_history('analytics-test-job', cursor='not-a-cursor')
+    
+    def test_iter_reward_rows_streams_all_jobs(self):
+        """Test streaming export across several jobs."""
+        rows = list(iter_reward_rows(['analytics-test-job', 'nonexistent-job']))
+        
+        assert len(rows) == 3
+        assert rows == get_reward_history('analytics-test-job', limit=10)
+    
+    def test_shadow_report_compares_with_feedback(self):
+        """Test shadow divergence and accuracy against recruiter ratings."""
+        try:
+            record_shadow_score('analytics-test-job', 'analytics-candidate-0', 'grok-4', 'grok-4-fast',
+                                primary_score=80, shadow_score=60, primary_tokens=900, shadow_tokens=300)
+            record_shadow_score('analytics-test-job', 'unrated-candidate', 'grok-4', 'grok-4-fast',
+                                primary_score=70, shadow_score=None, error='timeout')
+            
+            [report] = get_shadow_report('analytics-test-job')
+            
+            assert report['samples'] == 2
+            assert report['errors'] == 1
+            assert report['mean_divergence'] == -20
+            assert report['shadow_tokens'] == 300
+            # analytics-candidate-0 was rated 50 by the recruiter
+            assert report['rated'] == 1
+            assert report['primary_mae'] == 30
+            assert report['shadow_mae'] == 10
+        finally:
+            conn = open_connection()
+            conn.execute("DELETE FROM shadow_scores WHERE job_id = 'analytics-test-job'")
+            conn.commit()
+            conn.close()
+    
     def test_calibration_metrics_empty_job(self):
         """Test metrics for job with no feedback."""
         metrics = compute_calibration_metrics('nonexistent-job')
@@ -385,5 +754,142 @@ class TestAnalytics:
         assert metrics['rmse'] is None
 
 
+class TestCompaction:
+    """Test moving old rewards to the archive database."""
+    
+    DAY = 86400
+    NOW = 10**9
+    
+    @pytest.fixture(autouse=True)
+    def setup_compaction_data(self):
+        """Log two old and two recent rewards (conftest archives into a temp file)."""
+        conn = open_connection()
+        rows = [
+            (80, 50, self.NOW - 400 * self.DAY),
+            (60, 75, self.NOW - 300 * self.DAY),
+            (70, 75, self.NOW - 10 * self.DAY),
+            (40, 25, self.NOW - 1 * self.DAY),
+        ]
+        for i, (ai_score, recruiter_score, created_at) in enumerate(rows):
+            conn.execute("""
+                INSERT INTO reward_log (candidate_id, job_id, ai_score, recruiter_score, delta, created_at)
+                VALUES (?, 'compaction-test-job', ?, ?, ?, ?)
+            """, (f'compaction-candidate-{i}', ai_score, recruiter_score, recruiter_score - ai_score, created_at))
+        conn.commit()
+        conn.close()
+        
+        yield
+        
+        conn = open_connection()
+        conn.execute("DELETE FROM reward_log WHERE job_id = 'compaction-test-job'")
+        conn.execute("DELETE FROM reward_summary WHERE job_id = 'compaction-test-job'")
+        conn.execute("DELETE FROM calibration_stats WHERE job_id = 'compaction-test-job'")
+        conn.commit()
+        conn.close()
+    
+    def live_count(self):
+        conn = open_connection()
+        count = conn.execute(
+            "SELECT COUNT(*) FROM reward_log WHERE job_id = 'compaction-test-job'"
+        ).fetchone()[0]
+        conn.close()
+        return count
+    
+    def test_compaction_is_transparent(self):
+        """Test that history and metrics are unchanged after archiving old rows."""
+        before_metrics = compute_calibration_metrics('compaction-test-job')
+        before_history = get_reward_history('compaction-test-job', limit=10)
+        before_window = compute_calibration_metrics('compaction-test-job', last_n=3)
+        
+        result = compact_reward_log(retention_days=180, now=self.NOW)
+        
+        assert 'compaction-test-job' in result['jobs']
+        assert self.live_count() == 2
+        assert compute_calibration_metrics('compaction-test-job') == before_metrics
+        assert get_reward_history('compaction-test-job', limit=10) == before_history
+        assert compute_calibration_metrics('compaction-test-job', last_n=3) == before_window
+        assert compute_calibration_metrics('compaction-test-job', since=self.NOW - 350 * self.DAY)['sample_count'] == 3
+    
+    def test_compaction_summary_and_rerun(self):
+        """Test summary aggregates/histograms and that a second run is a no-op."""
+        compact_reward_log(retention_days=180, now=self.NOW)
+        compact_reward_log(retention_days=180, now=self.NOW)
+        
+        conn = open_connection()
+        count, sum_delta, delta_histogram, score_histogram = conn.execute("""
+            SELECT sample_count, sum_delta, delta_histogram, score_histogram
+            FROM reward_summary WHERE job_id = 'compaction-test-job'
+        """).fetchone()
+        conn.close()
+        
+        assert count == 2
+        assert sum_delta == -15
+        assert json.loads(delta_histogram) == {'-30': 1, '10': 1}
+        assert json.loads(score_histogram) == {'80:50': 1, '60:75': 1}
+    
+    def test_export_resumes_on_other_threads(self):
+        """Test that a paged export spanning live and archived rows can be resumed from any thread."""
+        compact_reward_log(retention_days=180, now=self.NOW)
+        rows = iter_reward_rows(['compaction-test-job'], page_size=1)
+        exported = []
+        
+        def pull():
+            exported.append(next(rows, None))
+        
+        for _ in range(5):
+            thread = threading.Thread(target=pull)
+            thread.start()
+            thread.join()
+        
+        assert exported[-1] is None
+        assert exported[:-1] == get_reward_history('compaction-test-job', limit=10)
+
+
+class TestScoreMapping:
+    """Test the isotonic map from AI score to recruiter score."""
+    
+    @pytest.fixture(autouse=True)
+    def cleanup_mapping_job(self):
+        yield
+        conn = open_connection()
+        conn.execute("DELETE FROM reward_log WHERE job_id = 'mapping-test-job'")
+        conn.commit()
+        conn.close()
+    
+    def log_rewards(self, pairs):
+        conn = open_connection()
+        conn.executemany("""
+            INSERT INTO reward_log (candidate_id, job_id, ai_score, recruiter_score, delta, created_at)
+            VALUES ('mapping-candidate', 'mapping-test-job', ?, ?, ?, strftime('%s','now'))
+        """, [(ai, rec, rec - ai) for ai, rec in pairs])
+        conn.commit()
+        conn.close()
+    
+    def test_fit_isotonic_pools_violators(self):
+        """Test that decreasing neighbours are pooled into their weighted mean."""
+        xs, ys = fit_isotonic([(10, 1, 20), (20, 1, 60), (30, 3, 40), (40, 1, 90)])
+        
+        assert ys == sorted(ys)
+        assert xs == [10, 20, 30, 40]
+        assert ys[1] == ys[2] == pytest.approx(45)
+    
+    def test_mapping_needs_enough_samples(self):
+        """Test that no mapping is used until the job has MIN_MAPPING_SAMPLES ratings."""
+        self.log_rewards([(80, 50)] * (MIN_MAPPING_SAMPLES - 1))
+        assert get_score_mapping('mapping-test-job') is None
+    
+    def test_mapping_refits_after_feedback(self):
+        """Test that the mapping is monotone, clamps, and picks up new ratings."""
+        self.log_rewards([(90, 50), (90, 50), (70, 25), (70, 25), (50, 0)])
+        mapping = get_score_mapping('mapping-test-job')
+        
+        assert mapping(90) == 50
+        assert mapping(80) == 38  # Halfway between 25 and 50
+        assert mapping(100) == 50 and mapping(0) == 0
+        
+        self.log_rewards([(90, 100)] * 6)
+        assert get_score_mapping('mapping-test-job')(90) == 88  # (2 * 50 + 6 * 100) / 8
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "--tb=short"])
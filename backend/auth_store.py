@@ -0,0 +1,161 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class TTLStore:
+    """
+    Bounded key/value store with per-entry TTL eviction.
+
+    Entries expire after `ttl_seconds` and the oldest entries are evicted once
+    `max_entries` is exceeded. When `db_path` is given the store is backed by a
+    SQLite table instead of process memory, so several worker processes can
+    share it. Values must be JSON-serializable in that mode.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl_seconds: float,
+        max_entries: int = 1024,
+        db_path: Optional[str] = None
+    ):
+        """
+        Args:
+            namespace: Name used to partition entries when sharing a SQLite file
+            ttl_seconds: Default lifetime of an entry
+            max_entries: Upper bound on live entries before the oldest are evicted
+            db_path: Optional SQLite file for cross-process storage
+        """
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._conn = None
+
+        if db_path:
+            self._conn = sqlite3.connect(db_path, timeout=5.0, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS auth_store (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_auth_store_expiry ON auth_store(namespace, expires_at)"
+            )
+            self._conn.commit()
+
+    def get(self, key: Optional[str], default: Any = None) -> Any:
+        """Return the live value for `key`, or `default` if missing or expired."""
+        if key is None:
+            return default
+
+        now = time.time()
+        with self._lock:
+            if self._conn is None:
+                entry = self._entries.get(key)
+                if entry is None:
+                    return default
+                expires_at, value = entry
+                if expires_at <= now:
+                    del self._entries[key]
+                    return default
+                return value
+
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM auth_store WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+            if row is None:
+                return default
+            if row[1] <= now:
+                self._conn.execute(
+                    "DELETE FROM auth_store WHERE namespace = ? AND key = ?",
+                    (self.namespace, key)
+                )
+                self._conn.commit()
+                return default
+            return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store `value` under `key`, evicting expired and overflow entries."""
+        now = time.time()
+        expires_at = now + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+
+        with self._lock:
+            if self._conn is None:
+                self._entries.pop(key, None)
+                self._entries[key] = (expires_at, value)
+                self._evict(now)
+                return
+
+            self._conn.execute("""
+                INSERT INTO auth_store (namespace, key, value, expires_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(namespace, key) DO UPDATE SET
+                    value = excluded.value,
+                    expires_at = excluded.expires_at
+            """, (self.namespace, key, json.dumps(value), expires_at))
+            self._evict(now)
+            self._conn.commit()
+
+    def pop(self, key: Optional[str], default: Any = None) -> Any:
+        """Remove `key` and return its live value, or `default`."""
+        value = self.get(key, default)
+        if key is None:
+            return value
+
+        with self._lock:
+            if self._conn is None:
+                self._entries.pop(key, None)
+            else:
+                self._conn.execute(
+                    "DELETE FROM auth_store WHERE namespace = ? AND key = ?",
+                    (self.namespace, key)
+                )
+                self._conn.commit()
+        return value
+
+    def __len__(self) -> int:
+        now = time.time()
+        with self._lock:
+            if self._conn is None:
+                return sum(1 for expires_at, _ in self._entries.values() if expires_at > now)
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM auth_store WHERE namespace = ? AND expires_at > ?",
+                (self.namespace, now)
+            ).fetchone()[0]
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then the oldest ones beyond `max_entries`. Caller holds the lock."""
+        if self._conn is None:
+            expired = [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]
+            for k in expired:
+                del self._entries[k]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return
+
+        self._conn.execute(
+            "DELETE FROM auth_store WHERE namespace = ? AND expires_at <= ?",
+            (self.namespace, now)
+        )
+        self._conn.execute("""
+            DELETE FROM auth_store
+            WHERE namespace = ? AND key IN (
+                SELECT key FROM auth_store
+                WHERE namespace = ?
+                ORDER BY expires_at DESC
+                LIMIT -1 OFFSET ?
+            )
+        """, (self.namespace, self.namespace, self.max_entries))
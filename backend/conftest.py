@@ -0,0 +1,57 @@
+"""
+Shared setup for the backend tests.
+
+The backend modules import each other as they do when main.py runs from
+backend/, so this directory goes on sys.path. x_analyzer builds its xAI
+client at import time; the tests never call it, so any key will do.
+
+Every test runs against its own in-memory SQLite database with the full
+RL schema, so tests never touch data/recruiter.db and can run in parallel
+(e.g. pytest -n auto) without seeing each other's rows.
+"""
+
+import itertools
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+os.environ.setdefault('XAI_API_KEY', 'test-key')
+
+from RLloop import rl_feedback  # noqa: E402
+
+_database_ids = itertools.count()
+
+
+def _use_database(database, tmp_path):
+    previous = rl_feedback.DATABASE, rl_feedback.ARCHIVE_DB_PATH
+    rl_feedback.configure_database(database, bootstrap=True, archive=tmp_path / 'archive.db')
+    return previous
+
+
+@pytest.fixture(autouse=True)
+def rl_database(tmp_path):
+    """Point rl_feedback at a fresh, bootstrapped in-memory database, archiving into tmp_path."""
+    worker = os.getenv('PYTEST_XDIST_WORKER', 'main')
+    uri = f"file:/rl-test-{worker}-{os.getpid()}-{next(_database_ids)}?vfs=memdb"
+    # A memdb database lives as long as some connection to it is open
+    anchor = sqlite3.connect(uri, uri=True)
+    previous_database, previous_archive = _use_database(uri, tmp_path)
+
+    yield uri
+
+    rl_feedback.close_db_connection()
+    rl_feedback.configure_database(previous_database, archive=previous_archive)
+    anchor.close()
+
+
+@pytest.fixture
+def file_database(rl_database, tmp_path):
+    """Use an on-disk database instead, for tests of WAL and file-level behavior."""
+    path = tmp_path / 'recruiter.db'
+    _use_database(path, tmp_path)
+    yield path
+    rl_feedback.close_db_connection()
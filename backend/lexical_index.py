@@ -0,0 +1,110 @@
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Sequence, Tuple
+
+# Okapi BM25 parameters: term-frequency saturation and document-length normalization
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Words, keeping tech spellings like c++, c#, node.js and next.js together
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+_URL_RE = re.compile(r"https?://\S+")
+
+STOPWORDS = frozenset("""
+    a about after all also am an and any are as at be been but by can could do does for from get
+    had has have he her him his how i if in into is it its just me more most my no not of on one
+    or our out over rt she so some such than that the their them then there these they this to
+    too up us very was we were what when where which while who will with would you your amp
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase terms of `text`, without links, stopwords or single characters."""
+    return [
+        token for token in _TOKEN_RE.findall(_URL_RE.sub(" ", text.lower()))
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def candidate_document(candidate: Dict[str, Any]) -> str:
+    """
+    Searchable text of a candidate: bio, tweets and evaluation reason.
+
+    Accepts a hunt entry ({'user': ..., 'tweets': ..., 'evaluation': ...}) or a
+    stored candidate row with 'bio' and 'evaluation_reason'.
+    """
+    user = candidate.get('user') or {}
+    evaluation = candidate.get('evaluation') or {}
+    parts = [
+        user.get('description') or candidate.get('bio') or "",
+        *(candidate.get('tweets') or []),
+        evaluation.get('reason') or candidate.get('evaluation_reason') or "",
+    ]
+    return "\n".join(part for part in parts if part)
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed list of documents, in memory.
+
+    Postings map each term to (document, term frequency) pairs, so a query
+    only touches documents containing its terms. Building and querying an
+    index over thousands of profiles takes milliseconds.
+    """
+
+    def __init__(self, documents: Sequence[str], k1: float = BM25_K1, b: float = BM25_B):
+        """
+        Args:
+            documents: Document texts; results refer to them by position
+            k1: Term-frequency saturation
+            b: Strength of document-length normalization (0-1)
+        """
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.doc_lengths: List[int] = []
+
+        for doc_id, text in enumerate(documents):
+            counts = Counter(tokenize(text))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                self.postings.setdefault(term, []).append((doc_id, frequency))
+
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def idf(self, term: str) -> float:
+        """BM25 inverse document frequency (always positive)."""
+        containing = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self) - containing + 0.5) / (containing + 0.5))
+
+    def scores(self, query: str) -> List[float]:
+        """BM25 score of every document for `query`, by document position."""
+        scores = [0.0] * len(self)
+        if not self.avg_length:
+            return scores
+
+        # Terms repeated in a long job description count proportionally more
+        for term, query_frequency in Counter(tokenize(query)).items():
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            weight = self.idf(term) * query_frequency
+            for doc_id, frequency in postings:
+                length_norm = 1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_length
+                scores[doc_id] += weight * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+        return scores
+
+
+def pre_rank(documents: Sequence[str], query: str, limit: int) -> Tuple[List[int], List[float]]:
+    """
+    Positions of the `limit` documents that best match `query` (all of them,
+    best first, when limit <= 0), plus every document's score.
+    """
+    index = BM25Index(documents)
+    scores = index.scores(query)
+    ranked = sorted(range(len(scores)), key=lambda doc_id: -scores[doc_id])
+    return (ranked[:limit] if limit > 0 else ranked), scores
@@ -1,7 +1,9 @@
 from flask import Flask, render_template, request, jsonify, session, redirect, url_for, make_response, Response
 from flask_cors import CORS
+import hashlib
 import json
 import os
+import secrets
 from dotenv import load_dotenv
 from xdk import Client
 from xdk.oauth2_auth import OAuth2PKCEAuth
@@ -10,11 +12,17 @@ from x_scraper import XScraper
 from x_analyzer import analyze_profile_for_job
 from x_head_hunter import XHeadHunter
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from RLloop.grokScore import rank_candidate, CandidateScore
+from RLloop.grokScore import rank_candidate, rank_candidates, rank_candidates_listwise, load_calibration, CandidateScore, CalibratedScore, CALIBRATION_MODES
 from x_dm import XDirectMessaging
+from auth_store import TTLStore
+from structured_log import get_logger
+from lexical_index import pre_rank
+from metrics import track_stage, track_upstream, submit_tracked, render_prometheus, PROMETHEUS_CONTENT_TYPE
 
 load_dotenv()
 
+log = get_logger("app")
+
 app = Flask(__name__, template_folder='../templates')
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key-change-in-production')
 
@@ -29,47 +37,82 @@ app.config['SESSION_COOKIE_SECURE'] = False  # Set to True in production with HT
 OAUTH_REDIRECT_URI = "http://localhost:8080/callback"
 OAUTH_SCOPE = "tweet.read users.read dm.read dm.write offline.access"
 
-# In-memory storage for PKCE verifiers (keyed by state)
+# Optional SQLite file shared by all worker processes for auth state
+AUTH_STORE_DB = os.getenv('AUTH_STORE_DB')
+PKCE_TTL_SECONDS = 10 * 60
+TOKEN_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# PKCE verifiers keyed by OAuth state. Abandoned authorizations expire.
 # This avoids session cookie issues with OAuth cross-site redirects
-pkce_store = {}
+pkce_store = TTLStore('pkce', ttl_seconds=PKCE_TTL_SECONDS, max_entries=1024, db_path=AUTH_STORE_DB)
+
+# Access tokens keyed by per-browser session id, so each recruiter has their own X identity
+token_store = TTLStore('tokens', ttl_seconds=TOKEN_TTL_SECONDS, max_entries=4096, db_path=AUTH_STORE_DB)
+
+# Resolved X identities keyed by token hash, so /auth/status polls skip users.get_me
+IDENTITY_TTL_SECONDS = 60
+identity_cache = TTLStore('identity', ttl_seconds=IDENTITY_TTL_SECONDS, max_entries=4096)
+
+# Maximum candidates accepted by one /rank/batch request
+MAX_RANK_BATCH = 100
 
-# In-memory storage for access tokens (simple single-user dev setup)
-token_store = None
+# Maximum candidates accepted by one /send-dm/batch request
+MAX_DM_BATCH = 50
 
 # Load users from JSON
 def load_users():
     with open('./extracted_users.json', 'r') as f:
         return json.load(f)
 
+def get_session_id() -> str:
+    """Return the id that keys this browser session's auth state, creating one if needed."""
+    if 'sid' not in session:
+        session['sid'] = secrets.token_urlsafe(16)
+        session.permanent = True
+    return session['sid']
+
 def get_xai_authenticated_client():
     return XAIClient(api_key=os.getenv('XAI_API_KEY'))
 
-def get_x_authenticated_client():
-    """Get an authenticated X client using stored tokens.
+def get_x_token():
+    """Get the stored X OAuth token for this request.
     
-    Tries cookies first, then falls back to in-memory token_store.
+    Tries cookies first, then falls back to this session's entry in token_store.
     Returns None if no valid token is found.
     """
-    global token_store
-    
-    # Try to get token from cookie first
     token_cookie = request.cookies.get('x_token')
-
-    print(f"Token cookie: {token_cookie}")
-
     if token_cookie:
         try:
-            token = json.loads(token_cookie)
-            return Client(token=token)
+            return json.loads(token_cookie)
         except json.JSONDecodeError:
             pass
     
-    # Fall back to in-memory token_store
-    if token_store:
-        return Client(token=token_store)
+    return token_store.get(session.get('sid'))
+
+def get_token_key(token: dict) -> str:
+    """Hash a token so it can key caches without keeping the secret around."""
+    return hashlib.sha256(token.get('access_token', '').encode()).hexdigest()
+
+def get_x_authenticated_client():
+    """Get an authenticated X client using stored tokens.
+    
+    Returns None if no valid token is found.
+    """
+    token = get_x_token()
+    if token:
+        return Client(token=token)
     
     return None
 
+def get_dm_handler() -> XDirectMessaging:
+    """DM handler whose sends are paced against the signed-in user's X rate limit."""
+    token = get_x_token()
+    return XDirectMessaging(
+        xai_client=get_xai_authenticated_client(),
+        x_client=Client(token=token) if token else None,
+        sender_key=get_token_key(token) if token else "default"
+    )
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -77,35 +120,49 @@ def index():
 @app.route('/auth/status')
 def auth_status():
     """Check if user is authenticated with X."""
-    client = get_x_authenticated_client()
-    if client:
-        try:
-            # Try to get the authenticated user's info
-            me = client.users.get_me(user_fields=["name", "username", "profile_image_url"])
-            if me and me.data:
-                return jsonify({
-                    "authenticated": True,
-                    "user": {
+    token = get_x_token()
+    if token:
+        token_key = get_token_key(token)
+        user = identity_cache.get(token_key)
+        if user is None:
+            try:
+                # Try to get the authenticated user's info
+                client = Client(token=token)
+                with track_upstream("x", "users.get_me"):
+                    me = client.users.get_me(user_fields=["name", "username", "profile_image_url"])
+                if me and me.data:
+                    user = {
                         "name": me.data.get("name"),
                         "username": me.data.get("username"),
                         "profile_image_url": me.data.get("profile_image_url")
                     }
-                })
-        except Exception as e:
-            print(f"Error getting user info: {e}")
+                    identity_cache.set(token_key, user)
+            except Exception as e:
+                log.warning("user info lookup failed", error=str(e))
+        
+        if user:
+            return jsonify({"authenticated": True, "user": user})
     
     return jsonify({"authenticated": False})
 
 @app.route('/auth/logout', methods=['POST'])
 def logout():
     """Clear authentication."""
-    global token_store
-    token_store = None
+    token = get_x_token()
+    if token:
+        identity_cache.pop(get_token_key(token))
+    token_store.pop(session.get('sid'))
     response = make_response(jsonify({"success": True}))
     response.delete_cookie('x_token')
     return response
 
 
+@app.route('/metrics')
+def metrics():
+    """Expose hunt stage and upstream call metrics in Prometheus text format."""
+    return Response(render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @app.route('/echo')
 def echo():
     return jsonify({"token": request.cookies.get('x_token')})
@@ -129,13 +186,12 @@ def authorize():
     # Step 2: Get authorization URL
     auth_url = auth.get_authorization_url()
     
-    # Store PKCE verifier in memory, keyed by state
+    # Store PKCE verifier keyed by state (expires if the flow is abandoned)
     # State is passed through OAuth flow and returned in callback
     state = auth.oauth2_session._state
-    pkce_store[state] = auth.code_verifier
+    pkce_store.set(state, auth.code_verifier)
     
-    print(f"Authorize - Storing state: {state}")
-    print(f"Authorize - Storing verifier: {auth.code_verifier[:20]}...")
+    log.info("authorize started")
     
     return redirect(auth_url)
 
@@ -148,11 +204,10 @@ def callback():
     if not code or not state:
         return "Authorization failed: missing code or state", 400
     
-    # Look up verifier from in-memory store using state
+    # Look up verifier from pkce_store using state
     verifier = pkce_store.get(state)
     
-    print(f"Callback - URL state: {state}")
-    print(f"Callback - Found verifier: {verifier is not None}")
+    log.info("oauth callback", found_verifier=verifier is not None)
     
     if not verifier:
         return f"Authorization failed: unknown state. Please try authorizing again.", 400
@@ -171,15 +226,13 @@ def callback():
         # Exchange code for tokens
         tokens = auth.fetch_token(authorization_response=request.url)
         
-        # Store tokens in memory
-        global token_store
-        token_store = tokens
+        # Store tokens for this session
+        token_store.set(get_session_id(), tokens)
 
         # Clean up PKCE store
         pkce_store.pop(state, None)
         
-        print("Callback - Token exchange successful!")
-        print(f"Callback - Access token stored: {tokens['access_token'][:20]}...")
+        log.info("token exchange successful")
         
         # Create response and redirect to frontend
         frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:3000')
@@ -190,7 +243,7 @@ def callback():
         
         return response
     except Exception as e:
-        print(f"Token exchange error: {e}")
+        log.error("token exchange failed", error=str(e))
         return f"Token exchange failed: {e}", 500
 
 # @app.route('/analyze', methods=['POST'])
@@ -272,11 +325,12 @@ def hunt_candidates():
             "success": True,
             "job_description": job_desc,
             "total_searched": result["total_searched"],
+            "evaluated_count": result["total_evaluated"],
             "candidates_count": result["total_viable"],
             "candidates": result["viable_candidates"]
         })
     except Exception as e:
-        print(f"Error during hunt: {e}")
+        log.error("hunt failed", error=str(e))
         return jsonify({"error": str(e)}), 500
 
 
@@ -315,7 +369,8 @@ def hunt_candidates_stream():
             
             # Step 1: Generate keywords
             yield send({"type": "progress", "message": "Generating search keywords with Grok..."})
-            keywords = head_hunter._generate_keywords()
+            with track_stage("keyword_generation"):
+                keywords = head_hunter._generate_keywords()
             
             if not keywords:
                 yield send({"type": "error", "message": "Failed to generate keywords"})
@@ -327,9 +382,9 @@ def hunt_candidates_stream():
             yield send({"type": "progress", "message": f"Searching X for users across {len(keywords)} keywords..."})
             
             users_map = {}
-            with ThreadPoolExecutor(max_workers=8) as executor:
+            with track_stage("search"), ThreadPoolExecutor(max_workers=8) as executor:
                 future_to_keyword = {
-                    executor.submit(head_hunter._search_users_by_keyword, keyword): keyword
+                    submit_tracked(executor, "search", head_hunter._search_users_by_keyword, keyword): keyword
                     for keyword in keywords
                 }
                 
@@ -350,14 +405,14 @@ def hunt_candidates_stream():
                         if new_users > 0:
                             yield send({"type": "search_progress", "keyword": keyword, "found": new_users, "total": len(users_map), "message": f"Found {new_users} new users via '{keyword}' ({len(users_map)} total)"})
                     except Exception as e:
-                        print(f"Error searching keyword '{keyword}': {e}")
+                        log.error("keyword search failed", keyword=keyword, error=str(e))
             
             yield send({"type": "progress", "message": f"Found {len(users_map)} unique users. Fetching tweets..."})
             
             # Step 3: Fetch tweets
-            with ThreadPoolExecutor(max_workers=4) as executor:
+            with track_stage("tweet_fetch"), ThreadPoolExecutor(max_workers=4) as executor:
                 future_to_username = {
-                    executor.submit(head_hunter._fetch_user_tweets, users_map[username]['user'].get('id')): username
+                    submit_tracked(executor, "tweet_fetch", head_hunter._fetch_user_tweets, users_map[username]['user'].get('id')): username
                     for username in users_map
                     if users_map[username]['user'].get('id')
                 }
@@ -372,18 +427,26 @@ def hunt_candidates_stream():
                         if tweets_fetched % 10 == 0:
                             yield send({"type": "tweets_progress", "fetched": tweets_fetched, "total": len(users_map), "message": f"Fetched tweets for {tweets_fetched}/{len(users_map)} users"})
                     except Exception as e:
-                        print(f"Error fetching tweets for @{username}: {e}")
+                        log.warning("tweet fetch failed", username=username, error=str(e))
             
-            yield send({"type": "progress", "message": f"Evaluating {len(users_map)} candidates with Grok..."})
+            # Step 4: Pre-rank locally; with HUNT_EVAL_LIMIT set only the best lexical matches cost a Grok call
+            with track_stage("pre_rank"):
+                selected = head_hunter._pre_rank(users_map)
             
-            # Step 4: Evaluate candidates
+            if len(selected) < len(users_map):
+                message = f"Evaluating the top {len(selected)} of {len(users_map)} candidates with Grok..."
+            else:
+                message = f"Evaluating {len(selected)} candidates with Grok..."
+            yield send({"type": "progress", "message": message})
+            
+            # Step 5: Evaluate candidates
             viable_candidates = {}
             evaluated = 0
             
-            with ThreadPoolExecutor(max_workers=20) as executor:
+            with track_stage("evaluation"), ThreadPoolExecutor(max_workers=20) as executor:
                 future_to_username = {
-                    executor.submit(head_hunter._evaluate_candidate, username, users_map[username], users_map[username]['tweets']): username
-                    for username in users_map
+                    submit_tracked(executor, "evaluation", head_hunter._evaluate_candidate, username, users_map[username], users_map[username]['tweets']): username
+                    for username in selected
                 }
                 
                 for future in as_completed(future_to_username):
@@ -401,7 +464,7 @@ def hunt_candidates_stream():
                                 "candidate": users_map[username],
                                 "message": f"✓ @{username} is viable",
                                 "evaluated": evaluated,
-                                "total": len(users_map),
+                                "total": len(selected),
                                 "viable_count": len(viable_candidates)
                             })
                         else:
@@ -409,23 +472,24 @@ def hunt_candidates_stream():
                                 yield send({
                                     "type": "eval_progress",
                                     "evaluated": evaluated,
-                                    "total": len(users_map),
+                                    "total": len(selected),
                                     "viable_count": len(viable_candidates),
-                                    "message": f"Evaluated {evaluated}/{len(users_map)} ({len(viable_candidates)} viable)"
+                                    "message": f"Evaluated {evaluated}/{len(selected)} ({len(viable_candidates)} viable)"
                                 })
                     except Exception as e:
-                        print(f"Error evaluating @{username}: {e}")
+                        log.warning("candidate evaluation failed", username=username, error=str(e))
             
             yield send({
                 "type": "complete",
                 "total_searched": len(users_map),
+                "total_evaluated": len(selected),
                 "total_viable": len(viable_candidates),
                 "candidates": viable_candidates,
                 "message": f"Hunt complete! Found {len(viable_candidates)} viable candidates out of {len(users_map)} searched"
             })
             
         except Exception as e:
-            print(f"Hunt stream error: {e}")
+            log.error("hunt stream failed", error=str(e))
             yield send({"type": "error", "message": str(e)})
     
     return Response(generate(), mimetype='text/event-stream', headers={
@@ -435,9 +499,30 @@ def hunt_candidates_stream():
         'Access-Control-Allow-Credentials': 'true'
     })
 
+def _cascade_options_error(cascade, shortlist_threshold):
+    """Validate the optional cascade fields of a /rank request."""
+    if cascade is not None and not isinstance(cascade, bool):
+        return "cascade must be a boolean"
+    if shortlist_threshold is not None and (
+        not isinstance(shortlist_threshold, int) or isinstance(shortlist_threshold, bool)
+        or not 0 <= shortlist_threshold <= 100
+    ):
+        return "shortlist_threshold must be an integer from 0 to 100"
+    return None
+
+
 @app.route('/rank', methods=['POST'])
 def rank_candidate_endpoint():
-    """Rank a candidate against job requirements using Grok with RL self-improvement."""
+    """
+    Rank a candidate against job requirements using Grok with RL self-improvement.
+    
+    Optional "calibration_mode" is "prompt" or "numeric". With the numeric
+    mapping applied, "score" is calibrated and "raw_score" is the model's own
+    score, which is what feedback should report as ai_score. Optional
+    "candidate_id" links shadow-model comparisons to later recruiter feedback.
+    Optional "cascade" (bool) and "shortlist_threshold" (0-100) score with the
+    fast model first; "scoring_model" then says which model decided.
+    """
     if request.is_json:
         data = request.json
     else:
@@ -446,16 +531,33 @@ def rank_candidate_endpoint():
     candidate_description = data.get('candidate_description')
     job_requirements = data.get('job_requirements')
     job_id = data.get('job_id')  # Optional: enables RL calibration
+    calibration_mode = data.get('calibration_mode')
+    candidate_id = data.get('candidate_id')
+    cascade = data.get('cascade')
+    shortlist_threshold = data.get('shortlist_threshold')
     
     if not candidate_description or not job_requirements:
         return jsonify({"error": "candidate_description and job_requirements are required"}), 400
+    if calibration_mode is not None and calibration_mode not in CALIBRATION_MODES:
+        return jsonify({"error": f"calibration_mode must be one of {', '.join(CALIBRATION_MODES)}"}), 400
+    cascade_error = _cascade_options_error(cascade, shortlist_threshold)
+    if cascade_error:
+        return jsonify({"error": cascade_error}), 400
     
     try:
         # Pass job_id for self-improving scoring based on recruiter feedback
-        result = rank_candidate(candidate_description, job_requirements, job_id=job_id)
+        result = rank_candidate(
+            candidate_description,
+            job_requirements,
+            job_id=job_id,
+            calibration_mode=calibration_mode,
+            candidate_id=candidate_id,
+            cascade=cascade,
+            shortlist_threshold=shortlist_threshold
+        )
         
         # Get calibration info to return alongside score
-        calibration_applied = False
+        calibration_applied = isinstance(result, CalibratedScore)
         calibration_info = None
         if job_id:
             try:
@@ -468,14 +570,150 @@ def rank_candidate_endpoint():
         return jsonify({
             "success": True,
             "score": result.score,
+            "raw_score": getattr(result, 'raw_score', result.score),
+            "scoring_model": getattr(result, 'scoring_model', None),
             "calibration_applied": calibration_applied,
             "calibration_info": calibration_info
         })
     except Exception as e:
-        print(f"Ranking error: {e}")
+        log.error("ranking failed", error=str(e))
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/rank/batch', methods=['POST'])
+def rank_candidates_batch_endpoint():
+    """Score many candidates for one job concurrently, streaming each score as it completes.
+    
+    Expected JSON body:
+    {
+        "job_requirements": "...",
+        "job_id": "...",  (optional, enables RL calibration)
+        "calibration_mode": "prompt" | "numeric",  (optional)
+        "cascade": true | false,  (optional, fast model first)
+        "shortlist_threshold": 0-100,  (optional, cascade escalation point)
+        "listwise": true | false,  (optional, score many candidates per Grok call; no cascade)
+        "top_n": 20,  (optional, only score the best BM25 matches to job_requirements)
+        "candidates": [{"candidate_id": "...", "candidate_description": "..."}, ...]
+    }
+    """
+    if request.is_json:
+        data = request.json
+    else:
+        return jsonify({"error": "JSON body required"}), 400
+    
+    job_requirements = data.get('job_requirements')
+    job_id = data.get('job_id')
+    candidates = data.get('candidates')
+    calibration_mode = data.get('calibration_mode')
+    cascade = data.get('cascade')
+    shortlist_threshold = data.get('shortlist_threshold')
+    listwise = data.get('listwise', False)
+    top_n = data.get('top_n')
+    
+    if calibration_mode is not None and calibration_mode not in CALIBRATION_MODES:
+        return jsonify({"error": f"calibration_mode must be one of {', '.join(CALIBRATION_MODES)}"}), 400
+    cascade_error = _cascade_options_error(cascade, shortlist_threshold)
+    if cascade_error:
+        return jsonify({"error": cascade_error}), 400
+    if not isinstance(listwise, bool):
+        return jsonify({"error": "listwise must be a boolean"}), 400
+    if top_n is not None and (not isinstance(top_n, int) or isinstance(top_n, bool) or top_n < 1):
+        return jsonify({"error": "top_n must be a positive integer"}), 400
+    if not job_requirements or not candidates or not isinstance(candidates, list):
+        return jsonify({"error": "job_requirements and a non-empty candidates list are required"}), 400
+    if len(candidates) > MAX_RANK_BATCH:
+        return jsonify({"error": f"At most {MAX_RANK_BATCH} candidates per batch"}), 400
+    if not all(isinstance(c, dict) and c.get('candidate_description') for c in candidates):
+        return jsonify({"error": "Every candidate needs a candidate_description"}), 400
+    
+    # Load calibration once for the whole batch
+    try:
+        calibration = load_calibration(job_id)
+    except Exception as e:
+        log.error("calibration load failed", job_id=job_id, error=str(e))
+        calibration = (None, None)
+    calibration_info = calibration[0]
+    calibration_applied = bool(calibration_info and calibration_info.get('sample_count', 0) >= 2)
+    
+    # Optionally send only the best lexical matches to Grok
+    selected = list(range(len(candidates)))
+    lexical_scores = None
+    if top_n is not None:
+        selected, lexical_scores = pre_rank(
+            [c['candidate_description'] for c in candidates], job_requirements, top_n
+        )
+    
+    def generate():
+        def send(data):
+            return f"data: {json.dumps(data)}\n\n"
+        
+        yield send({
+            "type": "start",
+            "total": len(candidates),
+            "selected": len(selected),
+            "calibration_applied": calibration_applied,
+            "calibration_info": calibration_info
+        })
+        
+        if lexical_scores is not None:
+            chosen = set(selected)
+            for index, candidate in enumerate(candidates):
+                if index not in chosen:
+                    yield send({
+                        "type": "skipped",
+                        "index": index,
+                        "candidate_id": candidate.get('candidate_id'),
+                        "lexical_score": round(lexical_scores[index], 3)
+                    })
+        
+        scored = 0
+        failed = 0
+        descriptions = [candidates[index]['candidate_description'] for index in selected]
+        if listwise:
+            results = rank_candidates_listwise(
+                descriptions,
+                job_requirements,
+                job_id=job_id,
+                calibration=calibration,
+                calibration_mode=calibration_mode
+            )
+        else:
+            results = rank_candidates(
+                descriptions,
+                job_requirements,
+                job_id=job_id,
+                calibration=calibration,
+                calibration_mode=calibration_mode,
+                cascade=cascade,
+                shortlist_threshold=shortlist_threshold
+            )
+        for position, result, error in results:
+            index = selected[position]
+            candidate_id = candidates[index].get('candidate_id')
+            if error is None:
+                scored += 1
+                yield send({
+                    "type": "score",
+                    "index": index,
+                    "candidate_id": candidate_id,
+                    "score": result.score,
+                    "raw_score": getattr(result, 'raw_score', result.score),
+                    "scoring_model": getattr(result, 'scoring_model', None)
+                })
+            else:
+                failed += 1
+                yield send({"type": "candidate_error", "index": index, "candidate_id": candidate_id, "error": error})
+        
+        yield send({"type": "complete", "scored": scored, "failed": failed, "skipped": len(candidates) - len(selected)})
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'Connection': 'keep-alive',
+        'Access-Control-Allow-Origin': 'http://localhost:3000',
+        'Access-Control-Allow-Credentials': 'true'
+    })
+
+
 @app.route('/send-dm', methods=['POST'])
 def send_direct_message():
     """Generate and optionally send a personalized DM to a candidate."""
@@ -501,9 +739,7 @@ def send_direct_message():
         return jsonify({"error": "recruiter_name is required"}), 400
     
     try:
-        x_client = get_x_authenticated_client()
-        xai_client = get_xai_authenticated_client()
-        dm_handler = XDirectMessaging(xai_client=xai_client, x_client=x_client)
+        dm_handler = get_dm_handler()
         
         result = dm_handler.generate_and_send(
             candidate_data=candidate_data,
@@ -513,13 +749,90 @@ def send_direct_message():
             test_link=test_link
         )
         
+        # Still waiting on the sender's DM rate limit; the send goes out later
+        if result.get('queued'):
+            return jsonify(result), 202
         return jsonify(result)
     except Exception as e:
-        print(f"Error with DM: {e}")
+        log.error("dm failed", error=str(e))
         return jsonify({"error": str(e)}), 500
 
+@app.route('/send-dm/batch', methods=['POST'])
+def send_direct_message_batch():
+    """Generate personalized DMs for many candidates in parallel and send them through the paced queue.
+    
+    Expected JSON body: same fields as /send-dm, with "candidates" (a list of
+    candidate_data objects) instead of "candidate_data". Results stream back as
+    server-sent events in completion order.
+    """
+    if request.is_json:
+        data = request.json
+    else:
+        return jsonify({"error": "JSON body required"}), 400
+    
+    candidates = data.get('candidates')
+    job_description = data.get('job_description')
+    company_name = data.get('company_name')
+    recruiter_name = data.get('recruiter_name')
+    test_link = data.get('test_link')
+    
+    if not candidates or not isinstance(candidates, list):
+        return jsonify({"error": "candidates must be a non-empty list"}), 400
+    if len(candidates) > MAX_DM_BATCH:
+        return jsonify({"error": f"At most {MAX_DM_BATCH} candidates per batch"}), 400
+    if not job_description:
+        return jsonify({"error": "job_description is required"}), 400
+    if not company_name:
+        return jsonify({"error": "company_name is required"}), 400
+    if not recruiter_name:
+        return jsonify({"error": "recruiter_name is required"}), 400
+    
+    dm_handler = get_dm_handler()
+    
+    def generate():
+        def send(data):
+            return f"data: {json.dumps(data)}\n\n"
+        
+        yield send({"type": "start", "total": len(candidates)})
+        
+        sent = 0
+        failed = 0
+        try:
+            results = dm_handler.generate_and_send_batch(
+                candidates=candidates,
+                job_description=job_description,
+                company_name=company_name,
+                recruiter_name=recruiter_name,
+                test_link=test_link
+            )
+            for result in results:
+                if result.get('sent'):
+                    sent += 1
+                else:
+                    failed += 1
+                yield send({"type": "dm", **result})
+        except Exception as e:
+            log.error("dm batch failed", error=str(e))
+            yield send({"type": "error", "message": str(e)})
+            return
+        
+        yield send({"type": "complete", "sent": sent, "failed": failed})
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'Connection': 'keep-alive',
+        'Access-Control-Allow-Origin': 'http://localhost:3000',
+        'Access-Control-Allow-Credentials': 'true'
+    })
+
 # ==================== RL FEEDBACK ENDPOINT ====================
-from RLloop.rl_feedback import process_feedback, get_policy_stats, compute_calibration_metrics
+from RLloop.rl_feedback import (
+    process_feedback, process_feedback_batch, get_policy_stats, compute_calibration_metrics,
+    get_feedback_writer, FEEDBACK_ASYNC
+)
+
+# Maximum ratings accepted by one /api/feedback/batch request
+MAX_FEEDBACK_BATCH = 1000
 
 @app.route('/api/feedback', methods=['POST'])
 def submit_feedback():
@@ -531,8 +844,16 @@ def submit_feedback():
         "candidate_id": "...",
         "job_id": "...",
         "ai_score": 75,
-        "recruiter_stars": 4
+        "recruiter_stars": 4,
+        "async": false
     }
+    
+    ai_score is the raw model score (raw_score from /rank), not the
+    calibrated one; calibration is fitted on raw scores.
+    
+    With "async": true (or FEEDBACK_ASYNC=1 as the default) the rating is
+    validated and acknowledged with 202, then written by the background
+    group-commit writer; the response has no reward_id or policy_stats.
     """
     data = request.json
     
@@ -547,6 +868,22 @@ def submit_feedback():
     if not 1 <= recruiter_stars <= 5:
         return jsonify({"error": "recruiter_stars must be 1-5"}), 400
     
+    write_async = data.get('async', FEEDBACK_ASYNC)
+    if not isinstance(write_async, bool):
+        return jsonify({"error": "async must be a boolean"}), 400
+    
+    if write_async:
+        try:
+            result = get_feedback_writer().submit(
+                candidate_id=candidate_id,
+                job_id=job_id,
+                ai_score=int(ai_score),
+                recruiter_stars=int(recruiter_stars)
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"success": True, "queued": True, "feedback": result}), 202
+    
     try:
         result = process_feedback(
             candidate_id=candidate_id,
@@ -564,22 +901,80 @@ def submit_feedback():
             "policy_stats": policy_stats
         })
     except Exception as e:
-        print(f"Error processing feedback: {e}")
+        log.error("feedback failed", error=str(e))
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/feedback/batch', methods=['POST'])
+def submit_feedback_batch():
+    """
+    Submit many recruiter ratings at once (review bursts, historical backfill).
+    
+    Expected JSON body:
+    {
+        "ratings": [
+            {"candidate_id": "...", "job_id": "...", "ai_score": 75, "recruiter_stars": 4},
+            ...
+        ]
+    }
+    """
+    data = request.json or {}
+    ratings = data.get('ratings')
+    
+    if not ratings or not isinstance(ratings, list):
+        return jsonify({"error": "ratings must be a non-empty list"}), 400
+    if len(ratings) > MAX_FEEDBACK_BATCH:
+        return jsonify({"error": f"At most {MAX_FEEDBACK_BATCH} ratings per batch"}), 400
+    
+    try:
+        results = process_feedback_batch(ratings)
+        
+        # Updated policy stats for every job touched by the batch
+        policy_stats = {job_id: get_policy_stats(job_id) for job_id in {r['job_id'] for r in results}}
+        
+        return jsonify({
+            "success": True,
+            "count": len(results),
+            "feedback": results,
+            "policy_stats": policy_stats
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        log.error("feedback batch failed", error=str(e))
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/policy/<job_id>', methods=['GET'])
 def get_policy(job_id):
-    """Get RL policy stats and calibration metrics for a job."""
+    """
+    Get RL policy stats and calibration metrics for a job.
+    
+    Optional query params `last_n` (at least 1) and `since` (Unix timestamp)
+    restrict calibration to a recent window of ratings.
+    """
+    window = {}
+    for name, minimum in (('last_n', 1), ('since', None)):
+        value = request.args.get(name)
+        if value is None:
+            continue
+        try:
+            window[name] = int(value)
+        except ValueError:
+            return jsonify({"error": f"{name} must be an integer"}), 400
+        if minimum is not None and window[name] < minimum:
+            return jsonify({"error": f"{name} must be at least {minimum}"}), 400
+    
     try:
         stats = get_policy_stats(job_id)
-        metrics = compute_calibration_metrics(job_id)
+        metrics = compute_calibration_metrics(job_id, **window)
         
         return jsonify({
             "policy_stats": stats,
             "calibration_metrics": metrics
         })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Error getting policy: {e}")
+        log.error("policy lookup failed", job_id=job_id, error=str(e))
         return jsonify({"error": str(e)}), 500
 
 if __name__ == '__main__':
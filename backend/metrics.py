@@ -0,0 +1,214 @@
+import bisect
+import threading
+import time
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+# Latency buckets in seconds. The upper end covers multi-second Grok calls.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_names: Tuple[str, ...], label_values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key: Tuple[str, ...], value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, e.g. in-flight requests."""
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts..., +Inf count], sum
+                state = [[0] * (len(self.buckets) + 1), 0.0]
+                self._values[key] = state
+            state[0][index] += 1
+            state[1] += value
+
+    def _render_sample(self, key: Tuple[str, ...], value) -> List[str]:
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = 'le="' + _format_value(bound) + '"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+# ==================== Registry ====================
+
+HUNT_STAGE_SECONDS = Histogram(
+    "hunt_stage_duration_seconds", "Wall time of each hunt stage", ("stage",)
+)
+HUNT_STAGE_TOTAL = Counter(
+    "hunt_stage_total", "Hunt stage executions by outcome", ("stage", "status")
+)
+UPSTREAM_SECONDS = Histogram(
+    "upstream_request_duration_seconds", "Latency of upstream X API and Grok calls", ("service", "endpoint")
+)
+UPSTREAM_TOTAL = Counter(
+    "upstream_requests_total", "Upstream X API and Grok calls by outcome", ("service", "endpoint", "status")
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "upstream_in_flight", "Upstream calls currently in progress", ("service", "endpoint")
+)
+POOL_QUEUE_DEPTH = Gauge(
+    "executor_queue_depth", "Tasks submitted to a thread pool but not yet started", ("pool",)
+)
+POOL_ACTIVE = Gauge(
+    "executor_active_tasks", "Tasks currently running in a thread pool", ("pool",)
+)
+
+REGISTRY = [
+    HUNT_STAGE_SECONDS,
+    HUNT_STAGE_TOTAL,
+    UPSTREAM_SECONDS,
+    UPSTREAM_TOTAL,
+    UPSTREAM_IN_FLIGHT,
+    POOL_QUEUE_DEPTH,
+    POOL_ACTIVE,
+]
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def register(metric: _Metric) -> _Metric:
+    """Add a metric defined elsewhere to the scrape output."""
+    REGISTRY.append(metric)
+    return metric
+
+
+def render_prometheus() -> str:
+    """Render every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def track_stage(stage: str):
+    """Time a hunt stage and count it as ok/error."""
+    start = time.perf_counter()
+    status = "error"
+    try:
+        yield
+        status = "ok"
+    finally:
+        HUNT_STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+        HUNT_STAGE_TOTAL.inc(stage=stage, status=status)
+
+
+@contextmanager
+def track_upstream(service: str, endpoint: str):
+    """Time an upstream call (service is "x" or "grok") and track it as in flight."""
+    UPSTREAM_IN_FLIGHT.inc(service=service, endpoint=endpoint)
+    start = time.perf_counter()
+    status = "error"
+    try:
+        yield
+        status = "ok"
+    finally:
+        UPSTREAM_IN_FLIGHT.dec(service=service, endpoint=endpoint)
+        UPSTREAM_SECONDS.observe(time.perf_counter() - start, service=service, endpoint=endpoint)
+        UPSTREAM_TOTAL.inc(service=service, endpoint=endpoint, status=status)
+
+
+def submit_tracked(executor: Executor, pool: str, fn: Callable, *args, **kwargs) -> Future:
+    """Submit `fn` to `executor`, tracking queue depth and active tasks for `pool`."""
+    POOL_QUEUE_DEPTH.inc(pool=pool)
+
+    def run():
+        POOL_QUEUE_DEPTH.dec(pool=pool)
+        POOL_ACTIVE.inc(pool=pool)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            POOL_ACTIVE.dec(pool=pool)
+
+    try:
+        future = executor.submit(run)
+    except Exception:
+        POOL_QUEUE_DEPTH.dec(pool=pool)
+        raise
+    # run() never starts for work cancelled while queued (e.g. shutdown(cancel_futures=True))
+    future.add_done_callback(lambda done: POOL_QUEUE_DEPTH.dec(pool=pool) if done.cancelled() else None)
+    return future
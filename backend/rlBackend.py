@@ -9,17 +9,22 @@ This API provides endpoints for:
 - Scoring candidates with AI
 """
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Iterator, Literal, Optional
+import csv
+import io
+import json
 import sys
 from pathlib import Path
 
-# Add RLloop to path
-sys.path.append(str(Path(__file__).parent / "RLloop"))
+# Import backend modules as main.py does, so there is one rl_feedback module
+sys.path.append(str(Path(__file__).parent))
 
-from backend.RLloop import rl_feedback, grokScore
+from RLloop import rl_feedback, grokScore
+from metrics import render_prometheus, PROMETHEUS_CONTENT_TYPE
 
 app = FastAPI(
     title="RL Recruiter API",
@@ -34,6 +39,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -43,7 +49,7 @@ class FeedbackRequest(BaseModel):
     """Request model for submitting recruiter feedback"""
     candidate_id: str = Field(..., description="Unique candidate identifier")
     job_id: str = Field(..., description="Job identifier")
-    ai_score: int = Field(..., ge=0, le=100, description="AI-generated score (0-100)")
+    ai_score: int = Field(..., ge=0, le=100, description="Raw AI-generated score (0-100), i.e. raw_score from /rank")
     recruiter_stars: int = Field(..., ge=1, le=5, description="Recruiter rating (1-5 stars)")
     version: int = Field(1, description="Policy version")
 
@@ -55,10 +61,22 @@ class FeedbackResponse(BaseModel):
     ai_score: int
     recruiter_score: int
     delta: int
-    reward_id: int
+    reward_id: Optional[int] = Field(None, description="Reward log id; None while the rating is queued")
+    queued: bool = False
     message: str
 
 
+class FeedbackBatchRequest(BaseModel):
+    """Request model for submitting many ratings at once"""
+    ratings: list[FeedbackRequest] = Field(..., min_length=1, max_length=1000, description="Ratings to process in order")
+
+
+class FeedbackBatchResponse(BaseModel):
+    """Response model for batch feedback submission"""
+    count: int
+    results: list[FeedbackResponse]
+
+
 class ScoreRequest(BaseModel):
     """Request model for scoring a candidate"""
     candidate_description: str = Field(..., description="Candidate information (resume, skills, etc.)")
@@ -112,10 +130,20 @@ async def root():
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Health"])
+async def metrics():
+    """Expose upstream Grok call metrics in Prometheus text format"""
+    return PlainTextResponse(render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 # ==================== RL Feedback Endpoints ====================
 
 @app.post("/api/feedback", response_model=FeedbackResponse, tags=["Feedback"])
-async def submit_feedback(feedback: FeedbackRequest):
+async def submit_feedback(
+    feedback: FeedbackRequest,
+    response: Response,
+    async_write: Optional[bool] = Query(None, alias="async", description="Acknowledge now and write in the background")
+):
     """
     Submit recruiter feedback for a candidate.
     
@@ -126,9 +154,27 @@ async def submit_feedback(feedback: FeedbackRequest):
     4. Logs reward signal
     5. Updates policy state with RL learning
     
+    With async=true (or FEEDBACK_ASYNC=1 as the default) the rating is
+    validated and queued for the background group-commit writer, and the
+    response carries queued=true and no reward_id.
+    
     Returns:
         Feedback results including delta and updated policy
     """
+    if rl_feedback.FEEDBACK_ASYNC if async_write is None else async_write:
+        try:
+            result = rl_feedback.get_feedback_writer().submit(
+                candidate_id=feedback.candidate_id,
+                job_id=feedback.job_id,
+                ai_score=feedback.ai_score,
+                recruiter_stars=feedback.recruiter_stars,
+                version=feedback.version
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        response.status_code = 202
+        return FeedbackResponse(**result, message="Feedback queued")
+    
     try:
         result = rl_feedback.process_feedback(
             candidate_id=feedback.candidate_id,
@@ -153,6 +199,35 @@ async def submit_feedback(feedback: FeedbackRequest):
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
 
+@app.post("/api/feedback/batch", response_model=FeedbackBatchResponse, tags=["Feedback"])
+async def submit_feedback_batch(batch: FeedbackBatchRequest):
+    """
+    Submit many recruiter ratings in one request.
+    
+    All ratings are written in a single transaction, and policy updates are
+    applied in the order given. If any rating is invalid, nothing is written.
+    
+    Returns:
+        Feedback results for each rating, in input order
+    """
+    try:
+        results = rl_feedback.process_feedback_batch(
+            [rating.model_dump() for rating in batch.ratings]
+        )
+        
+        return FeedbackBatchResponse(
+            count=len(results),
+            results=[
+                FeedbackResponse(**result, message="Feedback processed successfully")
+                for result in results
+            ]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
+
+
 @app.get("/api/policy/{job_id}", response_model=PolicyStatsResponse, tags=["Policy"])
 async def get_policy_stats(
     job_id: str,
@@ -186,10 +261,52 @@ async def get_policy_stats(
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
 
+def _export_lines(job_ids: list[str], fmt: str) -> Iterator[str]:
+    """Render streamed reward rows as NDJSON or CSV, one line at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(rl_feedback.REWARD_COLUMNS)
+    for entry in rl_feedback.iter_reward_rows(job_ids):
+        if fmt == "ndjson":
+            yield json.dumps(entry) + "\n"
+            continue
+        writer.writerow(entry[column] for column in rl_feedback.REWARD_COLUMNS)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+@app.get("/api/rewards/export", tags=["Rewards"])
+async def export_rewards(
+    job_id: list[str] = Query(..., description="Job identifier (repeat for several jobs)"),
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="Output format")
+):
+    """
+    Stream the full reward history (including archived rows) for one or more jobs.
+    
+    Rows are written as they are read from SQLite, newest first within each
+    job, so exports of any size use constant memory.
+    
+    Args:
+        job_id: Job identifiers
+        format: "ndjson" (default) or "csv"
+    """
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    return StreamingResponse(
+        _export_lines(job_id, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="rewards.{format}"'}
+    )
+
+
 @app.get("/api/rewards/{job_id}", response_model=list[RewardLogEntry], tags=["Rewards"])
 async def get_reward_history(
     job_id: str,
-    limit: int = Query(50, ge=1, le=500, description="Maximum number of records to return")
+    response: Response,
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of records to return"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page")
 ):
     """
     Get recent reward history for a job.
@@ -199,19 +316,31 @@ async def get_reward_history(
     - Deltas (errors)
     - Timestamps
     
+    When more rows may follow, the X-Next-Cursor header holds the cursor for
+    the next (older) page.
+    
     Args:
         job_id: Job identifier
         limit: Maximum number of records (default: 50, max: 500)
+        cursor: Keyset cursor from the previous page
     """
     try:
-        history = rl_feedback.get_reward_history(job_id, limit)
+        history = rl_feedback.get_reward_history(job_id, limit, cursor)
+        if len(history) == limit:
+            response.headers["X-Next-Cursor"] = rl_feedback.encode_reward_cursor(history[-1])
         return [RewardLogEntry(**entry) for entry in history]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
 
 @app.get("/api/calibration/{job_id}", response_model=CalibrationMetricsResponse, tags=["Metrics"])
-async def get_calibration_metrics(job_id: str):
+async def get_calibration_metrics(
+    job_id: str,
+    last_n: Optional[int] = Query(None, ge=1, description="Only use the most recent N ratings"),
+    since: Optional[int] = Query(None, description="Only use ratings at or after this Unix timestamp")
+):
     """
     Compute model calibration metrics for a job.
     
@@ -223,14 +352,47 @@ async def get_calibration_metrics(job_id: str):
     
     Args:
         job_id: Job identifier
+        last_n: Optional window of the most recent N ratings
+        since: Optional Unix timestamp lower bound
     """
     try:
-        metrics = rl_feedback.compute_calibration_metrics(job_id)
+        metrics = rl_feedback.compute_calibration_metrics(job_id, last_n=last_n, since=since)
         return CalibrationMetricsResponse(**metrics)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
 
+@app.get("/api/calibration/{job_id}/mapping", tags=["Metrics"])
+async def get_score_mapping(job_id: str):
+    """
+    Get the learned monotone mapping from raw AI score to recruiter score for a job.
+    
+    The mapping is null until the job has enough ratings to fit it.
+    
+    Args:
+        job_id: Job identifier
+    """
+    try:
+        mapping = rl_feedback.get_score_mapping(job_id)
+        return {"job_id": job_id, "mapping": mapping.to_dict() if mapping else None}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
+
+
+@app.get("/api/shadow", tags=["Metrics"])
+async def get_shadow_report(job_id: Optional[str] = Query(None, description="Restrict to one job")):
+    """
+    Compare shadow-model scores with the primary model per job.
+    
+    Reports latency, tokens and score divergence, and each model's error
+    against recruiter ratings of the same candidates.
+    """
+    try:
+        return rl_feedback.get_shadow_report(job_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
+
+
 # ==================== Scoring Endpoints ====================
 
 @app.post("/api/score", response_model=ScoreResponse, tags=["Scoring"])
@@ -267,15 +429,22 @@ async def score_candidate(request: ScoreRequest):
 # ==================== Batch Operations ====================
 
 @app.get("/api/jobs/{job_id}/summary", tags=["Summary"])
-async def get_job_summary(job_id: str, version: int = Query(1, description="Policy version")):
+async def get_job_summary(
+    job_id: str,
+    version: int = Query(1, description="Policy version"),
+    last_n: Optional[int] = Query(None, ge=1, description="Calibration over the most recent N ratings"),
+    since: Optional[int] = Query(None, description="Calibration over ratings at or after this Unix timestamp")
+):
     """
     Get a complete summary for a job including policy stats and calibration metrics.
     
     This is a convenience endpoint that combines multiple queries into one response.
+    Calibration covers all ratings unless last_n or since narrows the window;
+    without a window the whole summary is served from the in-memory snapshot.
     """
     try:
         policy_stats = rl_feedback.get_policy_stats(job_id, version)
-        calibration = rl_feedback.compute_calibration_metrics(job_id)
+        calibration = rl_feedback.compute_calibration_metrics(job_id, last_n=last_n, since=since)
         
         if policy_stats is None:
             return {
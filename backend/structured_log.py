@@ -0,0 +1,117 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from typing import Any, Dict
+
+# LOG_LEVEL controls verbosity (DEBUG, INFO, WARNING, ERROR).
+# LOG_SAMPLE_RATE is the fraction of high-volume per-user lines that are kept.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Render a record and its structured fields as one JSON line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that hands the raw record to the listener thread.
+
+    The stdlib handler formats in the caller's thread; deferring it keeps
+    repr/JSON work off the request and worker threads.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _start_listener() -> None:
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        stream_handler = logging.StreamHandler(sys.stderr)
+        stream_handler.setFormatter(JsonFormatter())
+
+        root = logging.getLogger("recruiter")
+        root.setLevel(LOG_LEVEL)
+        root.propagate = False
+        root.addHandler(_DeferredQueueHandler(log_queue))
+
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+        _listener.start()
+        atexit.register(shutdown)
+
+
+def shutdown() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+class StructuredLogger:
+    """
+    Thin wrapper over `logging` that takes structured fields as keyword arguments.
+
+    Fields are only formatted by the background writer, and nothing is built at
+    all when the level is disabled, so large objects can be passed to `debug`
+    without cost in production.
+    """
+
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(f"recruiter.{name}")
+
+    def is_debug(self) -> bool:
+        return self._logger.isEnabledFor(logging.DEBUG)
+
+    def _log(self, level: int, msg: str, fields: Dict[str, Any], sampled: bool = False, exc_info=None) -> None:
+        if not self._logger.isEnabledFor(level):
+            return
+        if sampled and random.random() >= LOG_SAMPLE_RATE:
+            return
+        self._logger.log(level, msg, extra={"fields": fields}, exc_info=exc_info)
+
+    def debug(self, msg: str, **fields) -> None:
+        self._log(logging.DEBUG, msg, fields)
+
+    def info(self, msg: str, sampled: bool = False, **fields) -> None:
+        """Log at INFO. Pass sampled=True for per-user lines that only need a LOG_SAMPLE_RATE fraction."""
+        self._log(logging.INFO, msg, fields, sampled=sampled)
+
+    def warning(self, msg: str, **fields) -> None:
+        self._log(logging.WARNING, msg, fields)
+
+    def error(self, msg: str, exc_info=None, **fields) -> None:
+        self._log(logging.ERROR, msg, fields, exc_info=exc_info)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """Return a structured logger writing through the shared background queue."""
+    _start_listener()
+    return StructuredLogger(name)
@@ -0,0 +1,98 @@
+"""
+Unit Tests for the TTL key/value store behind OAuth state and sessions
+
+Run with: pytest test_auth_store.py -v
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import auth_store
+from auth_store import TTLStore
+
+
+class Clock:
+    """Stands in for time.time in auth_store."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(auth_store, 'time', SimpleNamespace(time=fake.time))
+    return fake
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_store(request, tmp_path):
+    """Build TTLStores in process memory or in a SQLite file, per parametrization."""
+    db_path = str(tmp_path / 'auth.db') if request.param == 'sqlite' else None
+
+    def make(namespace='test', ttl_seconds=60, max_entries=1024):
+        return TTLStore(namespace, ttl_seconds, max_entries=max_entries, db_path=db_path)
+    return make
+
+
+class TestTTLStore:
+    """Test expiry, eviction and pop in both backends."""
+
+    def test_get_set_and_default(self, make_store, clock):
+        """Test that values round-trip and missing or None keys return the default."""
+        store = make_store()
+        store.set('state', {'verifier': 'abc'})
+
+        assert store.get('state') == {'verifier': 'abc'}
+        assert store.get('missing', 'fallback') == 'fallback'
+        assert store.get(None, 'fallback') == 'fallback'
+
+    def test_entries_expire(self, make_store, clock):
+        """Test that entries disappear after their TTL, including a per-entry override."""
+        store = make_store(ttl_seconds=60)
+        store.set('short', 1, ttl_seconds=10)
+        store.set('long', 2)
+
+        clock.now += 10
+        assert store.get('short') is None
+        assert store.get('long') == 2
+        assert len(store) == 1
+
+        clock.now += 50
+        assert store.get('long') is None
+        assert len(store) == 0
+
+    def test_oldest_entries_are_evicted(self, make_store, clock):
+        """Test that max_entries keeps the most recently set entries."""
+        store = make_store(max_entries=2)
+        for key in ('a', 'b', 'c'):
+            store.set(key, key)
+            clock.now += 1
+
+        assert [store.get(key) for key in ('a', 'b', 'c')] == [None, 'b', 'c']
+        assert len(store) == 2
+
+    def test_pop_removes_and_returns(self, make_store, clock):
+        """Test that pop returns a live value once, and the default after expiry."""
+        store = make_store()
+        store.set('state', 'value')
+        store.set('stale', 'value', ttl_seconds=1)
+        clock.now += 1
+
+        assert store.pop('state') == 'value'
+        assert store.pop('state', 'gone') == 'gone'
+        assert store.pop('stale', 'gone') == 'gone'
+        assert store.pop(None, 'gone') == 'gone'
+
+    def test_namespaces_are_separate(self, make_store, clock):
+        """Test that stores sharing a backend file do not see each other's keys."""
+        sessions, states = make_store('sessions'), make_store('states')
+        sessions.set('key', 'session')
+        states.set('key', 'state')
+
+        assert sessions.get('key') == 'session'
+        assert states.get('key') == 'state'
@@ -0,0 +1,70 @@
+"""
+Unit Tests for BM25 candidate pre-ranking
+
+Run with: pytest test_lexical_index.py -v
+"""
+
+import pytest
+
+from lexical_index import BM25Index, candidate_document, pre_rank, tokenize
+
+
+class TestTokenize:
+    """Test how profile text is split into terms."""
+
+    def test_keeps_tech_spellings(self):
+        """Test that c++, c#, node.js and similar stay single terms."""
+        assert tokenize("C++ and C# with Node.js, Next.js") == ['c++', 'c#', 'node.js', 'next.js']
+
+    def test_drops_links_stopwords_and_single_characters(self):
+        """Test that URLs, stopwords and one-letter tokens never become terms."""
+        assert tokenize("I build https://github.com/me/rust-tools in Rust & a bit of R") == ['build', 'rust', 'bit']
+
+    def test_candidate_document_reads_hunt_entries_and_rows(self):
+        """Test that hunt entries and stored candidate rows give the same text."""
+        entry = {
+            'user': {'description': 'Rust engineer'},
+            'tweets': ['Shipping a compiler'],
+            'evaluation': {'reason': 'Strong systems background'},
+        }
+        row = {'bio': 'Rust engineer', 'evaluation_reason': 'Strong systems background'}
+
+        assert candidate_document(entry) == "Rust engineer\nShipping a compiler\nStrong systems background"
+        assert candidate_document(row) == "Rust engineer\nStrong systems background"
+        assert candidate_document({}) == ""
+
+
+class TestBM25:
+    """Test BM25 scoring and the pre-rank cut."""
+
+    DOCUMENTS = [
+        "Frontend developer, React and CSS",
+        "Rust systems engineer writing compilers in Rust",
+        "Rust hobbyist, mostly Python at work",
+        "",
+    ]
+
+    def test_more_matching_terms_rank_higher(self):
+        """Test that documents rank by query term frequency, and non-matches score zero."""
+        scores = BM25Index(self.DOCUMENTS).scores("rust compilers")
+
+        assert scores[1] > scores[2] > 0
+        assert scores[0] == scores[3] == 0
+
+    def test_rare_terms_weigh_more(self):
+        """Test that idf favors terms found in fewer documents."""
+        index = BM25Index(self.DOCUMENTS)
+        assert index.idf('compilers') > index.idf('rust') > 0
+
+    def test_empty_index_scores_nothing(self):
+        """Test that an index without text returns zeros instead of dividing by zero."""
+        assert BM25Index(["", "the a"]).scores("rust") == [0.0, 0.0]
+        assert BM25Index([]).scores("rust") == []
+
+    @pytest.mark.parametrize("limit, expected", [(2, [1, 2]), (0, [1, 2, 0, 3]), (-1, [1, 2, 0, 3]), (10, [1, 2, 0, 3])])
+    def test_pre_rank_limits(self, limit, expected):
+        """Test that pre_rank keeps the best `limit` positions, or all of them when limit <= 0."""
+        ranked, scores = pre_rank(self.DOCUMENTS, "rust compilers", limit)
+
+        assert ranked == expected
+        assert len(scores) == len(self.DOCUMENTS)
@@ -0,0 +1,225 @@
+"""
+Unit Tests for the Flask app's routes, with X and Grok stubbed
+
+Run with: pytest test_main.py -v
+"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import auth_store
+import main
+from auth_store import TTLStore
+from RLloop.grokScore import CandidateScore
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setitem(main.app.config, 'TESTING', True)
+    return main.app.test_client()
+
+
+def events(response):
+    """Decode a server-sent event stream into its JSON payloads."""
+    return [
+        json.loads(chunk[len("data: "):])
+        for chunk in response.get_data(as_text=True).split("\n\n") if chunk
+    ]
+
+
+class FakeX:
+    """Stands in for the X client; counts users.get_me calls."""
+
+    def __init__(self):
+        self.calls = 0
+        self.error = None
+        self.users = SimpleNamespace(get_me=self.get_me)
+
+    def get_me(self, user_fields):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return SimpleNamespace(data={"name": "Ada", "username": "ada", "profile_image_url": "https://x.test/ada.png"})
+
+
+class TestAuthStatus:
+    """Test that /auth/status caches the X identity per token."""
+
+    TOKEN = {"access_token": "token-a", "token_type": "bearer"}
+
+    @pytest.fixture
+    def x(self, monkeypatch):
+        fake = FakeX()
+        monkeypatch.setattr(main, 'Client', lambda token: fake)
+        return fake
+
+    @pytest.fixture(autouse=True)
+    def clock(self, monkeypatch):
+        """A fresh identity cache on a fake clock."""
+        fake = SimpleNamespace(now=1_000_000.0)
+        monkeypatch.setattr(auth_store, 'time', SimpleNamespace(time=lambda: fake.now))
+        monkeypatch.setattr(main, 'identity_cache', TTLStore('identity', main.IDENTITY_TTL_SECONDS, max_entries=16))
+        return fake
+
+    def status(self, client, token=TOKEN):
+        client.set_cookie('x_token', json.dumps(token))
+        return client.get('/auth/status').get_json()
+
+    def test_identity_is_fetched_once(self, client, x):
+        """Test that repeated polls with the same token make a single users.get_me call."""
+        first = self.status(client)
+        second = self.status(client)
+
+        assert first == second == {
+            "authenticated": True,
+            "user": {"name": "Ada", "username": "ada", "profile_image_url": "https://x.test/ada.png"},
+        }
+        assert x.calls == 1
+
+    def test_tokens_are_cached_separately(self, client, x):
+        """Test that a different token gets its own lookup."""
+        self.status(client)
+        self.status(client, {"access_token": "token-b"})
+        assert x.calls == 2
+
+    def test_identity_expires(self, client, x, clock):
+        """Test that the identity is looked up again after IDENTITY_TTL_SECONDS."""
+        self.status(client)
+        clock.now += main.IDENTITY_TTL_SECONDS - 1
+        self.status(client)
+        assert x.calls == 1
+
+        clock.now += 1
+        assert self.status(client)["authenticated"] is True
+        assert x.calls == 2
+
+    def test_failed_lookups_are_not_cached(self, client, x):
+        """Test that an X error reports unauthenticated and the next poll retries."""
+        x.error = RuntimeError("x unavailable")
+        assert self.status(client) == {"authenticated": False}
+
+        x.error = None
+        assert self.status(client)["authenticated"] is True
+        assert x.calls == 2
+
+    def test_logout_clears_the_identity(self, client, x):
+        """Test that /auth/logout drops the cached identity, so the next sign-in looks it up again."""
+        self.status(client)
+        client.set_cookie('x_token', json.dumps(self.TOKEN))
+
+        assert client.post('/auth/logout').get_json() == {"success": True}
+        assert main.identity_cache.get(main.get_token_key(self.TOKEN)) is None
+        assert client.get('/auth/status').get_json() == {"authenticated": False}
+
+        self.status(client)
+        assert x.calls == 2
+
+
+class TestPolicy:
+    """Test /api/policy and its calibration window params."""
+
+    def test_window_params_are_applied(self, client, monkeypatch):
+        """Test that last_n and since are passed through as integers."""
+        windows = []
+        monkeypatch.setattr(main, 'compute_calibration_metrics', lambda job_id, **window: windows.append(window) or {})
+
+        assert client.get('/api/policy/policy-test-job').status_code == 200
+        assert client.get('/api/policy/policy-test-job?last_n=20&since=1700000000').status_code == 200
+        assert windows == [{}, {"last_n": 20, "since": 1700000000}]
+
+    @pytest.mark.parametrize("query, error", [
+        ("last_n=ten", "last_n must be an integer"),
+        ("last_n=", "last_n must be an integer"),
+        ("last_n=2.5", "last_n must be an integer"),
+        ("last_n=0", "last_n must be at least 1"),
+        ("since=yesterday", "since must be an integer"),
+    ])
+    def test_malformed_window_params_are_rejected(self, client, query, error):
+        """Test that a malformed window is a 400 instead of being silently ignored."""
+        response = client.get(f'/api/policy/policy-test-job?{query}')
+
+        assert response.status_code == 400
+        assert response.get_json() == {"error": error}
+
+
+class TestRankBatch:
+    """Test the /rank/batch score stream."""
+
+    CANDIDATES = [
+        {"candidate_id": "c-go", "candidate_description": "Go developer building web services"},
+        {"candidate_id": "c-rust", "candidate_description": "Rust compiler engineer writing Rust tooling"},
+        {"candidate_id": "c-css", "candidate_description": "Designer working in CSS"},
+    ]
+
+    @pytest.fixture
+    def ranked(self, monkeypatch):
+        """Replace both rankers with fakes that record their input and replay scripted results."""
+        calls = []
+
+        def fake_ranker(name):
+            def rank(descriptions, job_requirements, **kwargs):
+                calls.append((name, descriptions, kwargs))
+                # Completion order: last candidate first, the first one fails
+                for position in reversed(range(len(descriptions))):
+                    if position == 0 and len(descriptions) > 1:
+                        yield position, None, "grok unavailable"
+                    else:
+                        yield position, CandidateScore(score=70 - position), None
+            return rank
+        monkeypatch.setattr(main, 'rank_candidates', fake_ranker('pointwise'))
+        monkeypatch.setattr(main, 'rank_candidates_listwise', fake_ranker('listwise'))
+        return calls
+
+    def post(self, client, **body):
+        body = {"job_requirements": "Rust compiler engineer", "candidates": self.CANDIDATES, **body}
+        return client.post('/rank/batch', json=body)
+
+    def test_scores_stream_in_completion_order(self, client, ranked):
+        """Test start, one event per candidate as it completes, then the totals."""
+        response = self.post(client, cascade=True)
+
+        assert response.mimetype == 'text/event-stream'
+        assert events(response) == [
+            {"type": "start", "total": 3, "selected": 3, "calibration_applied": False, "calibration_info": None},
+            {"type": "score", "index": 2, "candidate_id": "c-css", "score": 68, "raw_score": 68, "scoring_model": None},
+            {"type": "score", "index": 1, "candidate_id": "c-rust", "score": 69, "raw_score": 69, "scoring_model": None},
+            {"type": "candidate_error", "index": 0, "candidate_id": "c-go", "error": "grok unavailable"},
+            {"type": "complete", "scored": 2, "failed": 1, "skipped": 0},
+        ]
+        [(ranker, descriptions, kwargs)] = ranked
+        assert ranker == 'pointwise' and kwargs['cascade'] is True
+        assert descriptions == [c['candidate_description'] for c in self.CANDIDATES]
+
+    def test_top_n_scores_only_the_best_lexical_matches(self, client, ranked):
+        """Test that top_n skips weak BM25 matches and maps scores back to request indices."""
+        stream = events(self.post(client, top_n=1))
+
+        assert stream[0]["selected"] == 1
+        assert [(e["type"], e["index"]) for e in stream[1:-1]] == [("skipped", 0), ("skipped", 2), ("score", 1)]
+        assert stream[-1] == {"type": "complete", "scored": 1, "failed": 0, "skipped": 2}
+        assert ranked[0][1] == [self.CANDIDATES[1]['candidate_description']]
+
+    def test_listwise_uses_the_listwise_ranker(self, client, ranked):
+        """Test that listwise=true routes the batch to rank_candidates_listwise."""
+        stream = events(self.post(client, listwise=True))
+
+        assert [ranker for ranker, _, _ in ranked] == ['listwise']
+        assert stream[-1]["type"] == "complete"
+
+    @pytest.mark.parametrize("body", [
+        {"candidates": []},
+        {"job_requirements": ""},
+        {"candidates": [{"candidate_id": "no-description"}]},
+        {"listwise": "yes"},
+        {"top_n": 0},
+        {"calibration_mode": "unknown"},
+    ])
+    def test_invalid_requests_are_rejected(self, client, ranked, body):
+        """Test that malformed batches get a 400 before any scoring starts."""
+        response = self.post(client, **body)
+
+        assert response.status_code == 400
+        assert "error" in response.get_json()
+        assert ranked == []
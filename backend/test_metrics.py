@@ -0,0 +1,112 @@
+"""
+Unit Tests for the Prometheus metrics registry
+
+Run with: pytest test_metrics.py -v
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import metrics
+from metrics import Counter, Gauge, Histogram, render_prometheus, submit_tracked, track_upstream
+
+
+class TestRendering:
+    """Test the Prometheus text exposition format."""
+
+    def test_counter_with_labels(self):
+        """Test HELP/TYPE headers, sorted label sets and integer formatting."""
+        counter = Counter("test_requests_total", "Requests by status", ("status",))
+        counter.inc(status="ok")
+        counter.inc(2, status="error")
+        counter.inc(status="ok")
+
+        assert counter.render() == [
+            "# HELP test_requests_total Requests by status",
+            "# TYPE test_requests_total counter",
+            'test_requests_total{status="error"} 2',
+            'test_requests_total{status="ok"} 2',
+        ]
+
+    def test_label_values_are_escaped(self):
+        """Test that quotes, backslashes and newlines in label values are escaped."""
+        gauge = Gauge("test_gauge", "Escaping", ("name",))
+        gauge.set(1.5, name='a"b\\c\nd')
+
+        assert gauge.render()[-1] == 'test_gauge{name="a\\"b\\\\c\\nd"} 1.5'
+
+    def test_gauge_without_labels(self):
+        """Test that an unlabelled gauge renders without braces and can go down."""
+        gauge = Gauge("test_in_flight", "In flight")
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+
+        assert gauge.render()[-1] == "test_in_flight 1"
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test bucket placement (le is inclusive), +Inf, sum and count."""
+        histogram = Histogram("test_seconds", "Latency", ("stage",), buckets=(1.0, 0.1))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, stage="search")
+
+        assert histogram.render()[2:] == [
+            'test_seconds_bucket{stage="search",le="0.1"} 2',
+            'test_seconds_bucket{stage="search",le="1"} 3',
+            'test_seconds_bucket{stage="search",le="+Inf"} 4',
+            'test_seconds_sum{stage="search"} 3.65',
+            'test_seconds_count{stage="search"} 4',
+        ]
+
+    def test_registered_metrics_are_scraped(self, monkeypatch):
+        """Test that render_prometheus joins every registered metric, ending in a newline."""
+        monkeypatch.setattr(metrics, 'REGISTRY', [])
+        metrics.register(Counter("test_a_total", "A")).inc()
+        metrics.register(Gauge("test_b", "B")).set(3)
+
+        assert render_prometheus() == (
+            "# HELP test_a_total A\n# TYPE test_a_total counter\ntest_a_total 1\n"
+            "# HELP test_b B\n# TYPE test_b gauge\ntest_b 3\n"
+        )
+
+
+class TestTracking:
+    """Test the upstream and thread-pool helpers."""
+
+    def test_track_upstream_counts_outcomes(self):
+        """Test that calls are counted as ok or error and leave nothing in flight."""
+        labels = ("test", "endpoint")
+        with track_upstream(*labels):
+            pass
+        with pytest.raises(ValueError):
+            with track_upstream(*labels):
+                raise ValueError("upstream failed")
+
+        assert metrics.UPSTREAM_TOTAL._values[labels + ("ok",)] == 1
+        assert metrics.UPSTREAM_TOTAL._values[labels + ("error",)] == 1
+        assert metrics.UPSTREAM_IN_FLIGHT._values[labels] == 0
+        assert sum(metrics.UPSTREAM_SECONDS._values[labels][0]) == 2
+
+    def test_submit_tracked_settles_pool_gauges(self):
+        """Test that queue depth and active tasks return to zero after the work is done."""
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [submit_tracked(executor, "test-pool", pow, 2, n) for n in range(4)]
+            assert [future.result() for future in futures] == [1, 2, 4, 8]
+
+        assert metrics.POOL_QUEUE_DEPTH._values[("test-pool",)] == 0
+        assert metrics.POOL_ACTIVE._values[("test-pool",)] == 0
+
+    def test_cancelled_work_leaves_the_queue(self):
+        """Test that work cancelled before it starts is taken off the queue depth."""
+        release = threading.Event()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            running = submit_tracked(executor, "cancel-pool", release.wait, 5)
+            queued = [submit_tracked(executor, "cancel-pool", pow, 2, n) for n in range(3)]
+            assert all(future.cancel() for future in queued)
+            release.set()
+            assert running.result() is True
+
+        assert metrics.POOL_QUEUE_DEPTH._values[("cancel-pool",)] == 0
+        assert metrics.POOL_ACTIVE._values[("cancel-pool",)] == 0
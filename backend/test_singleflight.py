@@ -0,0 +1,79 @@
+"""
+Unit Tests for request coalescing
+
+Run with: pytest test_singleflight.py -v
+"""
+
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from singleflight import COALESCED_TOTAL, SingleFlight, flight_key
+
+
+class TestSingleFlight:
+    """Test that concurrent identical calls share one execution."""
+
+    names = itertools.count()
+
+    def run_concurrently(self, fn, callers=5):
+        """Call fn through one key from `callers` threads, all arriving while the first call runs."""
+        name = f"test-{next(self.names)}"
+        flight = SingleFlight(name)
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def leader_fn():
+            calls.append(True)
+            started.set()
+            assert release.wait(5)
+            return fn()
+
+        with ThreadPoolExecutor(max_workers=callers) as executor:
+            futures = [executor.submit(flight.do, 'key', leader_fn)]
+            assert started.wait(5)
+            futures += [executor.submit(flight.do, 'key', leader_fn) for _ in range(callers - 1)]
+            # Release the leader only once every follower is waiting on it
+            deadline = time.monotonic() + 5
+            while COALESCED_TOTAL._values.get((name,), 0) < callers - 1:
+                assert time.monotonic() < deadline
+                time.sleep(0.001)
+            release.set()
+        return futures, calls
+
+    def test_concurrent_calls_run_once(self):
+        """Test that callers arriving mid-flight get the leader's result."""
+        futures, calls = self.run_concurrently(lambda: 42)
+
+        assert [future.result() for future in futures] == [42] * 5
+        assert len(calls) == 1
+
+    def test_errors_reach_every_caller(self):
+        """Test that the leader's exception is raised in the waiting callers too."""
+        def fail():
+            raise ValueError("upstream failed")
+
+        futures, calls = self.run_concurrently(fail)
+
+        for future in futures:
+            with pytest.raises(ValueError, match="upstream failed"):
+                future.result()
+        assert len(calls) == 1
+
+    def test_nothing_is_cached_after_the_call(self):
+        """Test that a later call with the same key runs again."""
+        flight = SingleFlight('test')
+        results = iter([1, 2])
+
+        assert flight.do('key', lambda: next(results)) == 1
+        assert flight.do('key', lambda: next(results)) == 2
+        assert flight._calls == {}
+
+    def test_flight_key_is_stable(self):
+        """Test that keys depend only on the parts, not on dict ordering."""
+        assert flight_key('grok-4', {'a': 1, 'b': 2}) == flight_key('grok-4', {'b': 2, 'a': 1})
+        assert flight_key('grok-4', 'x') != flight_key('grok-4-fast', 'x')
@@ -0,0 +1,115 @@
+"""
+Unit Tests for structured JSON logging
+
+Run with: pytest test_structured_log.py -v
+"""
+
+import json
+import logging
+import queue
+import sys
+
+import pytest
+
+import structured_log
+from structured_log import JsonFormatter, StructuredLogger, _DeferredQueueHandler
+
+
+class Unserializable:
+    def __str__(self):
+        return "<unserializable>"
+
+
+def make_record(msg="hunt finished", level=logging.INFO, fields=None, exc_info=None):
+    record = logging.LogRecord("recruiter.test", level, __file__, 1, msg, None, exc_info)
+    record.created = 1700000000.12345
+    if fields is not None:
+        record.fields = fields
+    return record
+
+
+class TestJsonFormatter:
+    """Test how a record and its fields become one JSON line."""
+
+    def test_fields_are_top_level_keys(self):
+        """Test the standard keys, merged structured fields and rounded timestamp."""
+        line = JsonFormatter().format(make_record(fields={"job_id": "job-1", "count": 3}))
+
+        assert "\n" not in line
+        assert json.loads(line) == {
+            "ts": 1700000000.123,
+            "level": "info",
+            "logger": "recruiter.test",
+            "msg": "hunt finished",
+            "job_id": "job-1",
+            "count": 3,
+        }
+
+    def test_unserializable_fields_use_str(self):
+        """Test that values JSON cannot encode are rendered with str()."""
+        line = JsonFormatter().format(make_record(fields={"user": Unserializable()}))
+        assert json.loads(line)["user"] == "<unserializable>"
+
+    def test_exception_is_included(self):
+        """Test that exc_info adds the formatted traceback under 'exc'."""
+        try:
+            raise ValueError("bad rating")
+        except ValueError:
+            record = make_record(level=logging.ERROR, exc_info=sys.exc_info())
+
+        entry = json.loads(JsonFormatter().format(record))
+        assert entry["level"] == "error"
+        assert "ValueError: bad rating" in entry["exc"]
+
+
+class TestStructuredLogger:
+    """Test that the logger queues raw records with their fields."""
+
+    @pytest.fixture
+    def records(self, monkeypatch):
+        """Capture what a StructuredLogger named 'capture' emits, bypassing the stderr writer."""
+        log_queue = queue.SimpleQueue()
+        logger = logging.getLogger("recruiter.capture")
+        handler = _DeferredQueueHandler(log_queue)
+        logger.addHandler(handler)
+        monkeypatch.setattr(logger, 'propagate', False)
+        logger.setLevel(logging.INFO)
+        yield log_queue
+        logger.removeHandler(handler)
+        logger.setLevel(logging.NOTSET)
+
+    def drain(self, log_queue):
+        items = []
+        while not log_queue.empty():
+            items.append(log_queue.get())
+        return items
+
+    def test_records_are_queued_unformatted(self, records):
+        """Test that the caller's thread enqueues the record itself, fields attached."""
+        payload = Unserializable()
+        StructuredLogger("capture").info("scored", job_id="job-1", payload=payload)
+
+        [record] = self.drain(records)
+        assert record.getMessage() == "scored"
+        assert record.fields == {"job_id": "job-1", "payload": payload}
+        assert json.loads(JsonFormatter().format(record))["payload"] == "<unserializable>"
+
+    def test_disabled_levels_build_nothing(self, records):
+        """Test that debug lines below the logger level never reach the queue."""
+        logger = StructuredLogger("capture")
+        assert not logger.is_debug()
+        logger.debug("verbose", data=list(range(1000)))
+        assert self.drain(records) == []
+
+    def test_sampled_lines_follow_the_sample_rate(self, records, monkeypatch):
+        """Test that sampled=True lines are kept or dropped by LOG_SAMPLE_RATE, others always kept."""
+        logger = StructuredLogger("capture")
+
+        monkeypatch.setattr(structured_log, 'LOG_SAMPLE_RATE', 0.0)
+        logger.info("per user", sampled=True)
+        logger.warning("rate limited")
+        assert [record.getMessage() for record in self.drain(records)] == ["rate limited"]
+
+        monkeypatch.setattr(structured_log, 'LOG_SAMPLE_RATE', 1.0)
+        logger.info("per user", sampled=True)
+        assert len(self.drain(records)) == 1
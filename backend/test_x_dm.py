@@ -0,0 +1,350 @@
+"""
+Unit Tests for the paced DM send queue
+
+Run with: pytest test_x_dm.py -v
+"""
+
+import threading
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import x_dm
+from x_dm import DMSendQueue, XDirectMessaging, _TokenBucket, _retry_delay
+
+
+class Clock:
+    """Stands in for time.monotonic in the send queue."""
+
+    def __init__(self):
+        self.now = 1_000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def http_error(status, reset=None):
+    response = requests.Response()
+    response.status_code = status
+    if reset is not None:
+        response.headers['x-rate-limit-reset'] = str(reset)
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+class FakeSender:
+    """Send callable that replays a script of results and errors, recording each call."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class TestTokenBucket:
+    """Test burst, refill and pause of one sender's budget."""
+
+    def test_burst_then_refill(self):
+        """Test that `burst` sends go at once, then one per refill interval."""
+        # 5 sends up front, then the remaining 195 spread over the 900s window
+        bucket = _TokenBucket(rate_limit=200, window_seconds=900, burst=5, now=0.0)
+        interval = 900 / 195
+
+        assert [bucket.take(0.0) for _ in range(5)] == [0.0] * 5
+        assert bucket.take(0.0) == pytest.approx(interval)
+        assert bucket.take(interval / 2) == pytest.approx(interval / 2)
+        assert bucket.take(2 * interval) == 0.0
+
+    def test_refill_stops_at_burst(self):
+        """Test that a long idle stretch only buys back `burst` sends."""
+        bucket = _TokenBucket(rate_limit=200, window_seconds=900, burst=5, now=0.0)
+        for _ in range(5):
+            bucket.take(0.0)
+
+        assert not bucket.is_full(1.0)
+        assert bucket.is_full(3600.0)
+        assert [bucket.take(3600.0) for _ in range(6)][-2:] == [0.0, pytest.approx(900 / 195)]
+
+    def test_pause_blocks_until_reset(self):
+        """Test that a paused bucket refuses sends until the pause ends, then starts empty."""
+        bucket = _TokenBucket(rate_limit=2, window_seconds=10, burst=1, now=0.0)
+        bucket.pause(0.0, 30.0)
+
+        assert not bucket.is_full(29.0)
+        assert bucket.take(10.0) == 20.0
+        assert bucket.take(30.0) == pytest.approx(10.0)
+
+
+class TestRetryDelay:
+    """Test which send errors are retried, and after how long."""
+
+    @pytest.mark.parametrize("error, attempt, expected", [
+        (requests.ConnectionError("reset by peer"), 0, 2.0),
+        (requests.Timeout("read timeout"), 2, 8.0),
+        (http_error(503), 1, 4.0),
+        (http_error(429), 0, 2.0),
+        (http_error(403), 0, None),
+        (http_error(400), 0, None),
+        (ValueError("bad message"), 0, None),
+    ])
+    def test_transient_and_permanent_errors(self, error, attempt, expected):
+        """Test exponential backoff for transient errors and None for permanent ones."""
+        assert _retry_delay(error, attempt) == expected
+
+    def test_rate_limit_waits_for_reset(self, monkeypatch):
+        """Test that a 429 waits for x-rate-limit-reset, at least the backoff and at most one window."""
+        monkeypatch.setattr(x_dm, 'time', SimpleNamespace(time=lambda: 5_000.0))
+
+        assert _retry_delay(http_error(429, reset=5_120), 0) == 120.0
+        assert _retry_delay(http_error(429, reset=5_000), 1) == 4.0
+        assert _retry_delay(http_error(429, reset=99_999), 0) == x_dm.DM_RATE_WINDOW_SECONDS
+
+
+class TestDMSendQueue:
+    """Test scheduling, pacing and retries of the send queue, driven by a fake clock."""
+
+    @pytest.fixture
+    def clock(self):
+        return Clock()
+
+    @pytest.fixture
+    def queue(self, clock):
+        # One send up front, then one every 10 seconds per sender
+        return DMSendQueue(rate_limit=2, window_seconds=10, burst=1, max_retries=2, clock=clock.monotonic)
+
+    def schedule(self, queue, key, send=None, due=None):
+        future = Future()
+        due = queue._clock() if due is None else due
+        queue._schedule_send(key, send or FakeSender("sent"), future, attempt=0, due=due)
+        return future
+
+    def popped_keys(self, queue, now):
+        keys = []
+        while True:
+            entry, _ = queue._pop_due(now)
+            if entry is None:
+                return keys
+            keys.append(entry[0])
+
+    def test_senders_are_paced_separately(self, queue, clock):
+        """Test that one sender's empty budget defers only its own DMs, in submission order."""
+        first, second, third = (self.schedule(queue, 'alice') for _ in range(3))
+        self.schedule(queue, 'bob')
+
+        assert self.popped_keys(queue, clock.now) == ['alice', 'bob']
+        assert queue._pop_due(clock.now) == (None, pytest.approx(10.0))
+        assert queue.pending('alice') == 2
+        assert queue.pending('bob') == 0
+
+        clock.now += 10
+        entry, _ = queue._pop_due(clock.now)
+        assert entry[0] == 'alice' and entry[2] is second
+        assert queue._pop_due(clock.now) == (None, pytest.approx(10.0))
+
+        clock.now += 10
+        entry, _ = queue._pop_due(clock.now)
+        assert entry[2] is third
+
+    def test_nothing_scheduled(self, queue, clock):
+        """Test that an empty schedule reports no wait, so the scheduler sleeps until notified."""
+        assert queue._pop_due(clock.now) == (None, None)
+
+    def test_idle_buckets_are_evicted(self, queue, clock):
+        """Test that buckets which refilled are dropped and paused or spent ones are kept."""
+        for key in ('alice', 'bob', 'carol'):
+            self.schedule(queue, key)
+        self.popped_keys(queue, clock.now)
+        queue._buckets['carol'].pause(clock.now, 60.0)
+
+        queue._evict_idle(clock.now + 5)
+        assert sorted(queue._buckets) == ['alice', 'bob', 'carol']
+
+        queue._evict_idle(clock.now + 10)
+        assert sorted(queue._buckets) == ['carol']
+
+        queue._evict_idle(clock.now + 70)
+        assert queue._buckets == {}
+
+    def test_rate_limit_pauses_the_sender(self, queue, clock, monkeypatch):
+        """Test that a 429 pauses the sender's bucket until x-rate-limit-reset and retries then."""
+        monkeypatch.setattr(x_dm, 'time', SimpleNamespace(time=lambda: 5_000.0))
+        send = FakeSender(http_error(429, reset=5_120), "sent")
+        future = self.schedule(queue, 'alice', send)
+        self.schedule(queue, 'bob')
+        entry, _ = queue._pop_due(clock.now)
+
+        queue._attempt(*entry)
+
+        assert not future.done()
+        assert queue._buckets['alice'].take(clock.now + 60) == pytest.approx(60.0)
+        assert self.popped_keys(queue, clock.now) == ['bob']
+
+        # The bucket restarts empty at the reset and refills from there
+        clock.now += 130
+        entry, _ = queue._pop_due(clock.now)
+        assert entry[2] is future and entry[3] == 1
+        queue._attempt(*entry)
+        assert future.result() == "sent"
+
+    def test_transient_errors_retry_with_backoff(self, queue, clock):
+        """Test that a transient failure is rescheduled with backoff and then succeeds."""
+        send = FakeSender(http_error(503), http_error(502), "sent")
+        future = self.schedule(queue, 'alice', send)
+
+        queue._attempt(*queue._pop_due(clock.now)[0])
+        assert queue._pop_due(clock.now) == (None, 2.0)
+
+        clock.now += 10
+        queue._attempt(*queue._pop_due(clock.now)[0])
+        assert queue._pop_due(clock.now) == (None, 4.0)
+
+        clock.now += 10
+        queue._attempt(*queue._pop_due(clock.now)[0])
+        assert future.result() == "sent"
+        assert send.calls == 3
+
+    def test_permanent_errors_fail_at_once(self, queue, clock):
+        """Test that a permanent error resolves the future without a retry."""
+        send = FakeSender(http_error(403))
+        future = self.schedule(queue, 'alice', send)
+
+        queue._attempt(*queue._pop_due(clock.now)[0])
+
+        assert future.exception().response.status_code == 403
+        assert queue.pending() == 0
+        assert send.calls == 1
+
+    def test_retries_are_bounded(self, queue, clock):
+        """Test that the last transient error is raised once max_retries is used up."""
+        send = FakeSender(*(requests.ConnectionError(f"attempt {n}") for n in range(3)))
+        future = self.schedule(queue, 'alice', send)
+
+        while not future.done():
+            clock.now += 60
+            queue._attempt(*queue._pop_due(clock.now)[0])
+
+        assert str(future.exception()) == "attempt 2"
+        assert send.calls == 3
+
+    def test_submit_sends_on_the_scheduler_thread(self):
+        """Test the real scheduler: submitted sends resolve with their results."""
+        queue = DMSendQueue(rate_limit=200, window_seconds=900, burst=5, send_workers=2)
+        futures = [queue.submit(FakeSender(n), key='alice') for n in range(3)]
+
+        assert [future.result(timeout=5) for future in futures] == [0, 1, 2]
+
+
+class TestXDirectMessaging:
+    """Test the handler's single and batch sends, with generation and the X call stubbed."""
+
+    @pytest.fixture(autouse=True)
+    def send_queue(self, monkeypatch):
+        queue = DMSendQueue(send_workers=2)
+        monkeypatch.setattr(x_dm, '_send_queue', queue)
+        return queue
+
+    @pytest.fixture
+    def handler(self, monkeypatch):
+        handler = XDirectMessaging(xai_client=None, x_client=object(), sender_key='alice')
+        handler.posted = []
+
+        def post_dm(user_id, message):
+            if user_id == 'forbidden':
+                raise http_error(403)
+            handler.posted.append(user_id)
+            return {"id": f"dm-{user_id}"}
+        monkeypatch.setattr(handler, '_post_dm', post_dm)
+        return handler
+
+    def offer(self, candidate_data, **kwargs):
+        if 'error' in candidate_data:
+            raise RuntimeError(candidate_data['error'])
+        if not candidate_data.get('ok', True):
+            return {"success": False, "error": "generation failed"}
+        return {
+            "success": True,
+            "username": candidate_data['username'],
+            "user_id": candidate_data.get('user_id'),
+            "subject": "Hi",
+            "message": f"Hello {candidate_data['username']}",
+        }
+
+    def test_batch_reports_every_candidate(self, handler, monkeypatch):
+        """Test one result per candidate, tagged with its index, including each kind of failure."""
+        monkeypatch.setattr(handler, '_generate_interview_offer', self.offer)
+        candidates = [
+            {"username": "ada", "user_id": "1"},
+            {"username": "bob", "ok": False},
+            {"username": "cy"},
+            {"error": "grok timeout"},
+            {"username": "dee", "user_id": "forbidden"},
+        ]
+
+        results = {result['index']: result for result in handler.generate_and_send_batch(candidates, "job", "Acme", "Rae")}
+
+        assert sorted(results) == [0, 1, 2, 3, 4]
+        assert results[0]['sent'] is True and results[0]['message'] == "Hello ada"
+        assert results[1] == {"success": False, "error": "generation failed", "index": 1}
+        assert results[2]['sent'] is False and results[2]['send_error'] == "No user ID available"
+        assert results[3] == {"success": False, "error": "grok timeout", "index": 3}
+        assert results[4]['sent'] is False and "403" in results[4]['send_error']
+        assert handler.posted == ["1"]
+
+    def test_batch_yields_in_completion_order(self, handler, monkeypatch):
+        """Test that a slow generation does not hold back candidates that finished first."""
+        fast_sent = threading.Event()
+
+        def offer(candidate_data, **kwargs):
+            if candidate_data['username'] == 'slow':
+                assert fast_sent.wait(5)
+            return self.offer(candidate_data)
+        monkeypatch.setattr(handler, '_generate_interview_offer', offer)
+        post_dm = handler._post_dm
+
+        def post_and_signal(user_id, message):
+            response = post_dm(user_id, message)
+            fast_sent.set()
+            return response
+        monkeypatch.setattr(handler, '_post_dm', post_and_signal)
+        candidates = [{"username": "slow", "user_id": "1"}, {"username": "fast", "user_id": "2"}]
+
+        results = list(handler.generate_and_send_batch(candidates, "job", "Acme", "Rae"))
+
+        assert [result['index'] for result in results] == [1, 0]
+        assert all(result['sent'] for result in results)
+
+    def test_batch_without_x_client(self, handler, monkeypatch):
+        """Test that offers are still generated, but marked unsent, without an X client."""
+        monkeypatch.setattr(handler, '_generate_interview_offer', self.offer)
+        handler.x_client = None
+
+        [result] = handler.generate_and_send_batch([{"username": "ada", "user_id": "1"}], "job", "Acme", "Rae")
+
+        assert result['sent'] is False and result['send_error'] == "X client not configured"
+        assert handler.posted == []
+
+    def test_send_reports_queued_after_timeout(self, handler, monkeypatch):
+        """Test that _send_dm stops waiting after DM_SEND_TIMEOUT_SECONDS and the send still goes out."""
+        release = threading.Event()
+        post_dm = handler._post_dm
+
+        def slow_post(user_id, message):
+            assert release.wait(5)
+            return post_dm(user_id, message)
+        monkeypatch.setattr(handler, '_post_dm', slow_post)
+        monkeypatch.setattr(x_dm, 'DM_SEND_TIMEOUT_SECONDS', 0.05)
+
+        result = handler._send_dm("1", "Hello")
+        assert result['success'] is False and result['queued'] is True
+
+        release.set()
+        monkeypatch.setattr(x_dm, 'DM_SEND_TIMEOUT_SECONDS', 5)
+        assert handler._send_dm("2", "Hello") == {"success": True, "response": {"id": "dm-2"}}
+        assert sorted(handler.posted) == ["1", "2"]
@@ -1,23 +1,252 @@
+import heapq
+import itertools
 import json
-from typing import Dict, Any, Optional
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from functools import partial
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
+import requests
 from xdk import Client as XClient
 from xai_sdk import Client as XAIClient
 from xai_sdk.chat import user, system
+from metrics import track_upstream, submit_tracked
+from structured_log import get_logger
 
 
 PRAGALVHA_X_USER_ID = "1693421111776563200"
 
+log = get_logger("dm")
+
+# X allows 200 DM sends per user per 15 minutes
+DM_RATE_LIMIT = 200
+DM_RATE_WINDOW_SECONDS = 15 * 60
+DM_MAX_RETRIES = 3
+DM_RETRY_BACKOFF_SECONDS = 2.0
+# Sends a user may make back to back before pacing starts
+DM_BURST = 5
+DM_SEND_WORKERS = 4
+# How long a single /send-dm waits for its paced send before reporting it as queued
+DM_SEND_TIMEOUT_SECONDS = 30.0
+# How often the send queue drops token buckets of senders that have gone idle
+DM_BUCKET_SWEEP_SECONDS = 60.0
+DM_GENERATION_WORKERS = 8
+TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """
+    Seconds to wait before retrying a failed send, or None if the error is permanent.
+    
+    Rate-limit responses wait for the window reset X reports, when present.
+    """
+    backoff = DM_RETRY_BACKOFF_SECONDS * (2 ** attempt)
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return backoff
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        if status not in TRANSIENT_STATUS_CODES:
+            return None
+        reset = error.response.headers.get('x-rate-limit-reset')
+        if status == 429 and reset and reset.isdigit():
+            return min(max(int(reset) - time.time(), backoff), DM_RATE_WINDOW_SECONDS)
+        return backoff
+    return None
+
+
+class _TokenBucket:
+    """
+    Send budget of one X user token.
+    
+    Holds at most `burst` sends and refills so that no window of
+    `window_seconds` exceeds `rate_limit` sends, even after a burst.
+    """
+
+    def __init__(self, rate_limit: int, window_seconds: float, burst: int, now: float):
+        self.capacity = float(min(burst, rate_limit))
+        self.refill_per_second = max(rate_limit - self.capacity, 1) / window_seconds
+        self.tokens = self.capacity
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Spend a token and return 0, or return the seconds until one is available."""
+        if now < self.updated:
+            # Paused after a rate-limit response
+            return self.updated - now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.refill_per_second
+
+    def pause(self, now: float, seconds: float) -> None:
+        """Stop sending until X's rate-limit window resets."""
+        self.tokens = 0.0
+        self.updated = max(self.updated, now + seconds)
+
+    def is_full(self, now: float) -> bool:
+        """Whether the bucket has refilled completely, so a new one would behave the same."""
+        if now < self.updated:
+            return False
+        return self.tokens + (now - self.updated) * self.refill_per_second >= self.capacity
+
+
+class DMSendQueue:
+    """
+    Paced queue for outgoing DMs, with one token bucket per X user token.
+    
+    X limits DM sends per user, so each sender key (a hash of the user's
+    token) gets its own budget. A scheduler thread hands due sends to a small
+    pool of sender threads; a send that fails transiently is put back on the
+    schedule with exponential backoff instead of holding a thread, so one
+    rate-limited user never delays another user's DMs. Buckets that have
+    refilled completely are dropped, since a new bucket starts out full.
+    """
+
+    def __init__(
+        self,
+        rate_limit: int = DM_RATE_LIMIT,
+        window_seconds: float = DM_RATE_WINDOW_SECONDS,
+        burst: int = DM_BURST,
+        max_retries: int = DM_MAX_RETRIES,
+        send_workers: int = DM_SEND_WORKERS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.rate_limit = rate_limit
+        self.window_seconds = window_seconds
+        self.burst = burst
+        self.max_retries = max_retries
+        self.send_workers = send_workers
+        self._clock = clock
+        self._buckets: Dict[str, _TokenBucket] = {}
+        self._swept = clock()
+        # (due time, submission order, sender key, send, future, attempt)
+        self._schedule: List[tuple] = []
+        self._order = itertools.count()
+        self._ready = threading.Condition()
+        self._thread = None
+        self._executor = None
+
+    def submit(self, send: Callable[[], Any], key: str = "default") -> Future:
+        """
+        Queue a send callable under a sender key.
+        
+        The returned future resolves with its result or final error.
+        """
+        future: Future = Future()
+        self._schedule_send(key, send, future, attempt=0, due=self._clock())
+        with self._ready:
+            if self._thread is None or not self._thread.is_alive():
+                self._executor = ThreadPoolExecutor(max_workers=self.send_workers, thread_name_prefix="dm-send")
+                self._thread = threading.Thread(target=self._run, name="dm-send-queue", daemon=True)
+                self._thread.start()
+        return future
+
+    def pending(self, key: Optional[str] = None) -> int:
+        """Sends waiting to go out, for one sender key or all of them."""
+        with self._ready:
+            return sum(1 for entry in self._schedule if key is None or entry[2] == key)
+
+    def _schedule_send(self, key: str, send: Callable[[], Any], future: Future, attempt: int, due: float) -> None:
+        with self._ready:
+            heapq.heappush(self._schedule, (due, next(self._order), key, send, future, attempt))
+            self._ready.notify()
+
+    def _bucket(self, key: str, now: float) -> _TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _TokenBucket(self.rate_limit, self.window_seconds, self.burst, now)
+        return bucket
+
+    def _evict_idle(self, now: float) -> None:
+        """Drop the buckets of senders that have refilled their whole budget."""
+        for key in [key for key, bucket in self._buckets.items() if bucket.is_full(now)]:
+            del self._buckets[key]
+        self._swept = now
+
+    def _pop_due(self, now: float) -> Tuple[Optional[tuple], Optional[float]]:
+        """
+        Pop the next send that is due and within its sender's budget.
+        
+        Returns:
+            Tuple of ((key, send, future, attempt), None) for a send that can go
+            out now, or (None, seconds until the next scheduled send is due),
+            with None seconds when nothing is scheduled. Call with _ready held.
+        """
+        while self._schedule:
+            due, order, key, send, future, attempt = self._schedule[0]
+            if due > now:
+                return None, due - now
+            heapq.heappop(self._schedule)
+            wait_seconds = self._bucket(key, now).take(now)
+            if wait_seconds:
+                # Keep the submission order so the sender's DMs go out in sequence
+                heapq.heappush(self._schedule, (now + wait_seconds, order, key, send, future, attempt))
+                continue
+            return (key, send, future, attempt), None
+        return None, None
+
+    def _next_due(self) -> tuple:
+        """Block until a send is due and its sender has budget, then pop it."""
+        with self._ready:
+            while True:
+                now = self._clock()
+                if now - self._swept >= DM_BUCKET_SWEEP_SECONDS:
+                    self._evict_idle(now)
+                entry, wait_seconds = self._pop_due(now)
+                if entry is not None:
+                    return entry
+                # Wake up at least once per sweep so idle buckets are dropped
+                if wait_seconds is None or wait_seconds > DM_BUCKET_SWEEP_SECONDS:
+                    wait_seconds = DM_BUCKET_SWEEP_SECONDS
+                self._ready.wait(wait_seconds)
+
+    def _run(self) -> None:
+        while True:
+            key, send, future, attempt = self._next_due()
+            if attempt == 0 and not future.set_running_or_notify_cancel():
+                continue
+            self._executor.submit(self._attempt, key, send, future, attempt)
+
+    def _attempt(self, key: str, send: Callable[[], Any], future: Future, attempt: int) -> None:
+        try:
+            future.set_result(send())
+        except Exception as e:
+            delay = _retry_delay(e, attempt)
+            if delay is None or attempt == self.max_retries:
+                future.set_exception(e)
+                return
+            log.warning("dm send retry", attempt=attempt + 1, delay=round(delay, 1), error=str(e))
+            now = self._clock()
+            if isinstance(e, requests.HTTPError) and e.response is not None and e.response.status_code == 429:
+                with self._ready:
+                    self._bucket(key, now).pause(now, delay)
+            self._schedule_send(key, send, future, attempt + 1, due=now + delay)
+
+
+_send_queue = DMSendQueue()
+
+
 class XDirectMessaging:
-    def __init__(self, xai_client: XAIClient, x_client: Optional[XClient] = None):
+    def __init__(
+        self,
+        xai_client: XAIClient,
+        x_client: Optional[XClient] = None,
+        sender_key: str = "default"
+    ):
         """
         Initialize the direct messaging handler.
         
         Args:
             xai_client: xAI client for generating personalized messages
             x_client: X (Twitter) API client for sending DMs (optional)
+            sender_key: Identifies the X user token behind x_client; sends are
+                paced against that user's DM rate limit
         """
         self.xai_client = xai_client
         self.x_client = x_client
+        self.sender_key = sender_key
 
     def _generate_interview_offer(
         self,
@@ -100,7 +329,8 @@ class XDirectMessaging:
         """))
         
         try:
-            response = chat.sample().content.strip()
+            with track_upstream("grok", "grok-4"):
+                response = chat.sample().content.strip()
             
             # Clean up response in case it has markdown code blocks
             if response.startswith("```"):
@@ -111,7 +341,7 @@ class XDirectMessaging:
             
             result = json.loads(response)
             username = user_info.get('username', 'unknown')
-            print(f"Generated interview offer for @{username}")
+            log.info("generated interview offer", username=username)
             return {
                 "success": True,
                 "username": username,
@@ -120,43 +350,58 @@ class XDirectMessaging:
                 "message": result.get('message', '')
             }
         except (json.JSONDecodeError, Exception) as e:
-            print(f"Error generating interview offer: {e}")
+            log.error("interview offer generation failed", error=str(e))
             return {
                 "success": False,
                 "error": str(e)
             }
 
+    def _post_dm(self, user_id: str, message: str) -> Any:
+        """Call the X DM endpoint once, raising on failure."""
+        # todo: hardcoded pragalvha's user ID. Can be sent to the actual user in prod.
+        # Note: DM API requires specific permissions (dm.write scope)
+        # See: https://docs.x.com/xdks/python/reference/xdk.direct_messages.client
+        # Pass a dict directly since the XDK's Pydantic models are empty
+        with track_upstream("x", "direct_messages.create_by_participant_id"):
+            response = self.x_client.direct_messages.create_by_participant_id(
+                participant_id=PRAGALVHA_X_USER_ID,
+                body={"text": message}
+            )
+        log.info("dm sent", user_id=user_id)
+        return response
+
     def _send_dm(self, user_id: str, message: str) -> Dict[str, Any]:
         """
-        Send a direct message to a user on X.
+        Send a direct message to a user on X through the paced DM queue,
+        waiting up to DM_SEND_TIMEOUT_SECONDS for the result.
         
         Args:
             user_id: The X user ID to send the DM to
             message: The message content
             
         Returns:
-            Dict with success status and any response data
+            Dict with success status and any response data; 'queued' is set when
+            the send is still waiting for the sender's rate limit and will go out later
         """
         if not self.x_client:
-            print("X client not configured")
+            log.warning("X client not configured")
             return {"success": False, "error": "X client not configured"}
 
         try:
-            # todo: hardcoded pragalvha's user ID. Can be sent to the actual user in prod.
-            # Note: DM API requires specific permissions (dm.write scope)
-            # See: https://docs.x.com/xdks/python/reference/xdk.direct_messages.client
-            # Pass a dict directly since the XDK's Pydantic models are empty
-            response = self.x_client.direct_messages.create_by_participant_id(
-                participant_id=PRAGALVHA_X_USER_ID,
-                body={"text": message}
-            )
-            print(f"DM sent to user {user_id}")
+            future = _send_queue.submit(partial(self._post_dm, user_id, message), key=self.sender_key)
+            if not wait([future], timeout=DM_SEND_TIMEOUT_SECONDS).done:
+                log.warning("dm send still queued", user_id=user_id, pending=_send_queue.pending(self.sender_key))
+                return {
+                    "success": False,
+                    "queued": True,
+                    "error": "DM is queued behind the sender's rate limit and will be sent later"
+                }
             return {
                 "success": True,
-                "response": response
+                "response": future.result()
             }
         except Exception as e:
-            print(f"Error sending DM to {user_id}: {e}")
+            log.error("dm send failed", user_id=user_id, error=str(e))
             return {
                 "success": False,
                 "error": str(e)
@@ -197,15 +442,97 @@ class XDirectMessaging:
 
         user_id = offer.get('user_id')
         if user_id:
-            print(f"Sending DM to user {user_id}")
-
             send_result = self._send_dm(user_id, offer['message'])
             offer['sent'] = send_result.get('success', False)
             if not send_result.get('success'):
                 offer['send_error'] = send_result.get('error')
+            if send_result.get('queued'):
+                offer['queued'] = True
         else:
-            print(f"No user ID available for {candidate_data}")
+            log.warning("no user id available", username=offer.get('username'))
             offer['sent'] = False
             offer['send_error'] = "No user ID available"
         
         return offer
+
+    def generate_and_send_batch(
+        self,
+        candidates: List[Dict[str, Any]],
+        job_description: str,
+        company_name: str,
+        recruiter_name: str,
+        test_link: Optional[str] = None,
+        max_workers: int = DM_GENERATION_WORKERS
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Generate personalized messages for many candidates in parallel and send them
+        through the paced DM queue.
+        
+        Args:
+            candidates: List of candidate profile data dicts
+            job_description: The job description
+            company_name: Name of the hiring company
+            recruiter_name: Name of the recruiter
+            test_link: Optional link to an assessment/test for the candidates
+            max_workers: Maximum concurrent message generations
+            
+        Yields:
+            The generate_and_send result for each candidate, plus its 'index',
+            in completion order
+        """
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(candidates)))) as executor:
+            generations = {
+                submit_tracked(
+                    executor,
+                    "dm_generation",
+                    self._generate_interview_offer,
+                    candidate_data=candidate_data,
+                    job_description=job_description,
+                    company_name=company_name,
+                    recruiter_name=recruiter_name,
+                    test_link=test_link
+                ): index
+                for index, candidate_data in enumerate(candidates)
+            }
+            sends: Dict[Future, Dict[str, Any]] = {}
+            pending = set(generations)
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in sends:
+                        offer = sends.pop(future)
+                        try:
+                            future.result()
+                            offer['sent'] = True
+                        except Exception as e:
+                            log.error("dm send failed", user_id=offer.get('user_id'), error=str(e))
+                            offer['sent'] = False
+                            offer['send_error'] = str(e)
+                        yield offer
+                        continue
+
+                    try:
+                        offer = future.result()
+                    except Exception as e:
+                        log.error("interview offer generation failed", error=str(e))
+                        offer = {"success": False, "error": str(e)}
+                    offer['index'] = generations[future]
+                    if not offer.get('success'):
+                        yield offer
+                    elif not offer.get('user_id'):
+                        log.warning("no user id available", username=offer.get('username'))
+                        offer['sent'] = False
+                        offer['send_error'] = "No user ID available"
+                        yield offer
+                    elif not self.x_client:
+                        offer['sent'] = False
+                        offer['send_error'] = "X client not configured"
+                        yield offer
+                    else:
+                        send_future = _send_queue.submit(
+                            partial(self._post_dm, offer['user_id'], offer['message']),
+                            key=self.sender_key
+                        )
+                        sends[send_future] = offer
+                        pending.add(send_future)
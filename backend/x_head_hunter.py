@@ -1,15 +1,29 @@
 import json
-from typing import Dict, List, Any
+import os
+from typing import Dict, List, Any, Optional
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from xdk import Client as XClient
 from xai_sdk import Client as XAIClient
 from xai_sdk.chat import user, system
+from metrics import track_stage, track_upstream, submit_tracked
+from structured_log import get_logger
+from singleflight import SingleFlight
+from lexical_index import candidate_document, pre_rank
 
 
 USER_SEARCH_WORKERS = 8
 USER_TWEETS_WORKERS = 4
 USER_EVAL_WORKERS = 20
 
+# Most candidates per hunt sent to Grok evaluation, best BM25 matches to the job first.
+# Unset or 0 evaluates every discovered user; set it to cap LLM spend per hunt.
+HUNT_EVAL_LIMIT = int(os.getenv("HUNT_EVAL_LIMIT") or "0")
+
+log = get_logger("head_hunter")
+
+# Concurrent hunts for the same job description share one keyword generation call
+_keyword_flights = SingleFlight("keywords")
+
 class XHeadHunter:
     def __init__(self, job_description: str, x_client: XClient, xai_client: XAIClient):
         """
@@ -28,7 +42,13 @@ class XHeadHunter:
         """
         Use Grok to generate relevant keywords people would use in Twitter posts
         about work related to the job description.
+        
+        Identical concurrent requests are coalesced into one Grok call.
         """
+        return list(_keyword_flights.do(self.job_description, self._request_keywords))
+
+    def _request_keywords(self) -> List[str]:
+        """Ask Grok for search keywords for this job description."""
         chat = self.xai_client.chat.create(model="grok-4-fast")
         
         chat.append(system("""
@@ -53,7 +73,8 @@ class XHeadHunter:
         """))
         
         try:
-            response = chat.sample().content.strip()
+            with track_upstream("grok", "grok-4-fast"):
+                response = chat.sample().content.strip()
             
             # Clean up response in case it has markdown code blocks
             if response.startswith("```"):
@@ -63,10 +84,10 @@ class XHeadHunter:
                     response = response[4:].strip()
             
             keywords = json.loads(response)
-            print(f"Generated {len(keywords)} keywords: {keywords}")
+            log.info("generated keywords", count=len(keywords), keywords=keywords)
             return keywords
         except (json.JSONDecodeError, Exception) as e:
-            print(f"Error generating keywords: {e}")
+            log.error("keyword generation failed", error=str(e))
             return []
 
     def _search_users_by_keyword(self, keyword: str) -> List[Dict[str, Any]]:
@@ -84,15 +105,17 @@ class XHeadHunter:
             # Request author_id in tweet fields and expand author info
             # Note: search_recent returns a generator, use next() to get first response
             # Use -is:retweet to exclude retweets (we want original content)
-            tweets_response = next(self.x_client.posts.search_recent(
-                query=f"{keyword} -is:retweet lang:en",
-                max_results=100,
-                tweet_fields=["author_id"],
-                expansions=["author_id"],
-                user_fields=["id", "username", "name", "description", "verified", "public_metrics", "profile_image_url"]
-            ))
+            with track_upstream("x", "posts.search_recent"):
+                tweets_response = next(self.x_client.posts.search_recent(
+                    query=f"{keyword} -is:retweet lang:en",
+                    max_results=100,
+                    tweet_fields=["author_id"],
+                    expansions=["author_id"],
+                    user_fields=["id", "username", "name", "description", "verified", "public_metrics", "profile_image_url"]
+                ))
 
-            print(f"tweets_response kw: {keyword}: {tweets_response}")
+            if log.is_debug():
+                log.debug("search response", keyword=keyword, response=repr(tweets_response))
 
             seen_author_ids = set()
             
@@ -119,28 +142,29 @@ class XHeadHunter:
                         if username:
                             user_data['profile_link'] = f"https://x.com/{username}"
                         users.append(user_data)
-                        print(f"Found user @{username} via keyword '{keyword}'")
+                        log.debug("found user", username=username, keyword=keyword)
                     else:
                         # Fallback: fetch profile individually
                         try:
-                            profile = self.x_client.users.get_by_id(
-                                id=author_id,
-                                user_fields=["id", "username", "name", "description", "verified", "public_metrics", "profile_image_url"]
-                            )
+                            with track_upstream("x", "users.get_by_id"):
+                                profile = self.x_client.users.get_by_id(
+                                    id=author_id,
+                                    user_fields=["id", "username", "name", "description", "verified", "public_metrics", "profile_image_url"]
+                                )
                             if profile and profile.data:
                                 user_data = profile.data
                                 username = user_data.get('username')
                                 if username:
                                     user_data['profile_link'] = f"https://x.com/{username}"
                                 users.append(user_data)
-                                print(f"Found user @{username} via keyword '{keyword}'")
+                                log.debug("found user", username=username, keyword=keyword)
                         except Exception as e:
-                            print(f"Error fetching profile for author {author_id}: {e}")
+                            log.warning("profile fetch failed", author_id=author_id, error=str(e))
                 
         except Exception as e:
-            print(f"Error searching for keyword '{keyword}': {e}")
+            log.error("keyword search failed", keyword=keyword, error=str(e))
 
-        print(f"Found {len(users)} users for keyword '{keyword}'")
+        log.info("keyword search complete", keyword=keyword, users=len(users))
 
         return users
 
@@ -149,18 +173,41 @@ class XHeadHunter:
         Fetch recent tweets for a user.
         """
         try:
-            tweets_response = next(self.x_client.users.get_posts(
-                id=user_id,
-                max_results=max_results,
-            ))
+            with track_upstream("x", "users.get_posts"):
+                tweets_response = next(self.x_client.users.get_posts(
+                    id=user_id,
+                    max_results=max_results,
+                ))
             
             if tweets_response.data:
                 return [tweet["text"] for tweet in tweets_response.data]
         except Exception as e:
-            print(f"Error fetching tweets for user {user_id}: {e}")
+            log.warning("tweet fetch failed", user_id=user_id, error=str(e))
         
         return []
 
+    def _pre_rank(self, users_map: Dict[str, Dict[str, Any]], limit: Optional[int] = None) -> List[str]:
+        """
+        Order users for Grok evaluation by BM25 match of their bio and tweets
+        against the job description, keeping the best `limit` when one is set.
+        
+        Sets 'lexical_score' on every entry of users_map.
+        
+        Returns:
+            Usernames of the `limit` best matches (default HUNT_EVAL_LIMIT; all
+            users when it is 0), best first
+        """
+        limit = HUNT_EVAL_LIMIT if limit is None else limit
+        usernames = list(users_map)
+        ranked, scores = pre_rank(
+            [candidate_document(users_map[username]) for username in usernames], self.job_description, limit
+        )
+        for username, score in zip(usernames, scores):
+            users_map[username]['lexical_score'] = round(score, 3)
+        
+        log.info("pre-ranked candidates", candidates=len(usernames), selected=len(ranked))
+        return [usernames[position] for position in ranked]
+
     def _evaluate_candidate(self, username: str, user_data: Dict[str, Any], tweets: List[str]) -> Dict[str, Any]:
         """
         Use Grok to evaluate if a user is a viable candidate for the job.
@@ -215,7 +262,8 @@ class XHeadHunter:
         """))
         
         try:
-            response = chat.sample().content.strip()
+            with track_upstream("grok", "grok-4-fast"):
+                response = chat.sample().content.strip()
             
             # Clean up response in case it has markdown code blocks
             if response.startswith("```"):
@@ -225,10 +273,18 @@ class XHeadHunter:
                     response = response[4:].strip()
             
             result = json.loads(response)
-            print(f"Evaluated @{username}: viable={result.get('is_viable')}, type={result.get('account_type')}, reason={result.get('reason')}")
+            log.info(
+                "evaluated candidate",
+                sampled=True,
+                username=username,
+                viable=result.get('is_viable'),
+                account_type=result.get('account_type'),
+            )
+            if log.is_debug():
+                log.debug("evaluation reason", username=username, reason=result.get('reason'))
             return result
         except (json.JSONDecodeError, Exception) as e:
-            print(f"Error evaluating candidate @{username}: {e}")
+            log.warning("candidate evaluation failed", username=username, error=str(e))
             return {"is_viable": False, "account_type": "unknown", "reason": f"Evaluation error: {e}"}
 
     def hunt(self) -> Dict[str, Dict[str, Any]]:
@@ -239,31 +295,33 @@ class XHeadHunter:
         1. Use Grok to generate relevant keywords from the job description
         2. Search X API in parallel for users who posted about those keywords
         3. Aggregate all users into a map with username as key
-        4. Evaluate each candidate with Grok and filter out non-viable ones
-        5. If the candidate is actively looking for a job, give them a slight boost (not too much) towards viability.
+        4. Pre-rank them locally (BM25 on bio and tweets), keeping the top HUNT_EVAL_LIMIT if set
+        5. Evaluate those candidates with Grok and filter out non-viable ones
+        6. If the candidate is actively looking for a job, give them a slight boost (not too much) towards viability.
         
         Returns:
             Dict mapping username to user profile data (including tweets and evaluation)
         """
-        print(f"Starting hunt for job: {self.job_description[:100]}...")
+        log.info("starting hunt", job=self.job_description[:100])
         
         # Step 1: Generate relevant keywords using Grok
-        keywords = self._generate_keywords()
+        with track_stage("keyword_generation"):
+            keywords = self._generate_keywords()
         
         if not keywords:
-            print("No keywords generated, cannot proceed with hunt.")
+            log.warning("no keywords generated, cannot proceed with hunt")
             return {}
         
-        print(f"Searching for users with {len(keywords)} keywords...")
+        log.info("searching users", keywords=len(keywords))
         
         # Step 2: Search for users in parallel across all keywords
         users_map: Dict[str, Dict[str, Any]] = {}
         
         # Use ThreadPoolExecutor for parallel keyword searches        
-        with ThreadPoolExecutor(max_workers=USER_SEARCH_WORKERS) as executor:
+        with track_stage("search"), ThreadPoolExecutor(max_workers=USER_SEARCH_WORKERS) as executor:
             # Submit all keyword searches in parallel
             future_to_keyword = {
-                executor.submit(self._search_users_by_keyword, keyword): keyword
+                submit_tracked(executor, "search", self._search_users_by_keyword, keyword): keyword
                 for keyword in keywords
             }
             
@@ -280,17 +338,18 @@ class XHeadHunter:
                                 'found_via_keyword': keyword,
                                 'tweets': []
                             }
-                            print(f"Found user @{username} via keyword '{keyword}'")
                 except Exception as e:
-                    print(f"Error processing results for keyword '{keyword}': {e}")
+                    log.error("keyword results failed", keyword=keyword, error=str(e))
         
-        print(f"Found {len(users_map)} unique users. Fetching their tweets...")
+        log.info("fetching tweets", users=len(users_map))
         
         # Step 3: Fetch tweets for all users in parallel
-        with ThreadPoolExecutor(max_workers=USER_TWEETS_WORKERS) as executor:
+        with track_stage("tweet_fetch"), ThreadPoolExecutor(max_workers=USER_TWEETS_WORKERS) as executor:
             future_to_username = {
-                executor.submit(
-                    self._fetch_user_tweets, 
+                submit_tracked(
+                    executor,
+                    "tweet_fetch",
+                    self._fetch_user_tweets,
                     users_map[username]['user'].get('id')
                 ): username
                 for username in users_map
@@ -302,24 +361,30 @@ class XHeadHunter:
                 try:
                     tweets = future.result()
                     users_map[username]['tweets'] = tweets
-                    print(f"Fetched {len(tweets)} tweets for @{username}")
+                    log.info("fetched tweets", sampled=True, username=username, tweets=len(tweets))
                 except Exception as e:
-                    print(f"Error fetching tweets for @{username}: {e}")
+                    log.warning("tweet fetch failed", username=username, error=str(e))
 
-        print(f"Evaluating {len(users_map)} candidates...")
+        # Step 4: Best lexical matches first; only the top HUNT_EVAL_LIMIT go to Grok when it is set
+        with track_stage("pre_rank"):
+            selected = self._pre_rank(users_map)
         
-        # Step 4: Evaluate each candidate with Grok and filter non-viable ones
+        log.info("evaluating candidates", candidates=len(selected))
+        
+        # Step 5: Evaluate the selected candidates with Grok and filter non-viable ones
         viable_candidates: Dict[str, Dict[str, Any]] = {}
         
-        with ThreadPoolExecutor(max_workers=USER_EVAL_WORKERS) as executor:
+        with track_stage("evaluation"), ThreadPoolExecutor(max_workers=USER_EVAL_WORKERS) as executor:
             future_to_username = {
-                executor.submit(
+                submit_tracked(
+                    executor,
+                    "evaluation",
                     self._evaluate_candidate,
                     username,
                     users_map[username],
                     users_map[username]['tweets']
                 ): username
-                for username in users_map
+                for username in selected
             }
             
             for future in as_completed(future_to_username):
@@ -331,15 +396,14 @@ class XHeadHunter:
                     # Only keep viable individual candidates
                     if evaluation.get('is_viable') and evaluation.get('account_type') == 'individual':
                         viable_candidates[username] = users_map[username]
-                        print(f"✓ @{username} is a viable candidate")
-                    else:
-                        print(f"✗ @{username} filtered out: {evaluation.get('reason', 'N/A')}")
+                        log.info("viable candidate", username=username)
                 except Exception as e:
-                    print(f"Error evaluating @{username}: {e}")
+                    log.warning("candidate evaluation failed", username=username, error=str(e))
 
-        print(f"Hunt complete. Found {len(viable_candidates)} viable candidates out of {len(users_map)} total.")
+        log.info("hunt complete", viable=len(viable_candidates), searched=len(users_map))
         return {
             "viable_candidates": viable_candidates,
             "total_searched": len(users_map),
+            "total_evaluated": len(selected),
             "total_viable": len(viable_candidates)
         }
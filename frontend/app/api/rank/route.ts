@@ -48,6 +48,7 @@ export async function POST(req: NextRequest) {
         candidate_description: candidateDescription,
         job_requirements: jobResult.description || jobResult.title,
         job_id: jobId, // Enables RL calibration from recruiter feedback
+        candidate_id: candidateId, // Links shadow scoring to later recruiter feedback
       }),
     });
 
@@ -62,6 +63,7 @@ export async function POST(req: NextRequest) {
     db.update(candidates)
       .set({
         score: result.score,
+        rawScore: result.raw_score ?? result.score,
         stage: "outreach", // Move to next stage after ranking
         updatedAt: new Date(),
       })
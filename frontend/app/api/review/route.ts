@@ -53,7 +53,8 @@ export async function POST(req: NextRequest) {
         body: JSON.stringify({
           candidate_id: candidateId,
           job_id: candidate.jobId || "default",
-          ai_score: Math.round(candidate.score || 50), // Use research score as AI score
+          // Report the uncalibrated score; calibration is fitted on raw scores
+          ai_score: Math.round(candidate.rawScore ?? candidate.score ?? 50),
           recruiter_stars: rating,
         }),
       });
@@ -19,6 +19,7 @@ function ensureColumn(table: string, column: string, type: string) {
 // Keep schema backward-compatible when adding new fields.
 ensureColumn("candidates", "x_avatar_url", "TEXT");
 ensureColumn("candidates", "x_avatar", "TEXT");
+ensureColumn("candidates", "raw_score", "REAL");
 
 export const db = drizzle(sqlite, { schema });
 
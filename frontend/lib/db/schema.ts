@@ -29,6 +29,7 @@ export const candidates = sqliteTable("candidates", {
   // Pipeline data
   stage: text("stage").notNull().default("discovery"),
   score: real("score"),
+  rawScore: real("raw_score"), // uncalibrated model score; reported back as feedback ai_score
   researchStatus: text("research_status").default("pending"), // pending, running, done, error
   researchProgress: text("research_progress"), // JSON array of progress steps
   researchNotes: text("research_notes"),